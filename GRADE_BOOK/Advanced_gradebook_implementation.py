@@ -1,39 +1,99 @@
+import argparse
 import json
-import statistics
+import os
+import threading
 import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
 import sys
-from colorama import init, Fore, Back, Style
+from itertools import islice
+from journal import Journal, read_version, write_version
+from file_lock import FileLock
+from grade_stats import (GradeHistograms, MarkDistributions, is_valid_mark, subject_statistics,
+                         total_marks)
+from columnar_store import ColumnarStudents
+from json_stream import iter_records
+from binary_snapshot import MappedSnapshot, MappedStudents, write_snapshot
+from sharded_storage import ShardedStudents, shard_filenames
+from sqlite_store import SQLiteStudents, stored_subjects
+from subjects import SubjectRegistry, ScoresView, subjects_of_file
+from name_index import NameIndex
+from leaderboard import Leaderboards
+from grade_history import GradeHistory
+from result_cache import ResultCache
+from mark_index import MarkBitmaps
+from report_cards import RowSnapshot, report_context, write_report_cards
+from metrics import Metrics
+from bulk_import import validate_record, read_all, read_students, read_mark_updates, print_report
 
-# Initialize colorama
-init(autoreset=True)
 
 # Student identification constants
 STUDENT_NAME = "JOHN DOE"
 STUDENT_NUMBER = "290000198"
 REGISTRATION_NUMBER = "88/U/0198/PS"
 
+# Subjects of a new gradebook; an existing one uses the subjects in its data file
+SUBJECTS = ["Maths", "SST", "English", "Science"]
+DEFAULT_SUBJECTS = SubjectRegistry(SUBJECTS)
+
+# Number of students loaded at a time; a background load only holds the
+# gradebook lock for one batch, so lookups never wait longer than that
+LOAD_BATCH = 10000
+
+# Gradebook methods timed when a gradebook is given a Metrics object
+INSTRUMENTED_METHODS = ('load_data', 'save_data', 'commit', 'refresh', 'add_student',
+                        'add_students', 'update_marks', 'get_student', 'delete_student',
+                        'view_statistics', 'view_student_grades', 'print_gradebook',
+                        'find_students', 'top_students', 'student_rank',
+                        'student_percentiles', 'percentile', 'grades_as_of', 'mark_history',
+                        'query', 'export_report_cards')
+
+# Metrics of the interactive session; main() sets it when GRADEBOOK_METRICS is set
+METRICS = None
+
 
 class Student:
     """
     A class to represent a student and their academic records.
     Handles individual student data including admin number, name, and subject marks.
+    Marks are kept in a list in subject id order (scores); marks is a
+    dictionary-like view of it keyed by subject name.
     """
-    def __init__(self, admin_no, name):
+    __slots__ = ('admin_no', 'name', 'subjects', 'scores', '_gradebook')
+
+    def __init__(self, admin_no, name, subjects=None):
         """
-        Initialize a new student with their basic information and empty marks.
+        Initialize a new student with their basic information and zero marks.
         
         Args:
             admin_no (str): Student's administrative number
             name (str): Student's full name
+            subjects (SubjectRegistry): Subjects the student is graded in,
+                DEFAULT_SUBJECTS if not given
         """
         self.admin_no = admin_no
         self.name = name
-        self.marks = {
-            "Maths": 0,
-            "SST": 0,
-            "English": 0,
-            "Science": 0,
-        }
+        self.subjects = subjects if subjects is not None else DEFAULT_SUBJECTS
+        self.scores = [0] * len(self.subjects.names)
+        self._gradebook = None
+
+    @property
+    def marks(self):
+        """ScoresView: Subject name -> marks, backed by scores."""
+        return ScoresView(self.subjects, self.scores)
+
+    @marks.setter
+    def marks(self, marks):
+        self.scores = self.subjects.to_scores(marks)
+
+    def _use_subjects(self, subjects):
+        """
+        Re-key the marks for another subject registry. Subjects the student
+        had no marks for start at 0, like in a new student.
+        """
+        marks = self.marks
+        self.scores = [marks.get(subject, 0) for subject in subjects]
+        self.subjects = subjects
         
     def set_marks(self, subject, marks):
         """
@@ -41,13 +101,17 @@ class Student:
         
         Args:
             subject (str): Subject name
-            marks (int): Marks to be set (must be between 0 and 100)
+            marks (int): Marks to be set (a whole number between 0 and 100)
             
         Returns:
             bool: True if marks were set successfully, False otherwise
         """
-        if subject in self.marks and 0 <= marks <= 100:
-            self.marks[subject] = marks
+        subject_id = self.subjects.ids.get(subject)
+        if subject_id is not None and is_valid_mark(marks):
+            old_marks = self.scores[subject_id]
+            self.scores[subject_id] = marks
+            if self._gradebook is not None:
+                self._gradebook._marks_changed(self, subject, old_marks, marks)
             return True
         return False
     
@@ -61,7 +125,9 @@ class Student:
         Returns:
             int or None: Marks if valid, None if invalid
         """
-        return self.marks.get(subject) if 0 <= self.marks.get(subject) <= 100 else None
+        subject_id = self.subjects.ids.get(subject)
+        marks = None if subject_id is None else self.scores[subject_id]
+        return marks if marks is not None and 0 <= marks <= 100 else None
     
     def edit_marks(self, subject, new_marks):
         """
@@ -82,35 +148,499 @@ class Gradebook:
     A class to manage the entire gradebook system.
     Handles operations like adding/removing students, managing grades, and generating statistics.
     """
-    def __init__(self, filename='previous_data.json'):
+    def __init__(self, filename='previous_data.json', journaled=False, compact_every=1000,
+                 storage='dict', load_mode='eager', shards=8, shared=False, metrics=None,
+                 subjects=None, history=False):
         """
         Initialize gradebook with data from a JSON file.
         
         Args:
             filename (str): Path to the JSON file storing gradebook data
+            journaled (bool): Append each change to a journal file instead of
+                rewriting the JSON file after every change
+            compact_every (int): Number of journal records after which the
+                journal is compacted into the JSON file
+            storage (str): 'dict' to keep one Student object per student,
+                'columnar' to keep marks in one typed array per subject,
+                'mapped' to memory-map a binary snapshot file (see
+                binary_snapshot.py) instead of reading a JSON file, or
+                'sharded' to spread students over several JSON files that
+                are read and written in parallel (see sharded_storage.py), or
+                'sqlite' to keep students in a SQLite database file where
+                every change is its own transaction (see sqlite_store.py)
+            load_mode (str): 'eager' to parse the whole JSON file at once,
+                'streaming' to parse it record by record in bounded memory, or
+                'background' to stream it in a separate thread so the
+                gradebook can be used while it loads
+            shards (int): Number of shard files for 'sharded' storage
+            shared (bool): Coordinate with other processes using the same
+                file through a lock file: every change first picks up the
+                journal records other processes appended since, so no
+                process overwrites another's changes. Needs journaled=True
+            metrics (Metrics): Record calls, latencies and serialization
+                counts here (see metrics.py); None records nothing and adds
+                no overhead
+            subjects (list): Subjects of a new gradebook. None reads them
+                from the data file (the marks of its first student), and
+                uses SUBJECTS when there is no student yet
+            history (bool): Record every change with its time in a grade
+                history file (see grade_history.py), for grades_as_of and
+                mark_history
+
+        Raises:
+            ValueError: If subjects differ from those in the data file
         """
         self.filename = filename
-        self.students = {}
-        self.load_data()
+        if storage == 'sqlite' and journaled:
+            raise ValueError("SQLite storage commits every change itself; it cannot be journaled")
+        if shared and not journaled:
+            raise ValueError("A shared gradebook needs journaled=True to exchange changes")
+        self.storage = storage
+        self.shards = shards
+        self.journal = Journal(filename + '.log') if journaled else None
+        self.history = GradeHistory(filename + '.history', self._history_students) if history else None
+        self.subjects = self._read_subjects(subjects)
+        self.metrics = metrics
+        self.cache = ResultCache(metrics)
+        self._create_store()
+        self.compact_every = compact_every
+        self._file_lock = FileLock(filename + '.lock') if shared else None
+        if shared and self.history is not None:
+            # Written by _append_pending, in journal order
+            self.history.hold()
+        self._version = 0
+        self._pending = []
+        # Mark changes of a batch not recorded yet; None records them at once
+        self._held_marks = None
+        if load_mode not in ('eager', 'streaming', 'background'):
+            raise ValueError(f"Unknown load mode: {load_mode}")
+        self.load_mode = load_mode
+        self._lock = threading.RLock()
+        self._loaded = threading.Event()
+        self._load_error = None
+        self._deferred = 0
+        if metrics is not None:
+            # Only instrumented gradebooks pay for the wrappers
+            for name in INSTRUMENTED_METHODS:
+                setattr(self, name, metrics.timed(name, getattr(self, name)))
+        if load_mode == 'background':
+            threading.Thread(target=self._load_in_background, daemon=True).start()
+        else:
+            self.load_data()
+            self._loaded.set()
     
+    def _read_subjects(self, subjects):
+        """
+        Build the subject registry from the stored students, or from the
+        given subjects when nothing is stored yet.
+
+        Returns:
+            SubjectRegistry: The gradebook's subjects
+        """
+        stored = self._stored_subjects()
+        if subjects is not None and stored is not None and set(subjects) != set(stored):
+            raise ValueError(f"{self.filename} has subjects {stored}, expected {list(subjects)}")
+        names = subjects if subjects is not None else stored
+        if names is None or list(names) == SUBJECTS:
+            return DEFAULT_SUBJECTS
+        return SubjectRegistry(names)
+
+    def _stored_subjects(self):
+        """
+        Read the subjects of the data file: from the header of a mapped
+        snapshot, the columns of a SQLite database, or the marks of the
+        first student of a JSON file (or shard). Failing that, from the
+        first student added in the journal.
+
+        Returns:
+            list or None: Subject names, None if no student is stored yet
+        """
+        if self.storage == 'mapped':
+            try:
+                snapshot = MappedSnapshot(self.filename)
+            except (OSError, ValueError):
+                pass
+            else:
+                snapshot.close()
+                return snapshot.subjects
+        elif self.storage == 'sqlite':
+            return stored_subjects(self.filename)
+        else:
+            filenames = ([self.filename] if self.storage != 'sharded'
+                         else shard_filenames(self.filename, self.shards))
+            for filename in filenames:
+                subjects = subjects_of_file(filename)
+                if subjects is not None:
+                    return subjects
+        if self.journal is not None:
+            for record in self.journal.replay():
+                if record.get('op') == 'add':
+                    return list(record['marks'])
+        return None
+
+    def _create_store(self):
+        """Create the empty student store and indexes for the storage engine."""
+        if isinstance(getattr(self, 'students', None), (MappedStudents, SQLiteStudents)):
+            self.students.close()
+        if self.storage == 'columnar':
+            self.students = ColumnarStudents(self.subjects, gradebook=self)
+        elif self.storage == 'mapped':
+            self.students = MappedStudents(self.subjects, gradebook=self)
+        elif self.storage == 'sharded':
+            self.students = ShardedStudents(self.filename, self.shards)
+        elif self.storage == 'sqlite':
+            self.students = SQLiteStudents(self.subjects, gradebook=self)
+        elif self.storage == 'dict':
+            self.students = {}
+        else:
+            raise ValueError(f"Unknown storage engine: {self.storage}")
+        self.histograms = GradeHistograms(self.subjects)
+        # SQLite counts marks itself, so its students are never all read into memory
+        self._indexes = [] if isinstance(self.students, SQLiteStudents) else [self.histograms]
+        if isinstance(self.students, ShardedStudents):
+            # The shards track which of them have changed since the last save
+            self._indexes.append(self.students)
+        self._indexes.append(self.cache)
+        self._name_index = None
+        self._leaderboards = None
+        self._distributions = None
+        self._mark_bitmaps = None
+
     def load_data(self):
-        """Load existing student data from JSON file into memory."""
+        """Load existing student data from JSON file (and journal) into memory."""
+        self.cache.clear()
+        with self._shared_lock():
+            if self._file_lock is not None:
+                self._version = read_version(self.filename + '.version')['version']
+            self._load_snapshot()
+            if self.journal is not None:
+                with self._lock:
+                    for record in self.journal.replay():
+                        self._apply_record(record)
+
+    def _load_snapshot(self):
+        """Read the students saved in the data file into memory."""
+        shard_data = None
+        if isinstance(self.students, ShardedStudents):
+            shard_data = self.students.read_all()
         try:
-            with open(self.filename, 'r') as file:
-                data = json.load(file)
-                for admin_no, info in data.items():
-                    student = Student(admin_no, info['name'])
-                    student.marks = info["marks"]
-                    self.students[admin_no] = student
+            if isinstance(self.students, MappedStudents):
+                self.students.open(self.filename)
+                self.histograms.count_columns(self.students.columns)
+            elif isinstance(self.students, SQLiteStudents):
+                self.students.open(self.filename)
+            elif shard_data is not None:
+                self._load_records(self.students.ordered_records(shard_data))
+                self.students.dirty.clear()
+            elif self.load_mode == 'eager':
+                with open(self.filename, 'r') as file:
+                    self._load_records(iter(json.load(file).items()))
+            else:
+                self._load_records(iter_records(self.filename))
         except FileNotFoundError:
             print("Error! the file not found")
+
+    def _load_records(self, records):
+        """Insert (admin_no, info) records, holding the lock one batch at a time."""
+        batch = list(islice(records, LOAD_BATCH))
+        while batch:
+            with self._lock:
+                for admin_no, info in batch:
+                    # Popped so each marks dictionary is freed once converted to scores
+                    self._insert(admin_no, info['name'], info.pop("marks"))
+            batch = list(islice(records, LOAD_BATCH))
+
+    def _load_in_background(self):
+        """Run load_data in the background thread and signal when it is done."""
+        try:
+            self.load_data()
+        except Exception as error:
+            self._load_error = error
+        finally:
+            self._loaded.set()
+
+    def wait_until_loaded(self):
+        """
+        Block until a background load has finished.
+        
+        Raises:
+            Exception: Whatever error stopped the background load
+        """
+        self._loaded.wait()
+        if self._load_error is not None:
+            raise self._load_error
+
+    @property
+    def is_loaded(self):
+        """bool: True once all students have been loaded."""
+        return self._loaded.is_set()
     
     def save_data(self):
-        """Save current student data to JSON file."""
-        data = {admin_no:{"name": student.name,"marks": student.marks} 
-                for admin_no, student in self.students.items()}
-        with open(self.filename, 'w') as file:
-            json.dump(data, file, indent=4)
+        """Save current student data to JSON file, compacting the journal into it."""
+        self.wait_until_loaded()
+        with self._exclusive_access():
+            if self._file_lock is not None:
+                # Put this process's changes in the journal first, so that the
+                # others can tell whether they had seen everything compacted
+                self._append_pending()
+                self.journal.flush()
+                self._version += 1
+                self._write_snapshot()
+                write_version(self.filename + '.version', self._version, self.journal.position)
+            else:
+                self._write_snapshot()
+            if self.journal is not None:
+                self.journal.truncate()
+            if self.history is not None and self.history.checkpoint_due:
+                # As costly as the save itself, so done here rather than by a change
+                self.history.checkpoint()
+
+    def _write_snapshot(self):
+        """Write every student to the data file."""
+        if isinstance(self.students, MappedStudents):
+            write_snapshot(self.filename, self.students.records(), self.subjects)
+            self.students.open(self.filename)
+        elif isinstance(self.students, ShardedStudents):
+            self.students.save()
+        elif isinstance(self.students, SQLiteStudents):
+            # Every change has already been committed to the database
+            pass
+        else:
+            subjects = self.subjects.names
+            data = {admin_no:{"name": student.name,"marks": dict(zip(subjects, student.scores))} 
+                    for admin_no, student in self.students.items()}
+            temp_filename = self.filename + '.tmp'
+            if self.metrics is not None:
+                self.metrics.increment('students_serialized', len(data))
+            with open(temp_filename, 'w') as file:
+                with self.metrics.timer('json_dump') if self.metrics is not None else nullcontext():
+                    json.dump(data, file, indent=4)
+            os.replace(temp_filename, self.filename)
+
+    def commit(self):
+        """
+        Make the changes made so far durable.
+        Without a journal this rewrites the JSON file; with a journal it only
+        flushes the appended records, compacting once enough have piled up.
+        A mapped snapshot whose only changes are mark edits, which are made
+        in place, just has the edited pages flushed. Inside defer_commits()
+        this does nothing.
+        """
+        if self._deferred:
+            return
+        self.wait_until_loaded()
+        with self._exclusive_access():
+            self._append_pending()
+            if (self.journal is None and isinstance(self.students, MappedStudents)
+                    and not self.students.has_structural_changes):
+                self.students.flush()
+            elif self.journal is None:
+                self.save_data()
+            elif self.journal.records >= self.compact_every:
+                self.save_data()
+            else:
+                self.journal.flush()
+            if self.history is not None:
+                self.history.flush()
+
+    def _shared_lock(self):
+        """Hold the file lock shared with other readers, when the gradebook is shared."""
+        if self._file_lock is None:
+            return nullcontext()
+        return self._file_lock.shared()
+
+    @contextmanager
+    def _exclusive_access(self):
+        """
+        Hold the file lock exclusively, when the gradebook is shared, after
+        catching up with the changes other processes made.
+        """
+        if self._file_lock is None:
+            yield
+            return
+        with self._file_lock.exclusive():
+            self._synchronize()
+            yield
+
+    def refresh(self):
+        """
+        Pick up the changes other processes sharing the gradebook file have
+        committed. Only journal records appended since the last refresh are
+        read; the whole file is read again only if another process compacted
+        records this one had not seen yet.
+
+        Returns:
+            bool: True if anything changed
+        """
+        if self._file_lock is None:
+            return False
+        self.wait_until_loaded()
+        with self._file_lock.shared():
+            return self._synchronize()
+
+    def _synchronize(self):
+        """Apply other processes' changes; call with the file lock held."""
+        version = read_version(self.filename + '.version')
+        try:
+            journal_size = os.path.getsize(self.journal.filename)
+        except FileNotFoundError:
+            journal_size = 0
+        with self._lock:
+            reload = False
+            if version['version'] != self._version:
+                if (version['version'] == self._version + 1
+                        and version['journal_bytes'] == self.journal.position):
+                    # Everything that was compacted had already been applied here
+                    self._version = version['version']
+                    self.journal.position = 0
+                else:
+                    reload = True
+            elif journal_size < self.journal.position:
+                reload = True
+            if reload:
+                self._create_store()
+                self.load_data()
+                changed = True
+            else:
+                changed = False
+                for record in self.journal.replay(self.journal.position):
+                    self._apply_record(record)
+                    changed = True
+            if changed:
+                # Changes not committed yet are newer than anything on disk
+                for record in self._pending:
+                    self._apply_record(record)
+            return changed
+
+    def _append_pending(self):
+        """Append the records of a shared gradebook held back until the lock was taken."""
+        for record in self._pending:
+            self.journal.append(record)
+        self._pending = []
+        if self.history is not None:
+            self.history.write_held()
+
+    @contextmanager
+    def defer_commits(self):
+        """
+        Make commit() do nothing inside the block, so that several operations
+        can be made durable by one commit() after it. With SQLite storage the
+        block is also one database transaction.
+        """
+        self._deferred += 1
+        try:
+            with self._transaction():
+                yield
+        finally:
+            self._deferred -= 1
+
+    def _insert(self, admin_no, name, marks):
+        """Create a student from stored data and place it in the gradebook."""
+        student = Student(admin_no, name, self.subjects)
+        student.scores = list(map(marks.get, self.subjects.names))
+        return self._attach(student)
+
+    def _attach(self, student):
+        """Place a student in the gradebook and update the indexes."""
+        if isinstance(student, Student) and student.subjects is not self.subjects:
+            student._use_subjects(self.subjects)
+        self.students[student.admin_no] = student
+        # Storage engines other than 'dict' copy the student and hand back a view
+        student = self.students[student.admin_no]
+        student._gradebook = self
+        for index in self._indexes:
+            index.student_added(student)
+        return student
+
+    def _remove(self, admin_no):
+        """Take a student out of the gradebook and update the indexes."""
+        student = self.students.pop(admin_no)
+        student._gradebook = None
+        for index in self._indexes:
+            index.student_removed(student)
+        return student
+
+    def _apply_record(self, record):
+        """Apply one journal record to the in-memory gradebook."""
+        admin_no = record['admin_no']
+        if admin_no in self.students and record['op'] in ('add', 'delete'):
+            self._remove(admin_no)
+        if record['op'] == 'add':
+            self._insert(admin_no, record['name'], record['marks'])
+        elif (record['op'] == 'set' and record['subject'] in self.subjects
+              and admin_no in self.students):
+            student = self.students[admin_no]
+            old_marks = student.marks.get(record['subject'])
+            student.marks[record['subject']] = record['marks']
+            for index in self._indexes:
+                index.marks_changed(student, record['subject'], old_marks, record['marks'])
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Group several changes: hold the lock of a shared gradebook across
+        them, and make them one database transaction with SQLite storage.
+        """
+        with self._exclusive_access():
+            if isinstance(self.students, SQLiteStudents):
+                with self.students.transaction():
+                    yield
+            else:
+                yield
+
+    def _log(self, record):
+        """Append a record to the journal when journaling is enabled."""
+        if self._file_lock is not None:
+            # Only appended while holding the lock, so processes never interleave
+            self._pending.append(record)
+        elif self.journal is not None:
+            self.journal.append(record)
+
+    def _marks_changed(self, student, subject, old_marks, new_marks):
+        """Called by a student of this gradebook after one of its marks changed."""
+        if self._is_stale(student):
+            # Fetched before a shared reload replaced the store: the change
+            # goes to the student now in the gradebook, unless it was deleted
+            live = self.students.get(student.admin_no)
+            if live is not None:
+                live.set_marks(subject, new_marks)
+            return
+        for index in self._indexes:
+            index.marks_changed(student, subject, old_marks, new_marks)
+        if self._held_marks is not None:
+            self._held_marks.append((student.admin_no, subject, old_marks, new_marks))
+        else:
+            self._record_marks(student.admin_no, subject, old_marks, new_marks)
+
+    def _is_stale(self, student):
+        """Check whether a student belongs to a store this gradebook has since replaced."""
+        if self._file_lock is None:
+            # Only a shared gradebook reloads its store
+            return False
+        store = getattr(student, '_store', None)
+        if store is not None:
+            return store is not self.students
+        return self.students.get(student.admin_no) is not student
+
+    def _record_marks(self, admin_no, subject, old_marks, new_marks):
+        """Write one mark change to the journal and the grade history."""
+        self._log({"op": "set", "admin_no": admin_no, "subject": subject, "marks": new_marks})
+        if self.history is not None:
+            self.history.marks_changed(admin_no, subject, old_marks, new_marks)
+
+    def _history_students(self):
+        """
+        Every student as (admin_no, name, marks), for the grade history to
+        start from on its first recorded change; opening a gradebook or
+        reading from it writes nothing.
+        """
+        with self._lock:
+            return [(admin_no, student.name, self.subjects.to_dict(student.scores))
+                    for admin_no, student in self.students.items()]
+
+    def _history_batch(self):
+        """Write the grade history deltas recorded inside the block together."""
+        return self.history.batch() if self.history is not None else nullcontext()
 
     def add_student(self, student):
         """
@@ -122,12 +652,143 @@ class Gradebook:
         Returns:
             bool: True if student added successfully, False if student already exists
         """
-        if student.admin_no not in self.students:
-            self.students[student.admin_no] = student
-            self.save_data()
-            return True
+        self.wait_until_loaded()
+        with self._transaction():
+            if student.admin_no not in self.students:
+                self._attach(student)
+                self._log({"op": "add", "admin_no": student.admin_no,
+                           "name": student.name, "marks": dict(student.marks)})
+                if self.history is not None:
+                    self.history.student_added(student.admin_no, student.name, dict(student.marks))
+                self.commit()
+                return True
         return False
+
+    def add_students(self, records):
+        """
+        Add many students in one pass and save the gradebook once at the end.
+        Every record is validated (unique admin number, non-empty name, all
+        marks between 0 and 100); invalid records are skipped and reported.
+        The records are all read first: if reading fails partway, e.g. on a
+        file that is not UTF-8, nobody is added and the error is reported
+        as a rejected row.
+        
+        Args:
+            records (iterable): (admin_no, name, marks) tuples
+            
+        Returns:
+            dict: 'added' count, 'rejected' list of (row number, admin_no,
+                reason), elapsed 'seconds' and 'rows_per_second'
+        """
+        self.wait_until_loaded()
+        start = time.perf_counter()
+        records, unreadable = read_all(records)
+        added = 0
+        rejected = []
+        if unreadable is not None:
+            # Nothing is added from a file that could not be read to the end
+            rejected.append((len(records) + 1, None, unreadable))
+            records = []
+        row_number = 0
+        with self._transaction():
+            with self._history_batch():
+                for row_number, (admin_no, name, marks) in enumerate(records, 1):
+                    reason = validate_record(admin_no, name, marks, self.subjects)
+                    if reason is None and admin_no in self.students:
+                        reason = "admin number already exists"
+                    if reason is not None:
+                        rejected.append((row_number, admin_no, reason))
+                        continue
+                    marks = {subject: marks[subject] for subject in self.subjects}
+                    self._insert(admin_no, name, marks)
+                    self._log({"op": "add", "admin_no": admin_no, "name": name, "marks": marks})
+                    if self.history is not None:
+                        self.history.student_added(admin_no, name, marks)
+                    added += 1
+            if added:
+                self.commit()
+        seconds = time.perf_counter() - start
+        return {
+            'added': added,
+            'rejected': rejected,
+            'seconds': seconds,
+            'rows_per_second': row_number / seconds if seconds else 0.0
+        }
     
+    def update_marks(self, updates):
+        """
+        Apply many mark changes as one transaction: either every update is
+        applied through Student.edit_marks and saved with a single commit,
+        or, if any row is invalid, none is. Nothing reaches the journal or
+        the grade history until every update has been applied, so a
+        rejected batch leaves no trace there. A file that cannot be read to
+        the end is reported as a rejected row.
+        
+        Args:
+            updates (iterable): (admin_no, subject, marks) tuples
+            
+        Returns:
+            dict: 'updated' count, 'rejected' list of (row number, admin_no,
+                reason), elapsed 'seconds' and 'rows_per_second'
+        """
+        self.wait_until_loaded()
+        start = time.perf_counter()
+        updates, unreadable = read_all(updates)
+        with self._transaction():
+            rejected = [] if unreadable is None else [(len(updates) + 1, None, unreadable)]
+            for row_number, (admin_no, subject, marks) in enumerate(updates, 1):
+                if not isinstance(admin_no, str) or admin_no not in self.students:
+                    rejected.append((row_number, admin_no, "student not found"))
+                elif subject not in self.subjects:
+                    rejected.append((row_number, admin_no, f"unknown subject {subject!r}"))
+                elif isinstance(marks, bool) or not isinstance(marks, int) or not 0 <= marks <= 100:
+                    rejected.append((row_number, admin_no,
+                                     "marks must be a whole number between 0 and 100"))
+
+            updated = 0
+            if not rejected:
+                applied = []
+                self._held_marks = []
+                try:
+                    for row_number, (admin_no, subject, marks) in enumerate(updates, 1):
+                        student = self.students[admin_no]
+                        old_marks = student.marks[subject]
+                        if not student.edit_marks(subject, marks):
+                            rejected.append((row_number, admin_no, "marks could not be set"))
+                            break
+                        applied.append((student, subject, old_marks, marks))
+                    held, self._held_marks = self._held_marks, None
+                except BaseException:
+                    self._held_marks = None
+                    self._restore_marks(applied)
+                    raise
+                if rejected:
+                    self._restore_marks(applied)
+                else:
+                    with self._history_batch():
+                        for change in held:
+                            self._record_marks(*change)
+                    updated = len(applied)
+                    self.commit()
+        seconds = time.perf_counter() - start
+        return {
+            'updated': updated,
+            'rejected': rejected,
+            'seconds': seconds,
+            'rows_per_second': len(updates) / seconds if seconds else 0.0
+        }
+    
+    def _restore_marks(self, applied):
+        """
+        Undo mark changes that were never recorded: put the old marks back
+        and update the indexes, without writing to the journal or history.
+        """
+        # In reverse, so a student updated twice ends up as before
+        for student, subject, old_marks, marks in reversed(applied):
+            student.marks[subject] = old_marks
+            for index in self._indexes:
+                index.marks_changed(student, subject, marks, old_marks)
+
     def get_student(self, admin_no):
         """
         Retrieve a student's information.
@@ -138,7 +799,15 @@ class Gradebook:
         Returns:
             Student or None: Student object if found, None otherwise
         """
-        return self.students.get(admin_no)
+        if self.is_loaded:
+            self.refresh()
+        with self._lock:
+            student = self.students.get(admin_no)
+        if student is None and not self.is_loaded:
+            # The student may be in the part of the file not read yet
+            self.wait_until_loaded()
+            student = self.students.get(admin_no)
+        return student
     
     def delete_student(self, admin_no):
         """
@@ -150,56 +819,58 @@ class Gradebook:
         Returns:
             bool: True if student deleted successfully, False if student not found
         """
-        if admin_no in self.students:
-            del self.students[admin_no]
-            self.save_data()
-            return True
+        self.wait_until_loaded()
+        with self._transaction():
+            if admin_no in self.students:
+                student = self._remove(admin_no)
+                self._log({"op": "delete", "admin_no": admin_no})
+                if self.history is not None:
+                    self.history.student_removed(admin_no, student.name,
+                                                 self.subjects.to_dict(student.scores))
+                self.commit()
+                return True
         return False
     
-    def view_statistics(self):
+    def view_statistics(self, extended=False):
         """
         Calculate and return statistical analysis of grades for all subjects.
+        Statistics are read from the per-subject mark histograms, so the cost
+        does not depend on the number of students. With SQLite storage the
+        histograms are counted by the database instead. Each subject's
+        statistics are cached until a change to that subject.
+        
+        Args:
+            extended (bool): Also include median, standard deviation,
+                quartiles and pass rate for each subject
         
         Returns:
             dict: Dictionary containing statistical measures for each subject
         """
-        # Initialize subject marks dictionary
-        subject_marks = {subject: [] for subject in ["Maths", "SST", "English", "Science"]}
-        
-        # Collecting marks for each student
-        for student in self.students.values():
-            for subject in subject_marks:
-                mark = student.get_marks(subject)
-                if mark is not None:
-                    subject_marks[subject].append(mark)
-
-        # Helper functions for statistics calculations
-        def calc_average(marks):
-            return format(sum(marks) / len(marks), '.4f') if marks else None
-        
-        def calc_mode_freq(marks):
-            if not marks:
-                return "No mode", "No Frequency"
-            mode_value = statistics.mode(marks)
-            return mode_value, marks.count(mode_value)
-        
-        # Calculate statistics for each subject
+        self.wait_until_loaded()
+        self.refresh()
         grade_stats = {}
-        for subject in subject_marks:
-            marks = subject_marks[subject]
-            mode_value, mode_freq = calc_mode_freq(marks)
-            
-            stats = {
-                f'Average_{subject}': calc_average(marks),
-                f'Max_{subject}': max(marks) if marks else None,
-                f'Min_{subject}': min(marks) if marks else None,
-                f'Mode_{subject}': mode_value,
-                f'Mode_Freq_{subject}': mode_freq
-            }
-            grade_stats.update(stats)
+        for subject in self.subjects:
+            grade_stats.update(self.cache.get(
+                ('statistics', extended), subject,
+                lambda subject=subject: self._subject_statistics(subject, extended)))
         
         return grade_stats
+
+    def _subject_statistics(self, subject, extended):
+        """Calculate the statistics of one subject."""
+        if isinstance(self.students, SQLiteStudents):
+            histogram, ordered_marks = self.students.histogram(subject)
+        else:
+            histogram, ordered_marks = self.histograms[subject], self._ordered_marks(subject)
+        return subject_statistics(subject, histogram, ordered_marks, extended)
     
+    def _ordered_marks(self, subject):
+        """Iterate over the marks of one subject in the order students are stored."""
+        if isinstance(self.students, (ColumnarStudents, MappedStudents)):
+            return self.students.column(subject)
+        subject_id = self.subjects.id_of(subject)
+        return (student.scores[subject_id] for student in self.students.values())
+
     def view_student_grades(self, admin_no):
         """
         Get all grades for a specific student.
@@ -212,28 +883,330 @@ class Gradebook:
         """
         student = self.get_student(admin_no)
         if student:
-            return {
-                'Maths': student.marks["Maths"],
-                'English': student.marks["English"],
-                'Science': student.marks["Science"],
-                'SST': student.marks["SST"]
-            }
+            return self.subjects.to_dict(student.scores)
         else:
             print("Student does not exist in the system!")
 
     def print_gradebook(self):
         """
-        Get summary of all students in the gradebook.
+        Get summary of all students in the gradebook. The summary is cached
+        until a student is added or deleted; mark edits do not change it.
         
         Returns:
-            dict: Dictionary containing total number of students and their details
+            dict: Dictionary containing total number of students and their
+                details; the cached dictionary itself, so it must not be
+                modified
         """
+        self.wait_until_loaded()
+        self.refresh()
+        return self.cache.get('roster', None, self._roster)
+
+    def _roster(self):
+        """Build the summary returned by print_gradebook."""
         return {
             'total_students': len(self.students),
             'student_details': {admin_no: student.name 
                               for admin_no, student in self.students.items()}
         }
 
+    def find_students(self, name_prefix, limit=10):
+        """
+        Find students by the start of their name or of any word in it,
+        ignoring case. The name index is built on first use and then kept
+        up to date as students are added and deleted.
+        
+        Args:
+            name_prefix (str): Start of the student's name
+            limit (int): Maximum number of students returned
+            
+        Returns:
+            dict: Admin number -> name of the matching students
+        """
+        self.wait_until_loaded()
+        self.refresh()
+        with self._lock:
+            if self._name_index is None:
+                self._name_index = NameIndex(self.students.values())
+                self._indexes.append(self._name_index)
+            return self._name_index.find(name_prefix, limit)
+
+    def _leaderboard(self, subject):
+        """
+        Get the ranking of a subject (None for total marks). The rankings are
+        built on first use and then kept up to date as students change.
+        """
+        self.wait_until_loaded()
+        self.refresh()
+        with self._lock:
+            if self._leaderboards is None:
+                self._leaderboards = Leaderboards(self.subjects, self.students.values())
+                self._indexes.append(self._leaderboards)
+            return self._leaderboards.board(subject)
+
+    def top_students(self, subject=None, k=10):
+        """
+        Get the best students in a subject or by total marks. Takes time in
+        proportion to k, not to the number of students.
+        
+        Args:
+            subject (str): Subject name, None to rank by total marks
+            k (int): Number of students
+            
+        Returns:
+            list: {'rank', 'admin_no', 'name', 'marks'} per student, best
+                first; tied students share a rank and are in admin number order
+            
+        Raises:
+            KeyError: If the subject is unknown
+        """
+        board = self._leaderboard(subject)
+        with self._lock:
+            return [{'rank': rank, 'admin_no': admin_no,
+                     'name': self.students[admin_no].name, 'marks': marks}
+                    for rank, admin_no, marks in board.top(k)]
+
+    def student_rank(self, admin_no, subject=None):
+        """
+        Get a student's place in a subject or by total marks.
+        
+        Args:
+            admin_no (str): Student's administrative number
+            subject (str): Subject name, None to rank by total marks
+            
+        Returns:
+            dict or None: 'rank', 'out_of' (students ranked) and 'marks', or
+                None if the student does not exist or has no valid mark
+                in the subject
+            
+        Raises:
+            KeyError: If the subject is unknown
+        """
+        board = self._leaderboard(subject)
+        student = self.get_student(admin_no)
+        if student is None:
+            return None
+        scores = student.scores
+        if subject is None:
+            marks = total_marks(scores)
+        else:
+            marks = scores[self.subjects.id_of(subject)]
+            if not is_valid_mark(marks):
+                return None
+        with self._lock:
+            return {'rank': board.rank(marks), 'out_of': board.count, 'marks': marks}
+
+    def _distribution(self, subject):
+        """
+        Get the cumulative mark counts of a subject (None for total marks).
+        The counts are built on first use and then kept up to date as
+        students change.
+        """
+        self.wait_until_loaded()
+        self.refresh()
+        with self._lock:
+            if self._distributions is None:
+                self._distributions = MarkDistributions(self.subjects, self.students.values())
+                self._indexes.append(self._distributions)
+            return self._distributions.distribution(subject)
+
+    def student_percentiles(self, admin_no):
+        """
+        Get a student's percentile in every subject and by total marks: the
+        percentage of students with lower marks, students with equal marks
+        counting as half. Each percentile takes O(log 101) steps, whatever
+        the number of students.
+        
+        Args:
+            admin_no (str): Student's administrative number
+            
+        Returns:
+            dict or None: 'subjects' (subject -> {'marks', 'percentile'};
+                percentile is None for an invalid mark) and 'total'
+                ({'marks', 'percentile'}), or None if the student does not
+                exist
+        """
+        total = self._distribution(None)
+        student = self.get_student(admin_no)
+        if student is None:
+            return None
+        scores = list(student.scores)
+        with self._lock:
+            subjects = {}
+            for subject, marks in zip(self.subjects, scores):
+                percentile = None
+                if is_valid_mark(marks):
+                    percentile = self._distributions.distribution(subject).percentile_rank(marks)
+                subjects[subject] = {'marks': marks, 'percentile': percentile}
+            marks = total_marks(scores)
+            return {'subjects': subjects,
+                    'total': {'marks': marks, 'percentile': total.percentile_rank(marks)}}
+
+    def percentile(self, percent, subject=None):
+        """
+        Get the mark at a percentile of a subject or of total marks, e.g.
+        percent=90 for the mark 90% of the students are at or below.
+        Interpolates between the closest ranks like the extended
+        statistics' median and quartiles.
+        
+        Args:
+            percent (float): Percentile between 0 and 100
+            subject (str): Subject name, None for total marks
+            
+        Returns:
+            float or None: Mark at the percentile, None if no student has
+                a valid mark
+            
+        Raises:
+            KeyError: If the subject is unknown
+            ValueError: If percent is not between 0 and 100
+        """
+        distribution = self._distribution(subject)
+        with self._lock:
+            return distribution.percentile(percent)
+
+    def query(self, subject, lo=0, hi=100):
+        """
+        Select the students whose marks in a subject are between lo and hi,
+        e.g. query('Maths', hi=49) for everyone below 50 in Maths. Selections
+        combine across subjects with & (and), | (or) and - (and not):
+        
+            gradebook.query('Maths', hi=49) & gradebook.query('Science', 60, 70)
+        
+        The per-subject mark bitmaps behind it are built on first use and
+        then kept up to date as students change; no student is looked at
+        until the result is read.
+        
+        Args:
+            subject (str): Subject name
+            lo (int): Lowest mark, inclusive
+            hi (int): Highest mark, inclusive
+            
+        Returns:
+            Selection: Iterate it for the admin numbers, in the order the
+                students were added; len() counts them
+            
+        Raises:
+            KeyError: If the subject is unknown
+        """
+        self.wait_until_loaded()
+        self.refresh()
+        with self._lock:
+            index = self._mark_bitmaps
+            if index is None or index.needs_rebuild:
+                self._mark_bitmaps = MarkBitmaps(self.subjects, self.students.values())
+                if index is None:
+                    self._indexes.append(self._mark_bitmaps)
+                else:
+                    self._indexes[self._indexes.index(index)] = self._mark_bitmaps
+            return self._mark_bitmaps.select(subject, lo, hi)
+
+    def student_names(self, admin_nos):
+        """
+        Look up the names of several students under one lock, e.g. of a
+        query result. The gradebook is not refreshed first, so the names
+        come from the same state as a selection just made; students no
+        longer in the gradebook are left out.
+        
+        Args:
+            admin_nos (iterable): Admin numbers, e.g. a Selection
+            
+        Returns:
+            list: (admin_no, name) of each student found, in the given order
+        """
+        names = []
+        with self._lock:
+            for admin_no in admin_nos:
+                student = self.students.get(admin_no)
+                if student is not None:
+                    names.append((admin_no, student.name))
+        return names
+
+    def export_report_cards(self, filename, output_format='csv', workers=None):
+        """
+        Write a report card for every student, with their rank in each
+        subject and by total marks and the class statistics. The gradebook
+        is only locked while the statistics and rank tables are computed and
+        the students copied to a temporary file; the cards are then rendered
+        from it by worker processes in chunks, while the gradebook stays
+        available.
+        
+        Args:
+            filename (str): Path of the file to write
+            output_format (str): 'csv', 'jsonl' or 'text' (see report_cards.py)
+            workers (int): Number of rendering processes, by default one per CPU
+            
+        Returns:
+            int: Number of report cards written
+            
+        Raises:
+            ValueError: If the format is not supported
+        """
+        self.wait_until_loaded()
+        # The file lock first, as when synchronizing, then everything from one state
+        with self._shared_lock(), self._lock:
+            statistics = self.view_statistics(extended=True)
+            self._distribution(None)
+            context = report_context(self.subjects, self._distributions, statistics)
+            rows = RowSnapshot((admin_no, student.name, list(student.scores))
+                               for admin_no, student in self.students.items())
+        with rows:
+            return write_report_cards(rows, filename, context, output_format, workers)
+
+    def _require_history(self):
+        """Get the grade history, which needs the gradebook opened with history=True."""
+        if self.history is None:
+            raise ValueError("Grade history is off; open the gradebook with history=True")
+        self.wait_until_loaded()
+        return self.history
+
+    def grades_as_of(self, when):
+        """
+        Rebuild the gradebook as it was at a point in time, from the closest
+        earlier history checkpoint and the changes recorded after it.
+        
+        Args:
+            when (datetime or float): Point in time, or seconds since the epoch
+            
+        Returns:
+            dict or None: Admin number -> {"name", "marks"}, like the JSON
+                data file, or None if the history starts after that time
+            
+        Raises:
+            ValueError: If the gradebook keeps no history
+        """
+        history = self._require_history()
+        if isinstance(when, datetime):
+            when = when.timestamp()
+        return history.as_of(when)
+
+    def mark_history(self, admin_no):
+        """
+        Get every recorded change of one student, oldest first.
+        
+        Args:
+            admin_no (str): Student's administrative number
+            
+        Returns:
+            list: {'time', 'subject', 'old', 'new'} per change; time is in
+                seconds since the epoch, and subject is None when the
+                student was added (new is the name) or deleted (old is
+                the name)
+            
+        Raises:
+            ValueError: If the gradebook keeps no history
+        """
+        return self._require_history().changes(admin_no)
+
+
+def load_presentation():
+    """
+    Import colorama for the interactive interface. Kept out of the module
+    imports so that scripts using Gradebook never load or initialize it.
+    """
+    global Fore, Style
+    from colorama import init, Fore, Style
+    init(autoreset=True)
+
 
 def print_with_animation(text, delay=0.03):
     """
@@ -243,11 +1216,14 @@ def print_with_animation(text, delay=0.03):
         text (str): Text to print
         delay (float): Delay between each character
     """
+    start = time.perf_counter()
     for char in text:
         sys.stdout.write(char)
         sys.stdout.flush()
         time.sleep(delay)
     print()
+    if METRICS is not None:
+        METRICS.observe('animation', time.perf_counter() - start)
 
 def loading_animation(duration=1):
     """
@@ -264,6 +1240,8 @@ def loading_animation(duration=1):
         idx += 1
         time.sleep(0.1)
     print("\r" + " " * 20 + "\r", end="")
+    if METRICS is not None:
+        METRICS.observe('animation', time.time() - start)
 
 def print_menu():
     """Display the main menu options for the gradebook system with colors and animations."""
@@ -284,6 +1262,15 @@ def print_menu():
         (Fore.MAGENTA + "4", "View student grades"),
         (Fore.YELLOW + "5", "Edit or Enter student grades"),
         (Fore.CYAN + "6", "Print Gradebook"),
+        (Fore.GREEN + "7", "Find students by name"),
+        (Fore.BLUE + "8", "Import students from a CSV/JSONL file"),
+        (Fore.MAGENTA + "9", "Apply mark updates from a CSV/JSONL file"),
+        (Fore.CYAN + "10", "Top students and class rank"),
+        (Fore.GREEN + "11", "Percentiles"),
+        (Fore.BLUE + "12", "Grade history of a student"),
+        (Fore.MAGENTA + "13", "Find students by mark range"),
+        (Fore.CYAN + "14", "Export report cards"),
+        (Fore.WHITE + "s", "Show operation stats"),
         (Fore.WHITE + "m", "Print menu"),
         (Fore.WHITE + "c", "Clear Screen"),
         (Fore.RED + "q", "Quit system")
@@ -295,12 +1282,51 @@ def print_menu():
     print("\n" + Fore.CYAN + Style.BRIGHT + "=" * 50 + Style.RESET_ALL + "\n")
 
 
-def main():
+def parse_arguments(argv=None):
+    """
+    Read the options of the interactive program. Without any, the whole
+    gradebook is kept in previous_data.json and rewritten after every change.
+
+    Args:
+        argv (list): Command line arguments, sys.argv[1:] by default
+
+    Returns:
+        argparse.Namespace: The options
+    """
+    parser = argparse.ArgumentParser(description="Manage a gradebook interactively.")
+    parser.add_argument('--journaled', action='store_true',
+                        help="append changes to previous_data.json.log instead of "
+                             "rewriting previous_data.json")
+    parser.add_argument('--shared', action='store_true',
+                        help="share the file with other processes through a lock file, "
+                             "e.g. gradebook_cli.py or the HTTP service (implies --journaled)")
+    parser.add_argument('--history', action='store_true',
+                        help="record every change in previous_data.json.history for "
+                             "the grade history (menu option 12)")
+    parser.add_argument('--load-mode', choices=('eager', 'streaming', 'background'),
+                        default='eager',
+                        help="how the data file is read; 'background' shows the menu while "
+                             "a large file loads")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """
     Main function to run the gradebook application.
     Handles user interaction and menu choices with animated feedback.
+
+    Args:
+        argv (list): Command line arguments, see parse_arguments
     """
-    gradebook = Gradebook()
+    global METRICS
+    arguments = parse_arguments(argv)
+    load_presentation()
+    metrics_file = os.environ.get('GRADEBOOK_METRICS')
+    if metrics_file:
+        METRICS = Metrics()
+    gradebook = Gradebook(journaled=arguments.journaled or arguments.shared,
+                          load_mode=arguments.load_mode, shared=arguments.shared, metrics=METRICS,
+                          history=arguments.history)
     
     # Initial loading animation
     print_with_animation(Fore.CYAN + "Starting Gradebook System...")
@@ -309,12 +1335,13 @@ def main():
     while True:
         print_menu()
         choice = input(Fore.GREEN + "Select an option: " + Style.RESET_ALL).strip().lower()
+        option, option_start = choice, time.perf_counter()
         
         if choice == '1':
             print_with_animation(Fore.YELLOW + "\n=== Adding New Student ===")
             admin_no = input(Fore.CYAN + "Enter Admin Number: " + Style.RESET_ALL).strip()
             name = input(Fore.CYAN + "Enter Student Name: " + Style.RESET_ALL).strip()
-            student = Student(admin_no,name)
+            student = Student(admin_no, name, gradebook.subjects)
             loading_animation(0.5)
             if gradebook.add_student(student):
                 print(Fore.GREEN + f"✅ Student {name} added successfully.")
@@ -331,7 +1358,7 @@ def main():
                 print(Fore.RED + "❌ Student not found!")
 
         elif choice == '3':
-            stats = gradebook.view_statistics()
+            stats = gradebook.view_statistics(extended=True)
             for stat, value in stats.items():
                 print("-"*50)
                 print(f"{stat}: {value}")
@@ -350,12 +1377,12 @@ def main():
             admin_no = input("Enter Admin Number to edit grades: ").strip()
             student = gradebook.get_student(admin_no)
             if student:
-                for subject in ["Maths", "SST", "English", "Science"]:
+                for subject in gradebook.subjects:
                     choice = input(f"Edit {subject} marks! (Y/N): ").strip().upper()
                     if choice == 'Y':
                         marks = int(input("Enter new marks (0-100): ").strip())
                         if student.edit_marks(subject, marks):
-                            gradebook.save_data()
+                            gradebook.commit()
                             print("Marks updated.")
                             print("-"*50)
                         else:
@@ -372,6 +1399,154 @@ def main():
                 print(f"{key}: {value}")
                 
 
+        elif choice == '7':
+            name_prefix = input(Fore.CYAN + "Enter the start of the name: " + Style.RESET_ALL).strip()
+            matches = gradebook.find_students(name_prefix)
+            if matches:
+                for admin_no, name in matches.items():
+                    print(f"{admin_no}: {name}")
+            else:
+                print(Fore.RED + "❌ No students found.")
+
+        elif choice == '8':
+            filename = input(Fore.CYAN + "Enter the file to import: " + Style.RESET_ALL).strip()
+            try:
+                records = read_students(filename, gradebook.subjects)
+                loading_animation(0.5)
+                print_report(gradebook.add_students(records))
+            except (OSError, ValueError) as error:
+                print(Fore.RED + f"❌ Import failed: {error}")
+
+        elif choice == '9':
+            filename = input(Fore.CYAN + "Enter the file of mark updates: " + Style.RESET_ALL).strip()
+            try:
+                updates = read_mark_updates(filename)
+                loading_animation(0.5)
+                print_report(gradebook.update_marks(updates))
+            except (OSError, ValueError) as error:
+                print(Fore.RED + f"❌ Update failed: {error}")
+
+        elif choice == '10':
+            subject = input(Fore.CYAN + f"Subject ({', '.join(gradebook.subjects)}), "
+                            "blank for total marks: " + Style.RESET_ALL).strip() or None
+            if subject is not None and subject not in gradebook.subjects:
+                print(Fore.RED + "❌ Unknown subject.")
+            else:
+                admin_no = input(Fore.CYAN + "Admin Number to rank, blank for the top 10: "
+                                 + Style.RESET_ALL).strip()
+                if admin_no:
+                    place = gradebook.student_rank(admin_no, subject)
+                    if place is None:
+                        print(Fore.RED + "❌ Student not found or has no marks in that subject.")
+                    else:
+                        print(f"Rank {place['rank']} of {place['out_of']} with {place['marks']} marks")
+                else:
+                    for entry in gradebook.top_students(subject):
+                        print(f"{entry['rank']:>4}. {entry['admin_no']}  "
+                              f"{entry['name']:<30} {entry['marks']}")
+
+        elif choice == '11':
+            admin_no = input(Fore.CYAN + "Admin Number, blank for the class percentiles: "
+                             + Style.RESET_ALL).strip()
+            if admin_no:
+                percentiles = gradebook.student_percentiles(admin_no)
+                if percentiles is None:
+                    print(Fore.RED + "❌ Student not found!")
+                else:
+                    rows = list(percentiles['subjects'].items()) + [("Total", percentiles['total'])]
+                    for subject, place in rows:
+                        percentile = place['percentile']
+                        shown = "-" if percentile is None else f"{percentile:.1f}"
+                        print(f"{subject:<12} {place['marks']!s:>5} marks  percentile {shown}")
+            else:
+                points = (10, 25, 50, 75, 90)
+                print(f"{'':<12}" + "".join(f"{f'P{point}':>9}" for point in points))
+                for subject in list(gradebook.subjects) + [None]:
+                    values = [gradebook.percentile(point, subject) for point in points]
+                    print(f"{subject or 'Total':<12}"
+                          + "".join(f"{'-' if value is None else f'{value:.1f}':>9}" for value in values))
+
+        elif choice == '12' and gradebook.history is None:
+            print(Fore.RED + "❌ Grade history is off; start the program with --history.")
+
+        elif choice == '12':
+            admin_no = input(Fore.CYAN + "Enter Admin Number: " + Style.RESET_ALL).strip()
+            when = input(Fore.CYAN + "Marks as of (YYYY-MM-DD HH:MM), blank for every change: "
+                         + Style.RESET_ALL).strip()
+            if when:
+                try:
+                    data = gradebook.grades_as_of(datetime.fromisoformat(when))
+                except ValueError:
+                    print(Fore.RED + "❌ Expected a date like 2024-05-31 or 2024-05-31 14:30.")
+                    data = None
+                else:
+                    if data is None:
+                        print(Fore.RED + "❌ The grade history starts after that time.")
+                if data is not None:
+                    if admin_no in data:
+                        for subject, marks in data[admin_no]['marks'].items():
+                            print(f"{subject}: {marks}")
+                    else:
+                        print(Fore.RED + "❌ Student not in the gradebook at that time.")
+            else:
+                changes = gradebook.mark_history(admin_no)
+                for change in changes:
+                    moment = datetime.fromtimestamp(change['time']).isoformat(' ', 'seconds')
+                    if change['subject'] is None:
+                        action = "added" if change['old'] is None else "deleted"
+                        print(f"{moment}  {action} ({change['new'] or change['old']})")
+                    else:
+                        print(f"{moment}  {change['subject']}: {change['old']} -> {change['new']}")
+                if not changes:
+                    print(Fore.RED + "❌ No changes recorded for that student.")
+
+        elif choice == '13':
+            conditions = input(Fore.CYAN + "Subject and marks, e.g. Maths 0-49, Science 60-70: "
+                               + Style.RESET_ALL).strip()
+            match_any = input(Fore.CYAN + "Match all or any of them? (A/O): "
+                              + Style.RESET_ALL).strip().upper() == 'O'
+            selection = None
+            try:
+                for condition in conditions.split(','):
+                    subject, marks = condition.split()
+                    lo, hi = marks.split('-')
+                    matches = gradebook.query(subject, int(lo), int(hi))
+                    if selection is None:
+                        selection = matches
+                    else:
+                        selection = selection | matches if match_any else selection & matches
+            except (ValueError, KeyError):
+                print(Fore.RED + f"❌ Expected conditions like Maths 0-49 with a subject in: "
+                      f"{', '.join(gradebook.subjects)}")
+            else:
+                names = gradebook.student_names(selection)
+                for admin_no, name in names:
+                    print(f"{admin_no}: {name}")
+                print(f"{len(names)} students")
+
+        elif choice == '14':
+            filename = input(Fore.CYAN + "File to write (.csv, .jsonl or .txt): "
+                             + Style.RESET_ALL).strip()
+            output_format = {'.csv': 'csv', '.jsonl': 'jsonl'}.get(
+                os.path.splitext(filename)[1].lower(), 'text')
+            try:
+                loading_animation(0.5)
+                written = gradebook.export_report_cards(filename, output_format)
+                print(Fore.GREEN + f"✅ {written} report cards written to {filename}")
+            except OSError as error:
+                print(Fore.RED + f"❌ Export failed: {error}")
+
+        elif choice == 's':
+            cache = gradebook.cache.stats()
+            print(f"Report cache: {cache['hits']} hits, {cache['misses']} misses, "
+                  f"{cache['entries']} results cached")
+            if METRICS is None:
+                print(Fore.RED + "❌ Stats are off. Start with GRADEBOOK_METRICS=<file> to record them.")
+            else:
+                print(METRICS.summary())
+                METRICS.export(metrics_file)
+                print(f"Exported to {metrics_file}")
+
         elif choice == 'm':
             print_menu()
 
@@ -383,9 +1558,14 @@ def main():
             gradebook.save_data()
             loading_animation(1)
             print_with_animation(Fore.GREEN + "👋 Thank you for using Gradebook System. Goodbye!")
+            if METRICS is not None:
+                METRICS.export(metrics_file)
             break
         else:
             print(Fore.RED + "❌ Invalid choice. Please try again.")
+            option = 'invalid'
+        if METRICS is not None:
+            METRICS.observe(f"menu_{option}", time.perf_counter() - option_start)
         
         input(Fore.YELLOW + "\nPress Enter to continue..." + Style.RESET_ALL)
 
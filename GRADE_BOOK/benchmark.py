@@ -0,0 +1,305 @@
+"""
+Benchmarks for the Gradebook hot paths of PlainCode.py and
+Advanced_gradebook_implementation.py.
+
+Every (module, operation, roster size) combination runs in a fresh Python
+process on its own copy of a generated roster, so peak RSS is not inflated
+by earlier runs. Each run records:
+    seconds               mean wall time of one call
+    peak_rss_bytes        peak resident memory of the process (roster included)
+    allocated_peak_bytes  peak memory allocated during one call (tracemalloc)
+    allocated_net_bytes   memory still allocated after that call
+    cached_seconds        mean wall time of a repeated call answered from the
+                          report cache (advanced view_statistics and
+                          print_gradebook only, None otherwise)
+
+Reports are timed cold: the advanced module's report cache is cleared before
+every timed call, so seconds always measures the real computation and a
+baseline comparison never compares cached against uncached runs.
+
+Rosters are made with generate_data.py (fixed seed) and cached in
+--data-dir. Results go to a JSON file; with --baseline they are compared
+to an earlier results file, regressions are listed and the exit status is 1.
+
+    python benchmark.py --sizes 1000,100000,1000000 --output results.json
+    python benchmark.py --baseline results.json
+    python benchmark.py --modules advanced --options '{"storage": "columnar"}'
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then not recorded
+    resource = None
+
+MODULES = {
+    'plain': 'PlainCode',
+    'advanced': 'Advanced_gradebook_implementation',
+}
+
+OPERATIONS = ['load_data', 'save_data', 'add_student', 'delete_student',
+              'view_statistics', 'view_student_grades', 'print_gradebook']
+
+# Calls timed per run; cheap lookups need many calls to be measurable
+ITERATIONS = {'view_student_grades': 1000}
+
+# Operations whose results the advanced module keeps in its report cache
+CACHED_OPERATIONS = ('view_statistics', 'print_gradebook')
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+
+def roster_file(size, data_dir):
+    """
+    Get the path of a generated roster, generating it on first use.
+
+    Args:
+        size (int): Number of students
+        data_dir (str): Directory where rosters are cached
+
+    Returns:
+        str: Path to the roster JSON file
+    """
+    from generate_data import generate_random_data
+    os.makedirs(data_dir, exist_ok=True)
+    filename = os.path.join(data_dir, f"roster-{size}.json")
+    if not os.path.exists(filename):
+        generate_random_data(size, seed=0, output=filename + '.tmp',
+                             workers=min(os.cpu_count() or 1, 4))
+        os.replace(filename + '.tmp', filename)
+    return filename
+
+
+def _peak_rss():
+    """Peak resident memory of this process in bytes, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(module_key, operation, filename, repeat=3, options=None):
+    """
+    Run one operation in this process and measure it.
+
+    Args:
+        module_key (str): 'plain' or 'advanced'
+        operation (str): Name of the Gradebook operation
+        filename (str): Roster file; it may be modified
+        repeat (int): Calls timed for operations not in ITERATIONS
+        options (dict): Extra Gradebook arguments for the advanced module
+
+    Returns:
+        dict: The measurements described in the module docstring
+    """
+    module = __import__(MODULES[module_key])
+    options = options if module_key == 'advanced' else None
+    calls = ITERATIONS.get(operation, repeat)
+
+    def open_gradebook():
+        return module.Gradebook(filename, **(options or {}))
+
+    gradebook = None if operation == 'load_data' else open_gradebook()
+    admin_numbers = [] if gradebook is None else list(islice(gradebook.students, calls + 1))
+    counter = iter(range(2 * calls + 2))
+    cache = getattr(gradebook, 'cache', None) if operation in CACHED_OPERATIONS else None
+
+    def call():
+        if operation == 'load_data':
+            return open_gradebook()
+        if operation == 'add_student':
+            student = module.Student(f"BENCH{next(counter)}", "Bench Student")
+            return gradebook.add_student(student)
+        if operation == 'delete_student':
+            return gradebook.delete_student(admin_numbers.pop())
+        if operation == 'view_student_grades':
+            return gradebook.view_student_grades(admin_numbers[next(counter) % len(admin_numbers)])
+        return getattr(gradebook, operation)()
+
+    seconds = 0.0
+    for _ in range(calls):
+        if cache is not None:
+            cache.clear()
+        start = time.perf_counter()
+        call()
+        seconds += time.perf_counter() - start
+    seconds /= calls
+
+    cached_seconds = None
+    if cache is not None:
+        call()
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        cached_seconds = (time.perf_counter() - start) / calls
+        cache.clear()
+
+    tracemalloc.start()
+    result = call()
+    allocated_net, allocated_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        'module': module_key,
+        'operation': operation,
+        'students': None,
+        'seconds': seconds,
+        'cached_seconds': cached_seconds,
+        'calls': calls,
+        'peak_rss_bytes': _peak_rss(),
+        'allocated_peak_bytes': allocated_peak,
+        'allocated_net_bytes': allocated_net,
+    }
+
+
+def run_isolated(module_key, operation, size, data_dir, repeat=3, options=None):
+    """
+    Measure one operation in a fresh process on a copy of the roster.
+
+    Returns:
+        dict: Measurements, with 'students' set to the roster size
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'roster.json')
+        shutil.copy(roster_file(size, data_dir), filename)
+        output = os.path.join(directory, 'result.json')
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', module_key, operation,
+             filename, output, '--repeat', str(repeat), '--options', json.dumps(options or {})],
+            check=True, stdout=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__)))
+        with open(output, 'r') as file:
+            result = json.load(file)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    result['students'] = size
+    return result
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, modules=tuple(MODULES), operations=OPERATIONS,
+                   data_dir='benchmark_data', repeat=3, options=None):
+    """
+    Run every operation of every module against every roster size.
+
+    Returns:
+        dict: Environment details and the list of 'results'
+    """
+    results = []
+    for size in sizes:
+        for module_key in modules:
+            for operation in operations:
+                result = run_isolated(module_key, operation, size, data_dir, repeat, options)
+                print(f"{module_key:8} {operation:20} {size:>8}: "
+                      f"{result['seconds'] * 1000:10.3f} ms, "
+                      f"peak RSS {(result['peak_rss_bytes'] or 0) / 2 ** 20:8.1f} MiB, "
+                      f"allocated {result['allocated_peak_bytes'] / 2 ** 20:8.1f} MiB")
+                results.append(result)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': options or {},
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.25, memory_tolerance=0.10):
+    """
+    Find results worse than the baseline by more than the tolerances.
+
+    Args:
+        results (dict): Output of run_benchmarks
+        baseline (dict): Earlier output of run_benchmarks
+        tolerance (float): Allowed relative increase in wall time
+        memory_tolerance (float): Allowed relative increase in peak RSS and
+            allocated bytes
+
+    Returns:
+        list: Description of each regression
+    """
+    def key(result):
+        return result['module'], result['operation'], result['students']
+
+    earlier = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        before = earlier.get(key(result))
+        if before is None:
+            continue
+        for measure_name, allowed in (('seconds', tolerance),
+                                      ('peak_rss_bytes', memory_tolerance),
+                                      ('allocated_peak_bytes', memory_tolerance)):
+            if (before[measure_name] and result[measure_name] is not None
+                    and result[measure_name] > before[measure_name] * (1 + allowed)):
+                regressions.append(
+                    f"{result['module']} {result['operation']} ({result['students']} students): "
+                    f"{measure_name} {before[measure_name]:.6g} -> {result[measure_name]:.6g} "
+                    f"(+{result[measure_name] / before[measure_name] - 1:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--measure']:
+        # Child process started by run_isolated
+        parser = argparse.ArgumentParser()
+        parser.add_argument('--measure', nargs=4,
+                            metavar=('MODULE', 'OPERATION', 'ROSTER', 'OUTPUT'))
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--options', default='{}')
+        arguments = parser.parse_args()
+        module_key, operation, filename, output = arguments.measure
+        result = measure(module_key, operation, filename, arguments.repeat,
+                         json.loads(arguments.options))
+        with open(output, 'w') as file:
+            json.dump(result, file)
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark the Gradebook operations.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated roster sizes")
+    parser.add_argument('--modules', default=','.join(MODULES),
+                        help="comma-separated: " + ', '.join(MODULES))
+    parser.add_argument('--operations', default=','.join(OPERATIONS),
+                        help="comma-separated operation names")
+    parser.add_argument('--repeat', type=int, default=3, help="calls timed per operation")
+    parser.add_argument('--options', default='{}',
+                        help="JSON object of extra Gradebook arguments for the advanced module")
+    parser.add_argument('--data-dir', default='benchmark_data')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative slowdown before flagging a regression")
+    arguments = parser.parse_args()
+
+    for name in arguments.modules.split(','):
+        if name not in MODULES:
+            parser.error(f"unknown module {name!r}")
+    for name in arguments.operations.split(','):
+        if name not in OPERATIONS:
+            parser.error(f"unknown operation {name!r}")
+    results = run_benchmarks([int(size) for size in arguments.sizes.split(',')],
+                             arguments.modules.split(','), arguments.operations.split(','),
+                             arguments.data_dir, arguments.repeat, json.loads(arguments.options))
+    with open(arguments.output, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(f"Results written to {arguments.output}")
+    if arguments.baseline:
+        with open(arguments.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), arguments.tolerance)
+        for regression in regressions:
+            print("REGRESSION:", regression)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {arguments.baseline}")
@@ -0,0 +1,411 @@
+"""
+Memory-mapped binary snapshot format for the gradebook.
+A snapshot is written once and then opened with mmap, so nothing is parsed
+when the gradebook starts: lookups read straight from the mapped file.
+
+Layout (integers little-endian on every platform):
+    header          magic b'GBK1', version, subject count, student count and
+                    the position of every section below
+    subject names   one length byte followed by the UTF-8 name, per subject
+    admin offsets   uint32 per student + 1, into the admin number data
+    name offsets    uint32 per student + 1, into the name data
+    index           uint32 row numbers, sorted by admin number
+    marks           one byte per student for each subject, subject by subject
+                    (255 for a missing mark)
+    admin data      admin numbers, UTF-8, back to back
+    name data       names, UTF-8, back to back
+
+Rows are kept in gradebook order. Convert to and from the JSON format with:
+    python binary_snapshot.py import previous_data.json previous_data.gbk
+    python binary_snapshot.py export previous_data.gbk previous_data.json
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+from columnar_store import NO_MARK, DetachedStudent, StudentView, _to_cell
+from json_stream import iter_records
+from subjects import subjects_of_file
+
+MAGIC = b'GBK1'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQQQQQQ')
+
+
+def write_snapshot(filename, records, subjects):
+    """
+    Write students to a binary snapshot file, replacing it atomically.
+
+    Args:
+        filename (str): Path to the snapshot file
+        records (iterable): (admin_no, name, marks) for each student, in order
+        subjects (list): Subject names stored in the snapshot
+    """
+    admin_data = bytearray()
+    name_data = bytearray()
+    admin_offsets = array('I', [0])
+    name_offsets = array('I', [0])
+    columns = [array('B') for _ in subjects]
+    for admin_no, name, marks in records:
+        admin_data += admin_no.encode('utf-8')
+        admin_offsets.append(len(admin_data))
+        name_data += name.encode('utf-8')
+        name_offsets.append(len(name_data))
+        for subject, column in zip(subjects, columns):
+            column.append(_to_cell(marks.get(subject)))
+    count = len(admin_offsets) - 1
+    index = array('I', sorted(range(count), key=lambda row: admin_data[
+        admin_offsets[row]:admin_offsets[row + 1]]))
+
+    subject_names = b''.join(bytes([len(subject.encode('utf-8'))]) + subject.encode('utf-8')
+                             for subject in subjects)
+    position = _align(HEADER.size + len(subject_names))
+    sections = []
+    for section in (admin_offsets, name_offsets, index):
+        sections.append(position)
+        position += len(section) * section.itemsize
+    sections.append(position)
+    position += count * len(subjects)
+    sections.append(position)
+    sections.append(position + len(admin_data))
+
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(subjects), count, *sections))
+        file.write(subject_names)
+        file.write(bytes(sections[0] - file.tell()))
+        for section in (admin_offsets, name_offsets, index):
+            if sys.byteorder == 'big':
+                section.byteswap()
+            section.tofile(file)
+        for column in columns:
+            column.tofile(file)
+        file.write(admin_data)
+        file.write(name_data)
+    os.replace(temp_filename, filename)
+
+
+def _uint32_table(view):
+    """
+    Read a little-endian uint32 section. On little-endian machines this is a
+    view of the mapping; big-endian ones get a byte-swapped copy.
+    """
+    if sys.byteorder == 'little':
+        return view.cast('I')
+    table = array('I')
+    table.frombytes(view)
+    table.byteswap()
+    return table
+
+
+def _align(position, boundary=8):
+    """Round a file position up to a multiple of boundary."""
+    return (position + boundary - 1) // boundary * boundary
+
+
+class MappedSnapshot:
+    """
+    A class to represent an open, memory-mapped snapshot file.
+    Sections are exposed as memoryviews over the mapping, so opening a
+    snapshot costs the same whatever the number of students.
+    """
+    def __init__(self, filename):
+        """
+        Map a snapshot file into memory.
+
+        Args:
+            filename (str): Path to the snapshot file
+
+        Raises:
+            ValueError: If the file is not a gradebook snapshot
+        """
+        self.filename = filename
+        with open(filename, 'r+b') as file:
+            self._map = mmap.mmap(file.fileno(), 0) if os.fstat(file.fileno()).st_size else None
+        if self._map is None or self._map[:4] != MAGIC:
+            raise ValueError(f"{filename} is not a gradebook snapshot")
+        (_, version, subject_count, self.count, admin_offsets, name_offsets,
+         index, marks, admin_data, name_data) = HEADER.unpack_from(self._map)
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+
+        self.subjects = []
+        position = HEADER.size
+        for _ in range(subject_count):
+            length = self._map[position]
+            self.subjects.append(self._map[position + 1:position + 1 + length].decode('utf-8'))
+            position += 1 + length
+
+        self._admin_data_position = admin_data
+        self._view = view = memoryview(self._map)
+        table_size = (self.count + 1) * 4
+        self.admin_offsets = _uint32_table(view[admin_offsets:admin_offsets + table_size])
+        self.name_offsets = _uint32_table(view[name_offsets:name_offsets + table_size])
+        self.index = _uint32_table(view[index:index + self.count * 4])
+        self.columns = {subject: view[marks + i * self.count:marks + (i + 1) * self.count]
+                        for i, subject in enumerate(self.subjects)}
+        self.admin_data = view[admin_data:name_data]
+        self.name_data = view[name_data:]
+
+    def admin_key(self, row):
+        """Get the UTF-8 admin number of a row without decoding it."""
+        start = self._admin_data_position + self.admin_offsets[row]
+        return self._map[start:start + self.admin_offsets[row + 1] - self.admin_offsets[row]]
+
+    def admin_no_at(self, row):
+        """Decode the admin number stored in a row."""
+        return self.admin_key(row).decode('utf-8')
+
+    def name_at(self, row):
+        """Decode the name stored in a row."""
+        return bytes(self.name_data[self.name_offsets[row]:self.name_offsets[row + 1]]).decode('utf-8')
+
+    def find(self, admin_no):
+        """
+        Binary search the sorted index for a student.
+
+        Args:
+            admin_no (str): Student's administrative number
+
+        Returns:
+            int or None: Row number if found, None otherwise
+        """
+        key = admin_no.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.admin_key(self.index[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.admin_key(self.index[low]) == key:
+            return self.index[low]
+        return None
+
+    def records(self):
+        """Yield (admin_no, name, marks) for every row in order."""
+        for row in range(self.count):
+            yield (self.admin_no_at(row), self.name_at(row),
+                   {subject: column[row] for subject, column in self.columns.items()})
+
+    def flush(self):
+        """Write marks changed in place back to the file."""
+        self._map.flush()
+
+    def close(self):
+        """Release the memoryviews and unmap the file."""
+        for section in (self.admin_offsets, self.name_offsets, self.index,
+                        self.admin_data, self.name_data, *self.columns.values(), self._view):
+            if isinstance(section, memoryview):
+                section.release()
+        self._map.close()
+
+
+class MappedStudents(MutableMapping):
+    """
+    A dictionary-like mapping of admin number to student backed by a
+    MappedSnapshot. Students in the snapshot are returned as views whose
+    marks are read from, and edited in place in, the mapped file. Students
+    added or deleted since the snapshot was written are kept in memory until
+    the gradebook writes a new snapshot.
+    """
+    def __init__(self, subjects, gradebook=None):
+        """
+        Initialize an empty store.
+
+        Args:
+            subjects (iterable): Subjects every student is graded in, in id order
+            gradebook (Gradebook): Gradebook notified when a view's marks change
+        """
+        self.gradebook = gradebook
+        self.subjects = list(subjects)
+        self.snapshot = None
+        self.columns = {}
+        self.alive = bytearray()
+        self.added = {}
+        self.generation = 0
+
+    def open(self, filename):
+        """
+        Map a snapshot file, replacing anything held before.
+
+        Args:
+            filename (str): Path to the snapshot file
+
+        Raises:
+            ValueError: If the snapshot's subjects differ from the gradebook's
+        """
+        snapshot = MappedSnapshot(filename)
+        if snapshot.subjects != self.subjects:
+            snapshot.close()
+            raise ValueError(f"{filename} has subjects {snapshot.subjects}, expected {self.subjects}")
+        self.close()
+        self.snapshot = snapshot
+        self.columns = snapshot.columns
+        self.alive = bytearray(b'\x01') * snapshot.count
+        self.added = {}
+        self.generation += 1
+
+    def close(self):
+        """Unmap the snapshot, if one is open."""
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+            self.columns = {}
+            self.alive = bytearray()
+
+    def flush(self):
+        """Write marks edited in place back to the snapshot file."""
+        if self.snapshot is not None:
+            self.snapshot.flush()
+
+    @property
+    def has_structural_changes(self):
+        """bool: True if students were added or deleted since the snapshot was opened."""
+        return bool(self.added) or self.alive.count(0) > 0
+
+    def row_of(self, admin_no):
+        """Find the snapshot row of a student that has not been deleted."""
+        if self.snapshot is None:
+            return None
+        row = self.snapshot.find(admin_no)
+        return row if row is not None and self.alive[row] else None
+
+    def name_at(self, row):
+        """Decode the name stored in a snapshot row."""
+        return self.snapshot.name_at(row)
+
+    def column(self, subject):
+        """
+        Get the marks of a subject in stored order.
+
+        Args:
+            subject (str): Subject name
+
+        Returns:
+            iterable: Marks, NO_MARK where a mark is missing
+        """
+        if not self.has_structural_changes and self.snapshot is not None:
+            return self.columns[subject]
+        return (student.marks.get(subject) for student in self.values())
+
+    def __getitem__(self, admin_no):
+        if admin_no in self.added:
+            return self.added[admin_no]
+        row = self.row_of(admin_no)
+        if row is None:
+            raise KeyError(admin_no)
+        return StudentView(self, admin_no, row)
+
+    def __setitem__(self, admin_no, student):
+        row = self.row_of(admin_no)
+        if row is not None and student.name == self.name_at(row):
+            for subject, mark in zip(self.subjects, student.scores):
+                self.columns[subject][row] = _to_cell(mark)
+            return
+        if row is not None:
+            self.alive[row] = 0
+        self.added[admin_no] = student
+
+    def __delitem__(self, admin_no):
+        if admin_no in self.added:
+            del self.added[admin_no]
+            return
+        row = self.row_of(admin_no)
+        if row is None:
+            raise KeyError(admin_no)
+        self.alive[row] = 0
+
+    def pop(self, admin_no, *default):
+        """Remove a student and return it with its marks copied out of the snapshot."""
+        if admin_no in self.added:
+            return self.added.pop(admin_no)
+        row = self.row_of(admin_no)
+        if row is None:
+            if default:
+                return default[0]
+            raise KeyError(admin_no)
+        student = DetachedStudent(admin_no, self.name_at(row), self.subjects,
+                                  StudentView(self, admin_no, row).scores)
+        self.alive[row] = 0
+        return student
+
+    def __iter__(self):
+        for student in self.values():
+            yield student.admin_no
+
+    def __len__(self):
+        return len(self.alive) - self.alive.count(0) + len(self.added)
+
+    def __contains__(self, admin_no):
+        return admin_no in self.added or self.row_of(admin_no) is not None
+
+    def values(self):
+        """Iterate over every student: snapshot rows first, then added students."""
+        if self.snapshot is not None:
+            for row in range(self.snapshot.count):
+                if self.alive[row]:
+                    yield StudentView(self, self.snapshot.admin_no_at(row), row)
+        yield from self.added.values()
+
+    def items(self):
+        """Iterate over (admin_no, student) pairs in stored order."""
+        for student in self.values():
+            yield student.admin_no, student
+
+    def records(self):
+        """Yield (admin_no, name, marks) for every student, ready for write_snapshot."""
+        for student in self.values():
+            yield student.admin_no, student.name, student.marks
+
+
+def json_to_snapshot(json_filename, snapshot_filename, subjects):
+    """
+    Convert a gradebook JSON file (e.g. from generate_data.py) to a snapshot.
+
+    Args:
+        json_filename (str): Path to the JSON file
+        snapshot_filename (str): Path to the snapshot file to write
+        subjects (list): Subject names stored in the snapshot
+    """
+    write_snapshot(snapshot_filename,
+                   ((admin_no, info['name'], info['marks'])
+                    for admin_no, info in iter_records(json_filename)),
+                   subjects)
+
+
+def snapshot_to_json(snapshot_filename, json_filename):
+    """
+    Convert a snapshot back to the gradebook JSON format.
+
+    Args:
+        snapshot_filename (str): Path to the snapshot file
+        json_filename (str): Path to the JSON file to write
+    """
+    snapshot = MappedSnapshot(snapshot_filename)
+    try:
+        data = {admin_no: {"name": name,
+                           "marks": {subject: None if mark == NO_MARK else mark
+                                     for subject, mark in marks.items()}}
+                for admin_no, name, marks in snapshot.records()}
+    finally:
+        snapshot.close()
+    with open(json_filename, 'w') as file:
+        json.dump(data, file, indent=4)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python binary_snapshot.py import|export SOURCE DESTINATION")
+        sys.exit(1)
+    if sys.argv[1] == 'import':
+        json_to_snapshot(sys.argv[2], sys.argv[3],
+                         subjects_of_file(sys.argv[2]) or ["Maths", "SST", "English", "Science"])
+    else:
+        snapshot_to_json(sys.argv[2], sys.argv[3])
+    print(f"Converted {sys.argv[2]} to {sys.argv[3]}")
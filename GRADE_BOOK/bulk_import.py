@@ -0,0 +1,219 @@
+"""
+Bulk import of students and mark updates from CSV or JSON Lines files.
+Student rows are read as (admin_no, name, marks) records and handed to
+Gradebook.add_students, which reads them all, then validates and inserts
+them in one pass and saves the gradebook once at the end; a file that
+cannot be read to the end adds nobody. Mark update rows are read as
+(admin_no, subject, marks) records for Gradebook.update_marks, which
+applies all of them or none.
+
+Student CSV files need a header row: admin_no,name,Maths,SST,English,Science
+Student JSON Lines files hold one object per line:
+    {"admin_no": "2400711201", "name": "Jane Doe", "marks": {"Maths": 70, ...}}
+Mark update CSV files need a header row: admin_no,subject,marks
+Mark update JSON Lines files hold one object per line:
+    {"admin_no": "2400711201", "subject": "Maths", "marks": 75}
+
+Run this file directly to import into previous_data.json:
+    python bulk_import.py new_students.csv
+    python bulk_import.py --marks term_marks.csv
+"""
+
+import csv
+import json
+import sys
+
+
+def validate_record(admin_no, name, marks, subjects):
+    """
+    Check a record against the rules in the README.
+
+    Args:
+        admin_no (str): Student's administrative number
+        name (str): Student's full name
+        marks (dict): Subject -> marks
+        subjects (list): Subjects every student must have marks for
+
+    Returns:
+        str or None: Why the record is invalid, None if it is valid
+    """
+    if not isinstance(marks, dict):
+        return "malformed row"
+    if not isinstance(admin_no, str) or not admin_no.strip():
+        return "admin number is empty"
+    if not isinstance(name, str) or not name.strip():
+        return "name is empty"
+    for subject in subjects:
+        if subject not in marks:
+            return f"{subject} marks are missing"
+        mark = marks[subject]
+        if isinstance(mark, bool) or not isinstance(mark, int) or not 0 <= mark <= 100:
+            return f"{subject} marks must be a whole number between 0 and 100"
+    return None
+
+
+def _parse_mark(value):
+    """Turn a CSV cell into an int when it holds one; otherwise leave it for validation."""
+    text = (value or '').strip()
+    return int(text) if text.lstrip('-').isdigit() else text
+
+
+def read_csv(filename, subjects):
+    """
+    Read student records from a CSV file.
+
+    Args:
+        filename (str): Path to the CSV file
+        subjects (list): Subject columns to read marks from
+
+    Yields:
+        tuple: (admin_no, name, marks) for each data row
+    """
+    with open(filename, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            yield ((row.get('admin_no') or '').strip(), (row.get('name') or '').strip(),
+                   {subject: _parse_mark(row[subject]) for subject in subjects
+                    if row.get(subject) is not None})
+
+
+def read_jsonl(filename):
+    """
+    Read student records from a JSON Lines file. Blank lines are skipped;
+    lines that are not JSON objects are returned with marks set to None so
+    that they are reported as malformed.
+
+    Args:
+        filename (str): Path to the JSON Lines file
+
+    Yields:
+        tuple: (admin_no, name, marks) for each line
+    """
+    for admin_no, row in _read_jsonl_fields(filename):
+        if row is None:
+            yield None, None, None
+        else:
+            yield admin_no, row.get('name'), row.get('marks')
+
+
+def read_students(filename, subjects):
+    """
+    Read student records from a .csv or .jsonl file.
+
+    Args:
+        filename (str): Path to the file
+        subjects (list): Subjects every student is graded in
+
+    Returns:
+        iterator: (admin_no, name, marks) records
+
+    Raises:
+        ValueError: If the file extension is not supported
+    """
+    if filename.lower().endswith('.csv'):
+        return read_csv(filename, subjects)
+    if filename.lower().endswith(('.jsonl', '.ndjson')):
+        return read_jsonl(filename)
+    raise ValueError("Only .csv and .jsonl files can be imported")
+
+
+def read_mark_updates(filename):
+    """
+    Read (admin_no, subject, marks) updates from a .csv or .jsonl file.
+    Malformed JSON lines are returned with every field set to None.
+
+    Args:
+        filename (str): Path to the file
+
+    Returns:
+        iterator: (admin_no, subject, marks) records
+
+    Raises:
+        ValueError: If the file extension is not supported
+    """
+    if filename.lower().endswith('.csv'):
+        return _read_mark_updates_csv(filename)
+    if filename.lower().endswith(('.jsonl', '.ndjson')):
+        return ((admin_no, row.get('subject') if row is not None else None,
+                 row.get('marks') if row is not None else None)
+                for admin_no, row in _read_jsonl_fields(filename))
+    raise ValueError("Only .csv and .jsonl files can be imported")
+
+
+def _read_mark_updates_csv(filename):
+    """Yield (admin_no, subject, marks) from a mark update CSV file."""
+    with open(filename, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            yield ((row.get('admin_no') or '').strip(), (row.get('subject') or '').strip(),
+                   _parse_mark(row.get('marks')))
+
+
+def _read_jsonl_fields(filename):
+    """Yield (admin_no, row) for each JSON Lines row; row is None when malformed."""
+    with open(filename, 'r') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            if isinstance(row, dict):
+                yield row.get('admin_no'), row
+            else:
+                yield None, None
+
+
+def read_all(records):
+    """
+    Read every record before any is applied, so that a file that turns out
+    to be unreadable partway, e.g. not UTF-8 or with a CSV field over the
+    csv module's size limit, changes nothing.
+
+    Args:
+        records (iterable): Records from read_students or read_mark_updates
+
+    Returns:
+        tuple: (list of the records read, None), or (the records read
+            before the error, why the file could not be read)
+    """
+    rows = []
+    try:
+        for record in records:
+            rows.append(record)
+    except (csv.Error, UnicodeDecodeError) as error:
+        return rows, f"file could not be read: {error}"
+    return rows, None
+
+
+def print_report(report):
+    """
+    Print the result of Gradebook.add_students or Gradebook.update_marks.
+
+    Args:
+        report (dict): Report returned by add_students or update_marks
+    """
+    if 'added' in report:
+        print(f"Added {report['added']} students, rejected {len(report['rejected'])}.")
+    elif report['rejected']:
+        print(f"No marks updated: {len(report['rejected'])} invalid rows.")
+    else:
+        print(f"Updated {report['updated']} marks.")
+    for row_number, admin_no, reason in report['rejected']:
+        print(f"  row {row_number} ({admin_no}): {reason}")
+    print(f"{report['rows_per_second']:.0f} rows/second")
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    update_marks = arguments[:1] == ['--marks']
+    if update_marks:
+        arguments = arguments[1:]
+    if len(arguments) not in (1, 2):
+        print("Usage: python bulk_import.py [--marks] FILE [GRADEBOOK_FILE]")
+        sys.exit(1)
+    from Advanced_gradebook_implementation import Gradebook
+    gradebook = Gradebook(*arguments[1:2])
+    if update_marks:
+        print_report(gradebook.update_marks(read_mark_updates(arguments[0])))
+    else:
+        print_report(gradebook.add_students(read_students(arguments[0], gradebook.subjects)))
@@ -0,0 +1,339 @@
+"""
+Columnar storage engine for the gradebook.
+Instead of one Student object and one marks dictionary per student, all
+students share a handful of contiguous columns: admin numbers and names
+packed into UTF-8 buffers, and one unsigned byte array per subject. The
+admin_no -> row index is an open-addressing hash table held in an array,
+so no Python object is kept per student. Student objects are only created
+as light views when a student is looked up.
+"""
+
+from array import array
+from collections.abc import MutableMapping
+
+from grade_stats import is_valid_mark
+
+# Stored in a marks column for marks that are missing or not in 0-100
+NO_MARK = 255
+
+# Marks an empty slot in the hash table
+EMPTY = -1
+
+
+def _to_cell(marks):
+    """Convert a mark to the value stored in a marks column."""
+    return marks if is_valid_mark(marks) else NO_MARK
+
+
+class MarksView(MutableMapping):
+    """
+    A dictionary-like view of one student's marks, reading from and writing
+    to the subject columns of a ColumnarStudents store.
+    """
+    __slots__ = ('_student',)
+
+    def __init__(self, student):
+        self._student = student
+
+    def __getitem__(self, subject):
+        mark = self._student._store.columns[subject][self._student._row()]
+        return None if mark == NO_MARK else mark
+
+    def __setitem__(self, subject, marks):
+        self._student._store.columns[subject][self._student._row()] = _to_cell(marks)
+
+    def __delitem__(self, subject):
+        raise TypeError("subjects cannot be removed from a columnar store")
+
+    def __iter__(self):
+        return iter(self._student._store.columns)
+
+    def __len__(self):
+        return len(self._student._store.columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class StudentView:
+    """
+    A Student-like object for one row of a ColumnarStudents store.
+    Supports the same attributes and methods as Student.
+    """
+    __slots__ = ('_store', 'admin_no', '_gradebook', '_cached_row', '_generation')
+
+    def __init__(self, store, admin_no, row):
+        self._store = store
+        self.admin_no = admin_no
+        self._gradebook = store.gradebook
+        self._cached_row = row
+        self._generation = store.generation
+
+    def _row(self):
+        """Find the student's row, looking it up again if the store was repacked."""
+        if self._generation != self._store.generation:
+            self._cached_row = self._store.row_of(self.admin_no)
+            self._generation = self._store.generation
+        if self._cached_row is None or not self._store.alive[self._cached_row]:
+            raise KeyError(self.admin_no)
+        return self._cached_row
+
+    @property
+    def name(self):
+        return self._store.name_at(self._row())
+
+    @property
+    def marks(self):
+        return MarksView(self)
+
+    @property
+    def scores(self):
+        """list: Marks in subject id order, None where a mark is missing."""
+        row = self._row()
+        return [None if column[row] == NO_MARK else column[row]
+                for column in self._store.columns.values()]
+
+    def set_marks(self, subject, marks):
+        """
+        Set marks for a specific subject with validation.
+
+        Args:
+            subject (str): Subject name
+            marks (int): Marks to be set (a whole number between 0 and 100)
+
+        Returns:
+            bool: True if marks were set successfully, False otherwise
+        """
+        if subject in self._store.columns and is_valid_mark(marks):
+            student_marks = self.marks
+            old_marks = student_marks[subject]
+            student_marks[subject] = marks
+            if self._gradebook is not None:
+                self._gradebook._marks_changed(self, subject, old_marks, marks)
+            return True
+        return False
+
+    def get_marks(self, subject):
+        """
+        Retrieve marks for a specific subject.
+
+        Args:
+            subject (str): Subject name
+
+        Returns:
+            int or None: Marks if valid, None if invalid
+        """
+        return self.marks.get(subject)
+
+    def edit_marks(self, subject, new_marks):
+        """
+        Edit existing marks for a subject.
+
+        Args:
+            subject (str): Subject name
+            new_marks (int): New marks to be set
+
+        Returns:
+            bool or None: True if edit successful, False/None if failed
+        """
+        return self.set_marks(subject, new_marks) if subject else None
+
+
+class DetachedStudent:
+    """A plain record of a student that has been removed from a store."""
+    __slots__ = ('admin_no', 'name', 'subjects', 'scores', '_gradebook')
+
+    def __init__(self, admin_no, name, subjects, scores):
+        self.admin_no = admin_no
+        self.name = name
+        self.subjects = subjects
+        self.scores = scores
+        self._gradebook = None
+
+    @property
+    def marks(self):
+        return dict(zip(self.subjects, self.scores))
+
+
+class ColumnarStudents(MutableMapping):
+    """
+    A dictionary-like mapping of admin number to student, stored by column.
+    Rows keep insertion order like a dict. Deleted rows are left as holes
+    and squeezed out once they make up half of the rows.
+    """
+    def __init__(self, subjects, gradebook=None):
+        """
+        Initialize an empty store.
+
+        Args:
+            subjects (iterable): Subjects to keep a marks column for, in id order
+            gradebook (Gradebook): Gradebook notified when a view's marks change
+        """
+        self.gradebook = gradebook
+        self.subjects = list(subjects)
+        self.generation = 0
+        self._reset()
+
+    def _reset(self):
+        """Empty every column and the hash table."""
+        self.admin_data = bytearray()
+        self.admin_offsets = array('L', [0])
+        self.name_data = bytearray()
+        self.name_offsets = array('L', [0])
+        self.columns = {subject: array('B') for subject in self.subjects}
+        self.alive = bytearray()
+        self.table = array('l', [EMPTY]) * 8
+        self.count = 0
+        # Bumped whenever rows move, so views know to look their row up again
+        self.generation += 1
+
+    def admin_no_at(self, row):
+        """Decode the admin number stored in a row."""
+        return self.admin_data[self.admin_offsets[row]:self.admin_offsets[row + 1]].decode('utf-8')
+
+    def name_at(self, row):
+        """Decode the name stored in a row."""
+        return self.name_data[self.name_offsets[row]:self.name_offsets[row + 1]].decode('utf-8')
+
+    def row_of(self, admin_no):
+        """
+        Look up the row of a student in the hash table.
+
+        Args:
+            admin_no (str): Student's administrative number
+
+        Returns:
+            int or None: Row number if the student is stored, None otherwise
+        """
+        key = admin_no.encode('utf-8')
+        mask = len(self.table) - 1
+        slot = hash(admin_no) & mask
+        while True:
+            row = self.table[slot]
+            if row == EMPTY:
+                return None
+            if (self.alive[row] and
+                    self.admin_data[self.admin_offsets[row]:self.admin_offsets[row + 1]] == key):
+                return row
+            slot = (slot + 1) & mask
+
+    def column(self, subject):
+        """
+        Get the marks column for a subject, holes and all.
+
+        Args:
+            subject (str): Subject name
+
+        Returns:
+            array: One byte per row; NO_MARK for missing marks and deleted rows
+        """
+        return self.columns[subject]
+
+    def __getitem__(self, admin_no):
+        row = self.row_of(admin_no)
+        if row is None:
+            raise KeyError(admin_no)
+        return StudentView(self, admin_no, row)
+
+    def __setitem__(self, admin_no, student):
+        scores = student.scores
+        row = self.row_of(admin_no)
+        if row is None:
+            self._append(admin_no, student.name, scores)
+        elif student.name == self.name_at(row):
+            for column, mark in zip(self.columns.values(), scores):
+                column[row] = _to_cell(mark)
+        else:
+            # Names are packed, so a renamed student means repacking the store
+            self._rebuild([(stored_admin_no, student.name, scores) if stored_admin_no == admin_no
+                           else (stored_admin_no, name, stored_scores)
+                           for stored_admin_no, name, stored_scores in self._rows()])
+
+    def __delitem__(self, admin_no):
+        row = self.row_of(admin_no)
+        if row is None:
+            raise KeyError(admin_no)
+        self.alive[row] = 0
+        for column in self.columns.values():
+            column[row] = NO_MARK
+        self.count -= 1
+        if len(self.alive) > 64 and self.count * 2 < len(self.alive):
+            self._rebuild(list(self._rows()))
+
+    def pop(self, admin_no, *default):
+        """Remove a student and return it as a plain, detached record."""
+        row = self.row_of(admin_no)
+        if row is None:
+            if default:
+                return default[0]
+            raise KeyError(admin_no)
+        student = DetachedStudent(admin_no, self.name_at(row), self.subjects,
+                                  StudentView(self, admin_no, row).scores)
+        del self[admin_no]
+        return student
+
+    def __iter__(self):
+        for row in range(len(self.alive)):
+            if self.alive[row]:
+                yield self.admin_no_at(row)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, admin_no):
+        return self.row_of(admin_no) is not None
+
+    def values(self):
+        """Iterate over a view of every student in row order."""
+        for row in range(len(self.alive)):
+            if self.alive[row]:
+                yield StudentView(self, self.admin_no_at(row), row)
+
+    def items(self):
+        """Iterate over (admin_no, view) pairs in row order."""
+        for student in self.values():
+            yield student.admin_no, student
+
+    def _append(self, admin_no, name, scores):
+        """Add a row at the end of every column and index it."""
+        row = len(self.alive)
+        self.admin_data += admin_no.encode('utf-8')
+        self.admin_offsets.append(len(self.admin_data))
+        self.name_data += name.encode('utf-8')
+        self.name_offsets.append(len(self.name_data))
+        for column, mark in zip(self.columns.values(), scores):
+            column.append(_to_cell(mark))
+        self.alive.append(1)
+        self.count += 1
+        if len(self.alive) * 2 > len(self.table):
+            self._grow_table()
+        else:
+            self._index_row(admin_no, row)
+
+    def _index_row(self, admin_no, row):
+        """Put a row in the first free slot of the hash table."""
+        mask = len(self.table) - 1
+        slot = hash(admin_no) & mask
+        while self.table[slot] != EMPTY:
+            slot = (slot + 1) & mask
+        self.table[slot] = row
+
+    def _grow_table(self):
+        """Double the hash table and index every live row again."""
+        self.table = array('l', [EMPTY]) * (len(self.table) * 2)
+        for row in range(len(self.alive)):
+            if self.alive[row]:
+                self._index_row(self.admin_no_at(row), row)
+
+    def _rows(self):
+        """Yield (admin_no, name, scores) for every student in row order."""
+        for row in range(len(self.alive)):
+            if self.alive[row]:
+                yield (self.admin_no_at(row), self.name_at(row),
+                       [column[row] for column in self.columns.values()])
+
+    def _rebuild(self, rows):
+        """Replace the contents of the store with rows of (admin_no, name, scores)."""
+        self._reset()
+        for admin_no, name, scores in rows:
+            self._append(admin_no, name, scores)
@@ -0,0 +1,98 @@
+"""
+District-wide statistics over many gradebook files.
+Each file is reduced to a PartialStatistics (mark histograms plus where each
+mark was first seen) in its own worker process, and the parts are merged in
+file order. The result is exactly what Gradebook.view_statistics would show
+for one gradebook holding the students of every file, in the same order.
+
+Run this file directly to time the merge with 1, 2, ... worker processes:
+    python district_stats.py school_a.json school_b.json ...
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from grade_stats import PartialStatistics
+from json_stream import iter_records
+
+SUBJECTS = ["Maths", "SST", "English", "Science"]
+
+
+def partial_statistics_of_file(filename, subjects=SUBJECTS):
+    """
+    Reduce one gradebook file to mergeable statistics. The file is streamed,
+    so workers never hold a whole gradebook in memory.
+
+    Args:
+        filename (str): Path to the gradebook JSON file
+        subjects (list): Subjects to keep statistics for
+
+    Returns:
+        PartialStatistics: Statistics of the students in the file
+    """
+    partial = PartialStatistics(subjects)
+    for _, info in iter_records(filename):
+        partial.add_marks(info["marks"])
+    return partial
+
+
+def combined_statistics(filenames, workers=None, subjects=SUBJECTS, extended=False):
+    """
+    Calculate statistics over every student of several gradebook files.
+
+    Args:
+        filenames (list): Paths to the gradebook JSON files
+        workers (int): Number of worker processes, by default one per CPU
+        subjects (list): Subjects to calculate statistics for
+        extended (bool): Also include the extended statistics
+
+    Returns:
+        dict: Statistical measures for each subject
+    """
+    combined = PartialStatistics(subjects)
+    if workers == 1:
+        for filename in filenames:
+            combined.merge(partial_statistics_of_file(filename, subjects))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map keeps file order, which the mode tie-break depends on
+            for partial in pool.map(partial_statistics_of_file, filenames,
+                                    [subjects] * len(filenames)):
+                combined.merge(partial)
+    return combined.statistics(extended)
+
+
+def benchmark(filenames, max_workers=None):
+    """
+    Time combined_statistics with 1 up to max_workers worker processes.
+
+    Args:
+        filenames (list): Paths to the gradebook JSON files
+        max_workers (int): Largest pool tried, by default the CPU count
+
+    Returns:
+        dict: Number of workers -> seconds taken
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    timings = {}
+    expected = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        result = combined_statistics(filenames, workers)
+        timings[workers] = time.perf_counter() - start
+        if expected is None:
+            expected = result
+        elif result != expected:
+            raise AssertionError(f"Statistics with {workers} workers differ from 1 worker")
+    return timings
+
+
+if __name__ == "__main__":
+    if not sys.argv[1:]:
+        print("Usage: python district_stats.py FILE [FILE ...]")
+        sys.exit(1)
+    timings = benchmark(sys.argv[1:])
+    for workers, elapsed in timings.items():
+        print(f"{workers} workers: {elapsed:.3f}s, speedup {timings[1] / elapsed:.2f}x")
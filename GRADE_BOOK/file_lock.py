@@ -0,0 +1,103 @@
+"""
+Advisory file locking shared by every process using the same gradebook.
+Uses fcntl.flock where available (shared or exclusive) and falls back to
+msvcrt.locking on Windows, where every lock is exclusive. Locks are
+re-entrant within a process, so an operation holding the lock can call
+another one that takes it too.
+"""
+
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    A class to represent an advisory lock on a lock file next to the data.
+    The lock file itself is never written to.
+    """
+    def __init__(self, filename):
+        """
+        Initialize the lock without taking it.
+
+        Args:
+            filename (str): Path to the lock file, created if missing
+        """
+        self.filename = filename
+        self._file = None
+        self._exclusive = False
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    def acquire(self, exclusive=True):
+        """
+        Take the lock, waiting for other processes to release it.
+
+        Args:
+            exclusive (bool): False to share the lock with other readers
+
+        Raises:
+            RuntimeError: If a shared lock held by this process would have
+                to be upgraded to an exclusive one
+        """
+        self._thread_lock.acquire()
+        if self._depth:
+            if exclusive and not self._exclusive:
+                self._thread_lock.release()
+                raise RuntimeError("A shared gradebook lock cannot be upgraded to an exclusive one")
+            self._depth += 1
+            return
+        try:
+            self._file = open(self.filename, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+        self._exclusive = exclusive
+        self._depth = 1
+
+    def release(self):
+        """Release the lock taken by the matching acquire()."""
+        self._depth -= 1
+        if not self._depth:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def exclusive(self):
+        """Context manager holding the lock exclusively."""
+        return _Held(self, True)
+
+    def shared(self):
+        """Context manager holding the lock shared with other readers."""
+        return _Held(self, False)
+
+
+class _Held:
+    """Context manager that holds a FileLock for the duration of a block."""
+    def __init__(self, lock, exclusive):
+        self.lock = lock
+        self.is_exclusive = exclusive
+
+    def __enter__(self):
+        self.lock.acquire(self.is_exclusive)
+        return self.lock
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
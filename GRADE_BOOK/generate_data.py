@@ -1,37 +1,176 @@
+"""
+Synthetic gradebook data for testing and benchmarking.
+Records are generated in fixed-size chunks, each from its own random
+generator seeded by (seed, chunk number), and written to disk chunk by
+chunk. The output therefore only depends on the arguments, not on the
+number of worker processes, and memory use stays bounded whatever the size.
+
+Formats:
+    json    the gradebook format read by Gradebook (previous_data.json)
+    jsonl   one {"admin_no", "name", "marks"} object per line (bulk_import.py)
+    csv     admin_no,name,<subject>,... (bulk_import.py)
+
+Examples:
+    python generate_data.py
+    python generate_data.py --size 10000000 --seed 7 --format jsonl \\
+        --output big.jsonl --workers 4
+"""
+
+import argparse
+import csv
+import io
 import json
 import random
-import names  # you'll need to install this: pip install names
-
-def generate_random_data(num_records=200):
-    """Generate random student records with marks."""
-    data = {}
-    
-    # Generate admin numbers from 2400711001 to 2400711200
-    admin_start = 2400711001
-    
-    for i in range(num_records):
-        admin_no = str(admin_start + i)
-        student_name = names.get_full_name()
-        
-        # Generate random marks between 40 and 100 for each subject
-        marks = {
-            "Maths": random.randint(40, 100),
-            "SST": random.randint(40, 100),
-            "English": random.randint(40, 100),
-            "Science": random.randint(40, 100)
-        }
-        
-        # Create student record
-        data[admin_no] = {
-            "name": student_name,
-            "marks": marks
-        }
-    
-    # Save to JSON file
-    with open('previous_data.json', 'w') as f:
-        json.dump(data, f, indent=4)
-    
+from multiprocessing import Pool
+
+SUBJECTS = ["Maths", "SST", "English", "Science"]
+
+# Records generated by one task; part of the output format, since each chunk
+# has its own random generator
+CHUNK_SIZE = 10000
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Daniel", "Nancy", "Matthew", "Lisa",
+    "Anthony", "Betty", "Mark", "Margaret", "Paul", "Sandra", "Steven", "Ashley",
+    "Andrew", "Kimberly", "Kenneth", "Emily", "Joshua", "Donna", "Kevin", "Michelle",
+    "Brian", "Carol", "George", "Amanda", "Edward", "Melissa", "Ronald", "Deborah",
+    "Timothy", "Stephanie", "Jason", "Rebecca", "Jeffrey", "Laura", "Ryan", "Sharon",
+    "Jacob", "Cynthia", "Gary", "Kathleen", "Nicholas", "Amy", "Eric", "Shirley",
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+    "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson",
+    "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Walker",
+    "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+    "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+    "Carter", "Roberts", "Okello", "Namubiru", "Mugisha", "Nakato", "Ssempala", "Achieng",
+]
+
+FORMATS = ('json', 'jsonl', 'csv')
+
+
+def generate_chunk(chunk, size, seed, subjects, admin_start, low, high, output_format):
+    """
+    Generate the records of one chunk as text in the output format.
+
+    Args:
+        chunk (int): Chunk number
+        size (int): Total number of records
+        seed (int): Seed of the whole data set
+        subjects (list): Subjects to give marks in
+        admin_start (int): Admin number of the first record
+        low (int): Lowest mark
+        high (int): Highest mark
+        output_format (str): 'json', 'jsonl' or 'csv'
+
+    Returns:
+        str: The chunk's records; for 'json' without the separator that
+            goes between chunks
+    """
+    rng = random.Random(f"{seed}:{chunk}")
+    first = chunk * CHUNK_SIZE
+    lines = []
+    rows = io.StringIO()
+    writer = csv.writer(rows, lineterminator='\n')
+    for number in range(first, min(first + CHUNK_SIZE, size)):
+        admin_no = str(admin_start + number)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        marks = {subject: rng.randint(low, high) for subject in subjects}
+        if output_format == 'json':
+            lines.append(f'    {json.dumps(admin_no)}: '
+                         f'{json.dumps({"name": name, "marks": marks})}')
+        elif output_format == 'jsonl':
+            lines.append(json.dumps({"admin_no": admin_no, "name": name, "marks": marks}) + '\n')
+        else:
+            writer.writerow([admin_no, name, *(marks[subject] for subject in subjects)])
+    if output_format == 'json':
+        return ',\n'.join(lines)
+    if output_format == 'jsonl':
+        return ''.join(lines)
+    return rows.getvalue()
+
+
+def _generate_chunk(arguments):
+    """Pool.imap wrapper around generate_chunk."""
+    return generate_chunk(*arguments)
+
+
+def generate_random_data(num_records=200, seed=0, subjects=SUBJECTS, output_format='json',
+                         output='previous_data.json', workers=1, admin_start=2400711001,
+                         low=40, high=100):
+    """
+    Generate random student records with marks and stream them to a file.
+
+    Args:
+        num_records (int): Number of students
+        seed (int): Seed; the same arguments always give the same file
+        subjects (list): Subjects to give marks in
+        output_format (str): 'json', 'jsonl' or 'csv'
+        output (str): Path of the file to write
+        workers (int): Number of processes generating chunks
+        admin_start (int): Admin number of the first student
+        low (int): Lowest mark
+        high (int): Highest mark
+
+    Raises:
+        ValueError: If the format or mark range is not supported
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown format {output_format!r}, expected one of {', '.join(FORMATS)}")
+    if not 0 <= low <= high <= 100:
+        raise ValueError("Marks must satisfy 0 <= low <= high <= 100")
+    chunks = (num_records + CHUNK_SIZE - 1) // CHUNK_SIZE
+    tasks = [(chunk, num_records, seed, list(subjects), admin_start, low, high, output_format)
+             for chunk in range(chunks)]
+    with open(output, 'w', newline='') as file:
+        if output_format == 'json':
+            file.write('{\n')
+        elif output_format == 'csv':
+            csv.writer(file, lineterminator='\n').writerow(['admin_no', 'name', *subjects])
+        if workers > 1:
+            with Pool(workers) as pool:
+                # Limit chunks in flight so memory stays bounded when writing is slow
+                window = workers * 2
+                for start in range(0, chunks, window):
+                    texts = pool.imap(_generate_chunk, tasks[start:start + window])
+                    for number, text in enumerate(texts, start):
+                        _write_chunk(file, text, output_format, number == 0)
+        else:
+            for number, task in enumerate(tasks):
+                _write_chunk(file, _generate_chunk(task), output_format, number == 0)
+        if output_format == 'json':
+            file.write('\n}\n')
+
     print(f"Successfully generated {num_records} random student records!")
 
+
+def _write_chunk(file, text, output_format, first):
+    """Write one chunk, separating it from the previous one in the JSON format."""
+    if output_format == 'json' and not first:
+        file.write(',\n')
+    file.write(text)
+
+
 if __name__ == "__main__":
-    generate_random_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate random gradebook data.")
+    parser.add_argument('--size', type=int, default=200, help="number of students")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--subjects', default=','.join(SUBJECTS),
+                        help="comma-separated subject names")
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--output', help="file to write (default previous_data.<format>)")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--admin-start', type=int, default=2400711001)
+    parser.add_argument('--min-mark', type=int, default=40)
+    parser.add_argument('--max-mark', type=int, default=100)
+    arguments = parser.parse_args()
+    generate_random_data(arguments.size, arguments.seed,
+                         [subject.strip() for subject in arguments.subjects.split(',')],
+                         arguments.format,
+                         arguments.output or f"previous_data.{arguments.format}",
+                         arguments.workers, arguments.admin_start,
+                         arguments.min_mark, arguments.max_mark)
@@ -0,0 +1,455 @@
+"""
+Grade history for the gradebook, kept for mark appeals.
+Every change is appended to a history file as one compact delta, a JSON
+array [time, admin_no, subject, old, new]:
+    [1760612345.123, "2400711001", "Maths", 54, 60]      marks changed
+    [1760612345.123, "2400711001", null, null, "Jane"]   student added
+    [1760612345.123, "2400711001", null, "Jane", null]   student deleted
+An added student also gets one delta per subject with old marks null, and
+a deleted one a delta per subject with new marks null.
+
+Unlike the journal, the history is never emptied. It starts with the first
+recorded change, from a checkpoint of the gradebook as it was just before.
+A delta is stamped with the time it is written; a shared gradebook holds
+its deltas until it commits, under its file lock, so that they follow the
+order of its journal records. Its deltas therefore carry the time of the
+commit, not of the edit: as_of gives what the shared file held at a time.
+To rebuild the gradebook as of a time without replaying every delta since
+the start, a checkpoint of the whole gradebook (a file in the format of the
+gradebook JSON file) is written once CHECKPOINT_EVERY deltas have piled up;
+a query starts from the last checkpoint before the time. Writing one costs
+as much as saving the gradebook, so it is never done by the change that
+crosses the threshold: the gradebook asks for it when it saves its data.
+Checkpoints are written and pruned under a lock file shared by every
+process. They are thinned out with age: the KEEP_CHECKPOINTS most recent
+are kept, then KEEP_CHECKPOINTS two checkpoints apart, four apart and so on,
+so that only a logarithmic number of them stay on disk while a query
+replays at most about 2 / KEEP_CHECKPOINTS of the deltas written since the
+time it asks for.
+
+The changes of one student are found through an index of the file offsets
+of their deltas, built on the first query and then extended with whatever
+was appended since, by this or another process.
+"""
+
+import json
+import os
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from file_lock import FileLock
+
+# Deltas between two checkpoints; a point-in-time query replays at most this many
+CHECKPOINT_EVERY = 10000
+
+# Checkpoints kept at each spacing: the most recent ones, then as many two apart, four apart...
+KEEP_CHECKPOINTS = 4
+
+
+class GradeHistory:
+    """
+    A class to represent the history file of a gradebook, its checkpoints
+    and the index of deltas by admin number.
+    """
+    def __init__(self, filename, current, checkpoint_every=CHECKPOINT_EVERY,
+                 keep_checkpoints=KEEP_CHECKPOINTS):
+        """
+        Initialize the history. Nothing is written until the first change.
+
+        Args:
+            filename (str): Path to the history file; checkpoints and the
+                lock file are written next to it
+            current (callable): Gives (admin_no, name, marks) of every
+                student as the gradebook is now, marks a dictionary of
+                subject -> marks; the history starts from it
+            checkpoint_every (int): Deltas between two checkpoints
+            keep_checkpoints (int): Checkpoints kept at each spacing, at least 1
+        """
+        self.filename = filename
+        self.current = current
+        self.checkpoint_every = checkpoint_every
+        self.keep_checkpoints = max(keep_checkpoints, 1)
+        self._lock = FileLock(filename + '.lock')
+        self.checkpoints = self._read_checkpoints()
+        self._file = None
+        self._last_time = 0.0
+        self._by_student = {}
+        self._indexed = 0
+        # Deltas appended since the last checkpoint, counted on the first append
+        self._since_checkpoint = None
+        # Deltas recorded but not written yet; None writes each change at once
+        self.held = None
+
+    def _read_checkpoints(self):
+        """Read the list of checkpoints, oldest first."""
+        checkpoints = []
+        try:
+            with open(self.filename + '.checkpoints', 'r') as file:
+                for line in file:
+                    if line.endswith('\n'):
+                        checkpoint = json.loads(line)
+                        checkpoint.setdefault('number', len(checkpoints))
+                        checkpoints.append(checkpoint)
+        except FileNotFoundError:
+            pass
+        return checkpoints
+
+    def _start(self, deltas):
+        """
+        Write the first checkpoint, from which the history starts, unless
+        another process has started it already. The gradebook has already
+        made the changes of the deltas about to be written, so they are
+        undone on the checkpoint.
+        """
+        with self._lock.exclusive():
+            self.checkpoints = self._read_checkpoints()
+            if self.checkpoints:
+                return
+            data = {admin_no: {"name": name, "marks": marks}
+                    for admin_no, name, marks in self.current()}
+            for when, admin_no, subject, old, new in reversed(deltas):
+                apply_delta(data, [when, admin_no, subject, new, old])
+            end = 0
+            for end, _ in self._read_deltas(0):
+                pass
+            self._write_checkpoint(data, self._now(), end)
+
+    def _now(self):
+        """Current time in seconds, rounded to milliseconds and never going back."""
+        self._last_time = max(self._last_time, round(time.time(), 3))
+        return self._last_time
+
+    def _append(self, deltas):
+        """Write deltas, or hold them back while holding."""
+        if self.held is not None:
+            self.held.extend(deltas)
+        else:
+            self._write(deltas)
+
+    def hold(self):
+        """
+        Hold the deltas recorded from now on until write_held. A shared
+        gradebook holds them until it has the file lock, so they are
+        written in the order its journal records are.
+        """
+        if self.held is None:
+            self.held = []
+
+    def write_held(self):
+        """Write the deltas held so far, and keep on holding."""
+        if self.held:
+            deltas, self.held = self.held, []
+            self._write(deltas)
+
+    @contextmanager
+    def batch(self):
+        """Write the deltas recorded inside the block together at its end."""
+        if self.held is not None:
+            yield
+            return
+        self.held = []
+        try:
+            yield
+        finally:
+            self.write_held()
+            self.held = None
+
+    def _write(self, deltas):
+        """
+        Append deltas, stamped with the time they are written, and count
+        them towards the next checkpoint. The first ones start the history.
+        """
+        if not self.checkpoints:
+            self._start(deltas)
+        now = self._now()
+        for delta in deltas:
+            delta[0] = now
+        if self._since_checkpoint is None:
+            last_offset = self.checkpoints[-1]['offset']
+            self._since_checkpoint = sum(1 for _ in self._read_deltas(last_offset))
+        if self._file is None:
+            self._file = open(self.filename, 'a', encoding='utf-8')
+            if self._file.tell() and not self._ends_with_newline():
+                # Finish a line torn by a crash so the next delta starts on its own
+                self._file.write('\n')
+        self._file.write(''.join(json.dumps(delta, separators=(',', ':')) + '\n'
+                                 for delta in deltas))
+        self._file.flush()
+        self._since_checkpoint += len(deltas)
+
+    @property
+    def checkpoint_due(self):
+        """bool: True once this process has appended enough deltas for a checkpoint."""
+        return self._since_checkpoint is not None and self._since_checkpoint >= self.checkpoint_every
+
+    def _ends_with_newline(self):
+        """Check whether the history on disk ends with a complete line."""
+        with open(self.filename, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b'\n'
+
+    def student_added(self, admin_no, name, marks):
+        """
+        Record a student joining the gradebook.
+
+        Args:
+            admin_no (str): Student's administrative number
+            name (str): Student's name
+            marks (dict): Subject -> marks of the new student
+        """
+        self._append([[None, admin_no, None, None, name]]
+                     + [[None, admin_no, subject, None, value] for subject, value in marks.items()])
+
+    def student_removed(self, admin_no, name, marks):
+        """
+        Record a student leaving the gradebook.
+
+        Args:
+            admin_no (str): Student's administrative number
+            name (str): Student's name
+            marks (dict): Subject -> marks the student had
+        """
+        self._append([[None, admin_no, subject, value, None] for subject, value in marks.items()]
+                     + [[None, admin_no, None, name, None]])
+
+    def marks_changed(self, admin_no, subject, old_marks, new_marks):
+        """
+        Record one mark change.
+
+        Args:
+            admin_no (str): Student's administrative number
+            subject (str): Subject name
+            old_marks (int): Marks before the change
+            new_marks (int): Marks after the change
+        """
+        self._append([[None, admin_no, subject, old_marks, new_marks]])
+
+    def flush(self):
+        """Make the appended deltas durable."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Close the history file if it is open."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _catch_up(self):
+        """
+        Index the deltas appended since the last call, by this or another
+        process. Only the new part of the file is read.
+        """
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(self._indexed)
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        # Still being written, or torn by a crash
+                        break
+                    try:
+                        admin_no = json.loads(line)[1]
+                    except (ValueError, IndexError):
+                        admin_no = None
+                    if admin_no is not None:
+                        self._by_student.setdefault(admin_no, []).append(self._indexed)
+                    self._indexed += len(line)
+        except FileNotFoundError:
+            pass
+
+    def _read_deltas(self, start, end=None):
+        """
+        Read the complete deltas between two file offsets.
+
+        Yields:
+            tuple: (offset just past the delta, delta)
+        """
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(start)
+                position = start
+                for line in file:
+                    if (end is not None and position >= end) or not line.endswith(b'\n'):
+                        return
+                    position += len(line)
+                    try:
+                        delta = json.loads(line)
+                    except ValueError:
+                        continue
+                    yield position, delta
+        except FileNotFoundError:
+            return
+
+    def _write_checkpoint(self, data, checkpoint_time, offset):
+        """
+        Write the gradebook as of a history file offset as a checkpoint,
+        then prune old checkpoints. Call with the lock held.
+        """
+        # Named by offset, so a name is never reused even after pruning
+        filename = f"{self.filename}.{offset}.json"
+        with open(filename + '.tmp', 'w') as file:
+            # One dumps call runs entirely in the C encoder, unlike json.dump
+            file.write(json.dumps(data))
+        os.replace(filename + '.tmp', filename)
+        # Numbered in the order they are written, counting pruned ones
+        number = self.checkpoints[-1]['number'] + 1 if self.checkpoints else 0
+        checkpoint = {"file": os.path.basename(filename), "time": checkpoint_time,
+                      "offset": offset, "number": number}
+        with open(self.filename + '.checkpoints', 'a') as file:
+            file.write(json.dumps(checkpoint) + '\n')
+        self.checkpoints.append(checkpoint)
+        self._since_checkpoint = 0
+        self._prune()
+
+    def _prune(self):
+        """Delete the checkpoints that is_kept no longer keeps."""
+        newest = self.checkpoints[-1]['number']
+        kept, dropped = [], []
+        for checkpoint in self.checkpoints:
+            keep = is_kept(checkpoint['number'], newest, self.keep_checkpoints)
+            (kept if keep else dropped).append(checkpoint)
+        if not dropped:
+            return
+        temp_filename = self.filename + '.checkpoints.tmp'
+        with open(temp_filename, 'w') as file:
+            file.write(''.join(json.dumps(checkpoint) + '\n' for checkpoint in kept))
+        os.replace(temp_filename, self.filename + '.checkpoints')
+        self.checkpoints = kept
+        directory = os.path.dirname(self.filename)
+        for checkpoint in dropped:
+            try:
+                os.remove(os.path.join(directory, checkpoint['file']))
+            except FileNotFoundError:
+                pass
+
+    def _load_checkpoint(self, checkpoint):
+        """Read the gradebook stored in a checkpoint."""
+        directory = os.path.dirname(self.filename)
+        with open(os.path.join(directory, checkpoint['file']), 'r') as file:
+            return json.load(file)
+
+    def checkpoint(self):
+        """
+        Write a checkpoint of the gradebook as of the end of the history, by
+        applying the deltas since the last checkpoint to it. Takes as long
+        as saving the gradebook; the gradebook calls it when it saves, once
+        checkpoint_due.
+        """
+        with self._lock.exclusive():
+            # Other processes sharing the history may have written checkpoints too
+            self.checkpoints = self._read_checkpoints()
+            if not self.checkpoints:
+                return
+            last = self.checkpoints[-1]
+            data = self._load_checkpoint(last)
+            checkpoint_time, end = last['time'], last['offset']
+            count = 0
+            for end, delta in self._read_deltas(last['offset']):
+                apply_delta(data, delta)
+                checkpoint_time = max(checkpoint_time, delta[0])
+                count += 1
+            if count >= self.checkpoint_every:
+                self._write_checkpoint(data, checkpoint_time, end)
+            else:
+                # Another process checkpointed meanwhile
+                self._since_checkpoint = count
+
+    def as_of(self, when):
+        """
+        Rebuild the gradebook as it was at a time, from the last checkpoint
+        before it and the deltas after that.
+
+        Args:
+            when (float): Time in seconds since the epoch
+
+        Returns:
+            dict or None: Admin number -> {"name", "marks"}, like the
+                gradebook JSON file, or None if the history starts later
+        """
+        # A checkpoint pruned by another process between reading the list and
+        # loading the file is retried with the new list
+        for attempt in range(3):
+            self.checkpoints = self._read_checkpoints()
+            times = [checkpoint['time'] for checkpoint in self.checkpoints]
+            position = bisect_right(times, when)
+            if not position:
+                return None
+            checkpoint = self.checkpoints[position - 1]
+            try:
+                data = self._load_checkpoint(checkpoint)
+                break
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+        end = self.checkpoints[position]['offset'] if position < len(self.checkpoints) else None
+        for _, delta in self._read_deltas(checkpoint['offset'], end):
+            if delta[0] <= when:
+                apply_delta(data, delta)
+        return data
+
+    def changes(self, admin_no):
+        """
+        Read every recorded change of one student, through the index.
+
+        Args:
+            admin_no (str): Student's administrative number
+
+        Returns:
+            list: {'time', 'subject', 'old', 'new'} per change, oldest
+                first; subject is None when the student was added or
+                deleted, with old and new the name (None when absent)
+        """
+        self._catch_up()
+        changes = []
+        offsets = self._by_student.get(admin_no, ())
+        if offsets:
+            with open(self.filename, 'rb') as file:
+                for offset in offsets:
+                    file.seek(offset)
+                    when, _, subject, old, new = json.loads(file.readline())
+                    changes.append({'time': when, 'subject': subject, 'old': old, 'new': new})
+        return changes
+
+
+def is_kept(number, newest, per_spacing):
+    """
+    Decide whether a checkpoint is kept. The per_spacing most recent are
+    kept, then per_spacing of those two apart, four apart and so on. The
+    spacing only grows as newer checkpoints are written, so a checkpoint
+    dropped once would never be kept again, and the first one, number 0,
+    is always kept.
+
+    Args:
+        number (int): Number of the checkpoint, counted from 0
+        newest (int): Number of the most recent checkpoint
+        per_spacing (int): Checkpoints kept at each spacing
+
+    Returns:
+        bool: True if the checkpoint is kept
+    """
+    age = newest - number
+    spacing, limit = 1, per_spacing
+    while age >= limit:
+        spacing *= 2
+        limit += per_spacing * spacing
+    return number % spacing == 0
+
+
+def apply_delta(data, delta):
+    """
+    Apply one delta to a gradebook in the JSON file format.
+
+    Args:
+        data (dict): Admin number -> {"name", "marks"}, changed in place
+        delta (list): [time, admin_no, subject, old, new]
+    """
+    _, admin_no, subject, _, new = delta
+    if subject is None:
+        if new is None:
+            data.pop(admin_no, None)
+        else:
+            data[admin_no] = {"name": new, "marks": {}}
+    elif admin_no in data and new is not None:
+        data[admin_no]["marks"][subject] = new
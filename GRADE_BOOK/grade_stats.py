@@ -0,0 +1,604 @@
+"""
+Incrementally maintained grade statistics.
+Marks are integers between 0 and 100, so each subject keeps a 101-bucket
+count histogram together with the sum and number of marks. Statistics are
+then read from the histogram instead of walking every student.
+
+Histograms can also be built in one pass from a whole column of marks;
+NumPy is used for that when it is installed. Either way every statistic is
+finished from the 101 buckets with the same integer arithmetic, so both
+paths give identical numbers.
+"""
+
+import math
+from array import array
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MARK_RANGE = 101
+
+# Lowest mark that counts as a pass
+PASS_MARK = 50
+
+
+def is_valid_mark(mark):
+    """
+    Check whether a mark can be counted in a histogram.
+
+    Args:
+        mark: Value stored as a student's marks for a subject
+
+    Returns:
+        bool: True for integer marks between 0 and 100
+    """
+    return isinstance(mark, int) and not isinstance(mark, bool) and 0 <= mark <= 100
+
+
+def total_marks(scores):
+    """
+    Args:
+        scores (sequence): A student's marks in subject order
+
+    Returns:
+        int: Sum of the valid marks; missing or invalid marks count as 0
+    """
+    return sum(mark for mark in scores if is_valid_mark(mark))
+
+
+class SubjectHistogram:
+    """
+    A class to represent the distribution of marks in one subject.
+    Keeps one counter per possible mark plus the running sum and count.
+    """
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * MARK_RANGE
+        self.total = 0
+        self.count = 0
+
+    def add(self, mark):
+        """
+        Count a mark; invalid marks are ignored.
+
+        Args:
+            mark (int): Mark to count
+        """
+        if is_valid_mark(mark):
+            self.counts[mark] += 1
+            self.total += mark
+            self.count += 1
+
+    def remove(self, mark):
+        """
+        Stop counting a mark previously passed to add().
+
+        Args:
+            mark (int): Mark to remove
+        """
+        if is_valid_mark(mark):
+            self.counts[mark] -= 1
+            self.total -= mark
+            self.count -= 1
+
+    def average(self):
+        """
+        Returns:
+            str or None: Average formatted to 4 decimal places, None if empty
+        """
+        return format(self.total / self.count, '.4f') if self.count else None
+
+    def maximum(self):
+        """
+        Returns:
+            int or None: Highest mark counted, None if empty
+        """
+        for mark in range(MARK_RANGE - 1, -1, -1):
+            if self.counts[mark]:
+                return mark
+        return None
+
+    def minimum(self):
+        """
+        Returns:
+            int or None: Lowest mark counted, None if empty
+        """
+        for mark in range(MARK_RANGE):
+            if self.counts[mark]:
+                return mark
+        return None
+
+    def mode(self, ordered_marks=()):
+        """
+        Find the most common mark and how often it occurs.
+        Like statistics.mode, ties go to the mark that occurs first in the
+        data, so only when there is a tie is ordered_marks consumed, and then
+        only until the first tied mark is seen.
+
+        Args:
+            ordered_marks (iterable): Marks in the order the students are stored
+
+        Returns:
+            tuple: (mode, frequency), or (None, 0) if the histogram is empty
+        """
+        frequency = max(self.counts)
+        if not frequency:
+            return None, 0
+        tied = [mark for mark in range(MARK_RANGE) if self.counts[mark] == frequency]
+        if len(tied) > 1:
+            tied = set(tied)
+            for mark in ordered_marks:
+                if mark in tied and is_valid_mark(mark):
+                    return mark, frequency
+        return min(tied), frequency
+
+    def order_statistic(self, position):
+        """
+        Find the mark at a position of the sorted marks.
+
+        Args:
+            position (int): Zero-based position, less than count
+
+        Returns:
+            int: The mark at that position
+        """
+        seen = 0
+        for mark in range(MARK_RANGE):
+            seen += self.counts[mark]
+            if seen > position:
+                return mark
+        raise IndexError(position)
+
+    def quantile(self, numerator, denominator):
+        """
+        Find a quantile by linear interpolation between the closest ranks
+        (the default method of numpy.percentile and statistics.quantiles
+        with method='inclusive').
+
+        Args:
+            numerator (int): Numerator of the quantile, e.g. 1 for a quarter
+            denominator (int): Denominator of the quantile, e.g. 4 for a quarter
+
+        Returns:
+            float or None: Quantile, None if the histogram is empty
+        """
+        if not self.count:
+            return None
+        position, remainder = divmod((self.count - 1) * numerator, denominator)
+        lower = self.order_statistic(position)
+        if not remainder:
+            return float(lower)
+        upper = self.order_statistic(position + 1)
+        return lower + (upper - lower) * remainder / denominator
+
+    def std_dev(self):
+        """
+        Returns:
+            float or None: Population standard deviation, None if empty
+        """
+        if not self.count:
+            return None
+        sum_of_squares = sum(mark * mark * count for mark, count in enumerate(self.counts))
+        return math.sqrt((self.count * sum_of_squares - self.total * self.total)
+                         / (self.count * self.count))
+
+    def pass_rate(self, pass_mark=PASS_MARK):
+        """
+        Args:
+            pass_mark (int): Lowest passing mark
+
+        Returns:
+            float or None: Fraction of marks at or above pass_mark, None if empty
+        """
+        if not self.count:
+            return None
+        return sum(self.counts[pass_mark:]) / self.count
+
+    def merge(self, other):
+        """
+        Add the marks counted by another histogram to this one.
+
+        Args:
+            other (SubjectHistogram): Histogram to add
+        """
+        for mark in range(MARK_RANGE):
+            self.counts[mark] += other.counts[mark]
+        self.total += other.total
+        self.count += other.count
+
+    @classmethod
+    def from_marks(cls, marks):
+        """
+        Build a histogram from a whole column of marks in one pass.
+        Uses numpy.bincount when NumPy is installed and the column is an
+        array, a memoryview or a NumPy array; invalid marks are skipped.
+
+        Args:
+            marks (iterable): Marks in any order
+
+        Returns:
+            SubjectHistogram: Histogram of the valid marks
+        """
+        histogram = cls()
+        if numpy is not None and isinstance(marks, (array, memoryview, numpy.ndarray)):
+            values = numpy.asarray(marks)
+            values = values[(values >= 0) & (values <= 100)].astype(numpy.intp)
+            histogram.counts = numpy.bincount(values, minlength=MARK_RANGE).tolist()
+        else:
+            for mark, count in Counter(marks).items():
+                if is_valid_mark(mark):
+                    histogram.counts[mark] = count
+        histogram.count = sum(histogram.counts)
+        histogram.total = sum(mark * count for mark, count in enumerate(histogram.counts))
+        return histogram
+
+
+class GradeHistograms:
+    """
+    A class to keep one SubjectHistogram per subject in step with a gradebook.
+    The gradebook calls student_added, student_removed and marks_changed
+    whenever its students change. Histograms are kept in subject id order and
+    read a student's marks from its scores list, so no subject name is
+    looked up per student.
+    """
+    def __init__(self, subjects):
+        """
+        Initialize empty histograms.
+
+        Args:
+            subjects (iterable): Subject names in id order, e.g. a SubjectRegistry
+        """
+        self.subjects = list(subjects)
+        self.histograms = [SubjectHistogram() for _ in self.subjects]
+        self._ids = {subject: subject_id for subject_id, subject in enumerate(self.subjects)}
+
+    def student_added(self, student):
+        """Count all marks of a student that joined the gradebook."""
+        # SubjectHistogram.add inlined: this runs for every mark of every student loaded
+        for histogram, mark in zip(self.histograms, student.scores):
+            if is_valid_mark(mark):
+                histogram.counts[mark] += 1
+                histogram.total += mark
+                histogram.count += 1
+
+    def student_removed(self, student):
+        """Stop counting the marks of a student that left the gradebook."""
+        for histogram, mark in zip(self.histograms, student.scores):
+            histogram.remove(mark)
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """Move a student's mark to its new bucket."""
+        subject_id = self._ids.get(subject)
+        if subject_id is not None:
+            histogram = self.histograms[subject_id]
+            histogram.remove(old_marks)
+            histogram.add(new_marks)
+
+    def count_columns(self, columns):
+        """
+        Count whole columns of marks at once, e.g. from a mapped snapshot.
+
+        Args:
+            columns (dict): Subject name -> marks of every student
+        """
+        for subject, histogram in zip(self.subjects, self.histograms):
+            histogram.merge(SubjectHistogram.from_marks(columns[subject]))
+
+    def __getitem__(self, subject):
+        return self.histograms[self._ids[subject]]
+
+
+class CumulativeCounts:
+    """
+    A class to count integer keys between 0 and size - 1 in a Fenwick tree,
+    so that the number of keys at or below a key, and the key at a position
+    of the sorted keys, are both found in O(log size), and a key is added or
+    removed in O(log size) too. For marks that is 7 steps instead of up to
+    101 for summing a histogram.
+    """
+    def __init__(self, size, counts=None):
+        """
+        Initialize the counts.
+
+        Args:
+            size (int): Number of possible keys
+            counts (sequence): Starting count of each key, all 0 if not given
+        """
+        self.tree = [0] * (size + 1)
+        self.count = 0
+        if counts is not None:
+            # Linear Fenwick construction: push each node's sum to its parent
+            for key, key_count in enumerate(counts):
+                position = key + 1
+                self.tree[position] += key_count
+                parent = position + (position & -position)
+                if parent <= size:
+                    self.tree[parent] += self.tree[position]
+            self.count = sum(counts)
+
+    def add(self, key, delta=1):
+        """
+        Args:
+            key (int): Key to count
+            delta (int): Change in its count, -1 to remove one
+        """
+        position = key + 1
+        tree = self.tree
+        while position < len(tree):
+            tree[position] += delta
+            position += position & -position
+        self.count += delta
+
+    def count_up_to(self, key):
+        """
+        Args:
+            key (int): A key; below 0 counts nothing
+
+        Returns:
+            int: Number of keys counted that are at most key
+        """
+        count = 0
+        position = min(key + 1, len(self.tree) - 1)
+        while position > 0:
+            count += self.tree[position]
+            position -= position & -position
+        return count
+
+    def order_statistic(self, position):
+        """
+        Find the key at a position of the sorted keys.
+
+        Args:
+            position (int): Zero-based position, less than count
+
+        Returns:
+            int: The key at that position
+
+        Raises:
+            IndexError: If the position is out of range
+        """
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        tree = self.tree
+        index = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            following = index + step
+            if following < len(tree) and tree[following] <= position:
+                index = following
+                position -= tree[following]
+            step >>= 1
+        return index
+
+    def percentile_rank(self, key):
+        """
+        Args:
+            key (int): A key, e.g. one student's marks
+
+        Returns:
+            float or None: Percentage of the keys below it, counting equal
+                keys as half below, None if nothing is counted
+        """
+        if not self.count:
+            return None
+        below = self.count_up_to(key - 1)
+        equal = self.count_up_to(key) - below
+        return 100 * (below + equal / 2) / self.count
+
+    def percentile(self, percent):
+        """
+        Find a percentile by linear interpolation between the closest ranks,
+        like SubjectHistogram.quantile.
+
+        Args:
+            percent (float): Percentile between 0 and 100
+
+        Returns:
+            float or None: The key at that percentile, None if nothing is
+                counted
+
+        Raises:
+            ValueError: If percent is not between 0 and 100
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not self.count:
+            return None
+        position, fraction = divmod((self.count - 1) * percent / 100, 1)
+        lower = self.order_statistic(int(position))
+        if not fraction:
+            return float(lower)
+        upper = self.order_statistic(int(position) + 1)
+        return lower + (upper - lower) * fraction
+
+
+class MarkDistributions:
+    """
+    A class to keep cumulative mark counts per subject, and of total marks,
+    in step with a gradebook, to answer percentile queries. The gradebook
+    calls student_added, student_removed and marks_changed whenever its
+    students change. Invalid marks are not counted in a subject; in the
+    total they count as 0, as in the rankings.
+    """
+    def __init__(self, subjects, students=()):
+        """
+        Initialize the counts from the students already in a gradebook.
+
+        Args:
+            subjects (iterable): Subject names in id order
+            students (iterable): Student objects to count
+        """
+        self.subjects = list(subjects)
+        self._ids = {subject: subject_id for subject_id, subject in enumerate(self.subjects)}
+        subject_counts = [[0] * MARK_RANGE for _ in self.subjects]
+        total_counts = [0] * ((MARK_RANGE - 1) * len(self.subjects) + 1)
+        for student in students:
+            scores = student.scores
+            for counts, mark in zip(subject_counts, scores):
+                if is_valid_mark(mark):
+                    counts[mark] += 1
+            total_counts[total_marks(scores)] += 1
+        self.distributions = [CumulativeCounts(MARK_RANGE, counts) for counts in subject_counts]
+        self.total = CumulativeCounts(len(total_counts), total_counts)
+
+    def distribution(self, subject=None):
+        """
+        Args:
+            subject (str): Subject name, None for total marks
+
+        Returns:
+            CumulativeCounts: Counts of the subject's marks or of total marks
+
+        Raises:
+            KeyError: If the subject is unknown
+        """
+        return self.total if subject is None else self.distributions[self._ids[subject]]
+
+    def student_added(self, student):
+        """Count the marks of a student that joined the gradebook."""
+        scores = student.scores
+        for distribution, mark in zip(self.distributions, scores):
+            if is_valid_mark(mark):
+                distribution.add(mark)
+        self.total.add(total_marks(scores))
+
+    def student_removed(self, student):
+        """Stop counting the marks of a student that left the gradebook."""
+        scores = student.scores
+        for distribution, mark in zip(self.distributions, scores):
+            if is_valid_mark(mark):
+                distribution.add(mark, -1)
+        self.total.add(total_marks(scores), -1)
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """Move a student's mark, and total, to their new counts."""
+        subject_id = self._ids.get(subject)
+        if subject_id is None:
+            return
+        distribution = self.distributions[subject_id]
+        if is_valid_mark(old_marks):
+            distribution.add(old_marks, -1)
+        if is_valid_mark(new_marks):
+            distribution.add(new_marks)
+        # The student's scores already hold the new mark
+        new_total = total_marks(student.scores)
+        old_total = (new_total - (new_marks if is_valid_mark(new_marks) else 0)
+                     + (old_marks if is_valid_mark(old_marks) else 0))
+        if old_total != new_total:
+            self.total.add(old_total, -1)
+            self.total.add(new_total)
+
+
+class PartialStatistics:
+    """
+    A class to represent mergeable statistics of one part of a roster, such
+    as one gradebook file. Besides a histogram per subject it remembers the
+    position where each mark was first seen, so that merged parts break mode
+    ties exactly like one pass over all the students would.
+    """
+    def __init__(self, subjects):
+        """
+        Initialize empty statistics.
+
+        Args:
+            subjects (list): Subject names to keep statistics for
+        """
+        self.histograms = {subject: SubjectHistogram() for subject in subjects}
+        self.first_seen = {subject: [None] * MARK_RANGE for subject in subjects}
+        self.size = 0
+
+    def add_marks(self, marks):
+        """
+        Count the marks of the next student of this part.
+
+        Args:
+            marks (dict): Subject -> marks of the student
+        """
+        for subject, histogram in self.histograms.items():
+            mark = marks.get(subject)
+            if is_valid_mark(mark):
+                histogram.add(mark)
+                if self.first_seen[subject][mark] is None:
+                    self.first_seen[subject][mark] = self.size
+        self.size += 1
+
+    def merge(self, other):
+        """
+        Append the statistics of the part that comes after this one.
+
+        Args:
+            other (PartialStatistics): Statistics of the following part
+        """
+        for subject, histogram in self.histograms.items():
+            histogram.merge(other.histograms[subject])
+            first_seen = self.first_seen[subject]
+            for mark, position in enumerate(other.first_seen[subject]):
+                if first_seen[mark] is None and position is not None:
+                    first_seen[mark] = self.size + position
+        self.size += other.size
+
+    def statistics(self, extended=False):
+        """
+        Calculate the statistics of everything merged so far, with the same
+        keys and values as Gradebook.view_statistics.
+
+        Args:
+            extended (bool): Also include the extended statistics
+
+        Returns:
+            dict: Statistical measures for each subject
+        """
+        grade_stats = {}
+        for subject, histogram in self.histograms.items():
+            # Marks in order of first appearance are all a mode tie-break needs
+            ordered_marks = [mark for position, mark in sorted(
+                (position, mark) for mark, position in enumerate(self.first_seen[subject])
+                if position is not None)]
+            grade_stats.update(subject_statistics(subject, histogram, ordered_marks, extended))
+        return grade_stats
+
+
+def _format(value):
+    """Format a statistic like the average: 4 decimal places, None stays None."""
+    return None if value is None else format(value, '.4f')
+
+
+def subject_statistics(subject, histogram, ordered_marks=(), extended=False):
+    """
+    Calculate the statistics of one subject from its histogram.
+
+    Args:
+        subject (str): Subject name, used in the keys
+        histogram (SubjectHistogram): Marks of the subject
+        ordered_marks (iterable): Marks in stored order, to break mode ties
+        extended (bool): Also include median, standard deviation, quartiles
+            and pass rate
+
+    Returns:
+        dict: Statistical measures for the subject
+    """
+    if histogram.count:
+        mode_value, mode_freq = histogram.mode(ordered_marks)
+    else:
+        mode_value, mode_freq = "No mode", "No Frequency"
+
+    stats = {
+        f'Average_{subject}': histogram.average(),
+        f'Max_{subject}': histogram.maximum(),
+        f'Min_{subject}': histogram.minimum(),
+        f'Mode_{subject}': mode_value,
+        f'Mode_Freq_{subject}': mode_freq
+    }
+    if extended:
+        stats.update({
+            f'Median_{subject}': _format(histogram.quantile(1, 2)),
+            f'Std_Dev_{subject}': _format(histogram.std_dev()),
+            f'Q1_{subject}': _format(histogram.quantile(1, 4)),
+            f'Q3_{subject}': _format(histogram.quantile(3, 4)),
+            f'Pass_Rate_{subject}': _format(histogram.pass_rate())
+        })
+    return stats
+
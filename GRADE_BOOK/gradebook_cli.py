@@ -0,0 +1,347 @@
+"""
+Non-interactive command line for the gradebook, for scripts and cron jobs.
+Every command prints one JSON document and exits; nothing is animated and
+colorama is never imported. Errors are printed as {"error": ...} with exit
+status 1 (2 for a malformed command line).
+
+    python gradebook_cli.py stats [--extended]
+    python gradebook_cli.py grades 2400711001
+    python gradebook_cli.py add 2400711999 "Jane Doe" Maths=80 SST=75 English=90 Science=85
+    python gradebook_cli.py set-mark 2400711999 Maths 82
+    python gradebook_cli.py delete 2400711999
+    python gradebook_cli.py roster
+    python gradebook_cli.py top [--subject Maths] [-k 10]
+    python gradebook_cli.py rank 2400711001 [--subject Maths]
+    python gradebook_cli.py percentile 2400711001
+    python gradebook_cli.py percentile --at 10,50,90 [--subject Maths]
+    python gradebook_cli.py --history history 2400711001
+    python gradebook_cli.py --history as-of 2024-05-31T14:30 [2400711001]
+    python gradebook_cli.py query Maths:0-49 Science:60-70 [--any]
+    python gradebook_cli.py report-cards cards.csv [--format csv|jsonl|text] [--workers 4]
+
+The gradebook is opened like the interactive program: by default the whole
+file is rewritten after every change, --journaled appends changes to the
+journal instead, and --shared also coordinates with other processes using
+the file, so the two programs can be used on the same file at once.
+--history records every change for the history and as-of commands.
+"""
+
+import argparse
+import json
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from bulk_import import validate_record
+
+
+class CommandError(Exception):
+    """A command that cannot be carried out; printed as {"error": ...}."""
+
+
+def open_gradebook(filename='previous_data.json', storage='dict', subjects=None,
+                   journaled=False, shared=False, history=False):
+    """
+    Open a gradebook the way the interactive program does, minus the
+    background loading that only helps while a menu is on screen.
+
+    Args:
+        filename (str): Path to the gradebook data file
+        storage (str): Storage engine, see Gradebook
+        subjects (list): Subjects of a new gradebook, see Gradebook
+        journaled (bool): Append changes to the journal, see Gradebook
+        shared (bool): Share the file with other processes, see Gradebook;
+            implies journaled
+        history (bool): Record every change in the grade history
+
+    Returns:
+        Gradebook: The loaded gradebook
+    """
+    # Loading reports a missing file with print(); keep stdout for the JSON result
+    with redirect_stdout(sys.stderr):
+        return Gradebook(filename, journaled=journaled or shared, storage=storage, shared=shared,
+                         subjects=subjects, history=history)
+
+
+def _grades(gradebook, admin_no):
+    """Get the name and marks of one student."""
+    student = gradebook.get_student(admin_no)
+    if student is None:
+        raise CommandError("Student does not exist in the system!")
+    return {"admin_no": admin_no, "name": student.name, "marks": dict(student.marks)}
+
+
+def _parse_marks(assignments, subjects):
+    """Turn SUBJECT=MARKS arguments into a marks dictionary."""
+    marks = {subject: 0 for subject in subjects}
+    for assignment in assignments:
+        subject, separator, value = assignment.partition('=')
+        if not separator or subject not in subjects:
+            raise CommandError(f"Expected SUBJECT=MARKS with a subject in: {', '.join(subjects)}")
+        try:
+            marks[subject] = int(value)
+        except ValueError:
+            raise CommandError("marks must be a whole number between 0 and 100")
+    return marks
+
+
+def command_stats(gradebook, arguments):
+    """Statistics of every subject."""
+    return gradebook.view_statistics(arguments.extended)
+
+
+def command_grades(gradebook, arguments):
+    """Name and marks of one student."""
+    return _grades(gradebook, arguments.admin_no)
+
+
+def command_add(gradebook, arguments):
+    """Add a student with the given marks."""
+    marks = _parse_marks(arguments.marks, gradebook.subjects)
+    reason = validate_record(arguments.admin_no, arguments.name, marks, gradebook.subjects)
+    if reason is not None:
+        raise CommandError(reason)
+    student = Student(arguments.admin_no, arguments.name, gradebook.subjects)
+    student.marks = marks
+    if not gradebook.add_student(student):
+        raise CommandError("A student with that admin number already exists.")
+    return {"admin_no": arguments.admin_no, "name": arguments.name, "marks": marks}
+
+
+def command_delete(gradebook, arguments):
+    """Delete a student."""
+    if not gradebook.delete_student(arguments.admin_no):
+        raise CommandError("Student does not exist in the system!")
+    return {"admin_no": arguments.admin_no, "deleted": True}
+
+
+def command_set_mark(gradebook, arguments):
+    """Change one mark through the same validation as a bulk update."""
+    report = gradebook.update_marks([(arguments.admin_no, arguments.subject, arguments.marks)])
+    if report['rejected']:
+        raise CommandError(report['rejected'][0][2])
+    return _grades(gradebook, arguments.admin_no)
+
+
+def command_roster(gradebook, arguments):
+    """Admin number and name of every student."""
+    return gradebook.print_gradebook()
+
+
+def command_top(gradebook, arguments):
+    """Best students in a subject or by total marks."""
+    if arguments.subject is not None and arguments.subject not in gradebook.subjects:
+        raise CommandError(f"unknown subject {arguments.subject!r}")
+    return gradebook.top_students(arguments.subject, arguments.k)
+
+
+def command_rank(gradebook, arguments):
+    """Place of one student in a subject or by total marks."""
+    if arguments.subject is not None and arguments.subject not in gradebook.subjects:
+        raise CommandError(f"unknown subject {arguments.subject!r}")
+    place = gradebook.student_rank(arguments.admin_no, arguments.subject)
+    if place is None:
+        raise CommandError("Student does not exist in the system or has no marks in that subject!")
+    return dict(admin_no=arguments.admin_no, **place)
+
+
+def command_percentile(gradebook, arguments):
+    """Percentiles of one student, or marks at percentiles of the class."""
+    if arguments.subject is not None and arguments.subject not in gradebook.subjects:
+        raise CommandError(f"unknown subject {arguments.subject!r}")
+    if arguments.admin_no is not None:
+        percentiles = gradebook.student_percentiles(arguments.admin_no)
+        if percentiles is None:
+            raise CommandError("Student does not exist in the system!")
+        return dict(admin_no=arguments.admin_no, **percentiles)
+    try:
+        points = [float(point) for point in arguments.at.split(',')]
+    except ValueError:
+        raise CommandError("--at must be comma-separated numbers between 0 and 100")
+    return {str(point).removesuffix('.0'): gradebook.percentile(point, arguments.subject)
+            for point in points}
+
+
+def _require_history(gradebook):
+    """Refuse history commands when the gradebook keeps no history."""
+    if gradebook.history is None:
+        raise CommandError("Grade history is off; run with --history")
+
+
+def command_history(gradebook, arguments):
+    """Every recorded change of one student."""
+    _require_history(gradebook)
+    return [dict(change, time=datetime.fromtimestamp(change['time']).isoformat(
+                timespec='milliseconds'))
+            for change in gradebook.mark_history(arguments.admin_no)]
+
+
+def command_as_of(gradebook, arguments):
+    """The gradebook, or one student, as it was at a point in time."""
+    _require_history(gradebook)
+    try:
+        when = datetime.fromisoformat(arguments.when)
+    except ValueError:
+        raise CommandError("expected a time like 2024-05-31 or 2024-05-31T14:30")
+    data = gradebook.grades_as_of(when)
+    if data is None:
+        raise CommandError("The grade history starts after that time.")
+    if arguments.admin_no is None:
+        return data
+    if arguments.admin_no not in data:
+        raise CommandError("Student was not in the gradebook at that time.")
+    return dict(admin_no=arguments.admin_no, **data[arguments.admin_no])
+
+
+def _parse_range(condition, subjects):
+    """Turn a SUBJECT:LO-HI argument into (subject, lo, hi)."""
+    subject, _, marks = condition.rpartition(':')
+    lo, separator, hi = marks.partition('-')
+    try:
+        if subject not in subjects or not separator:
+            raise ValueError
+        return subject, int(lo), int(hi)
+    except ValueError:
+        raise CommandError(f"Expected SUBJECT:LO-HI with a subject in: {', '.join(subjects)}")
+
+
+def command_query(gradebook, arguments):
+    """Students whose marks are in the given ranges."""
+    selection = None
+    for condition in arguments.conditions:
+        matches = gradebook.query(*_parse_range(condition, gradebook.subjects))
+        if selection is None:
+            selection = matches
+        else:
+            selection = selection | matches if arguments.any else selection & matches
+    students = [{"admin_no": admin_no, "name": name}
+                for admin_no, name in gradebook.student_names(selection)]
+    return {"count": len(students), "students": students}
+
+
+def command_report_cards(gradebook, arguments):
+    """Write a report card for every student."""
+    written = gradebook.export_report_cards(arguments.output, arguments.format, arguments.workers)
+    return {"output": arguments.output, "format": arguments.format, "written": written}
+
+
+def build_parser():
+    """
+    Returns:
+        argparse.ArgumentParser: Parser of the command line, each
+            subcommand's handler stored as 'command'
+    """
+    parser = argparse.ArgumentParser(description="Query and update a gradebook non-interactively.")
+    parser.add_argument('--file', default='previous_data.json', help="gradebook data file")
+    parser.add_argument('--storage', default='dict', help="storage engine, see Gradebook")
+    parser.add_argument('--subjects', help="comma-separated subjects of a new gradebook file")
+    parser.add_argument('--pretty', action='store_true', help="indent the JSON output")
+    parser.add_argument('--journaled', action='store_true',
+                        help="append changes to the journal instead of rewriting the file")
+    parser.add_argument('--shared', action='store_true',
+                        help="share the file with other processes (implies --journaled)")
+    parser.add_argument('--history', action='store_true',
+                        help="record every change in the grade history; needed by history and as-of")
+    commands = parser.add_subparsers(dest='name', required=True)
+
+    stats = commands.add_parser('stats', help="statistics of every subject")
+    stats.add_argument('--extended', action='store_true',
+                       help="also median, standard deviation, quartiles and pass rate")
+    stats.set_defaults(command=command_stats)
+
+    grades = commands.add_parser('grades', help="marks of one student")
+    grades.add_argument('admin_no')
+    grades.set_defaults(command=command_grades)
+
+    add = commands.add_parser('add', help="add a student")
+    add.add_argument('admin_no')
+    add.add_argument('name')
+    add.add_argument('marks', nargs='*', metavar='SUBJECT=MARKS',
+                     help="marks of the new student; missing subjects get 0")
+    add.set_defaults(command=command_add)
+
+    delete = commands.add_parser('delete', help="delete a student")
+    delete.add_argument('admin_no')
+    delete.set_defaults(command=command_delete)
+
+    set_mark = commands.add_parser('set-mark', help="change one mark of a student")
+    set_mark.add_argument('admin_no')
+    set_mark.add_argument('subject')
+    set_mark.add_argument('marks', type=int)
+    set_mark.set_defaults(command=command_set_mark)
+
+    roster = commands.add_parser('roster', help="admin number and name of every student")
+    roster.set_defaults(command=command_roster)
+
+    top = commands.add_parser('top', help="best students in a subject or by total marks")
+    top.add_argument('--subject', help="subject to rank by, total marks if not given")
+    top.add_argument('-k', type=int, default=10, help="number of students")
+    top.set_defaults(command=command_top)
+
+    rank = commands.add_parser('rank', help="class rank of one student")
+    rank.add_argument('admin_no')
+    rank.add_argument('--subject', help="subject to rank by, total marks if not given")
+    rank.set_defaults(command=command_rank)
+
+    percentile = commands.add_parser('percentile',
+                                     help="percentiles of a student, or of the whole class")
+    percentile.add_argument('admin_no', nargs='?',
+                            help="student whose percentiles to show; the class's if not given")
+    percentile.add_argument('--at', default='10,25,50,75,90',
+                            help="comma-separated percentiles of the class to show")
+    percentile.add_argument('--subject', help="subject of the class percentiles, total marks if not given")
+    percentile.set_defaults(command=command_percentile)
+
+    history = commands.add_parser('history', help="every recorded change of one student")
+    history.add_argument('admin_no')
+    history.set_defaults(command=command_history)
+
+    as_of = commands.add_parser('as-of', help="the gradebook as it was at a point in time")
+    as_of.add_argument('when', help="ISO date or date and time, e.g. 2024-05-31T14:30")
+    as_of.add_argument('admin_no', nargs='?', help="only this student")
+    as_of.set_defaults(command=command_as_of)
+
+    query = commands.add_parser('query', help="students with marks in given ranges")
+    query.add_argument('conditions', nargs='+', metavar='SUBJECT:LO-HI',
+                       help="inclusive range of marks in a subject, e.g. Maths:0-49")
+    query.add_argument('--any', action='store_true',
+                       help="match any condition instead of all of them")
+    query.set_defaults(command=command_query)
+
+    report_cards = commands.add_parser('report-cards', help="write a report card for every student")
+    report_cards.add_argument('output', help="file to write")
+    report_cards.add_argument('--format', choices=('csv', 'jsonl', 'text'), default='csv')
+    report_cards.add_argument('--workers', type=int, help="rendering processes, one per CPU by default")
+    report_cards.set_defaults(command=command_report_cards)
+    return parser
+
+
+def run(argv=None):
+    """
+    Run one command and print its result as JSON.
+
+    Args:
+        argv (list): Command line arguments, sys.argv[1:] by default
+
+    Returns:
+        int: Exit status, 0 on success and 1 if the command failed
+    """
+    arguments = build_parser().parse_args(argv)
+    indent = 4 if arguments.pretty else None
+    try:
+        subjects = None
+        if arguments.subjects:
+            subjects = [subject.strip() for subject in arguments.subjects.split(',')]
+        gradebook = open_gradebook(arguments.file, arguments.storage, subjects,
+                                   arguments.journaled, arguments.shared, arguments.history)
+        result = arguments.command(gradebook, arguments)
+    except (CommandError, ValueError, OSError) as error:
+        print(json.dumps({"error": str(error)}, indent=indent))
+        return 1
+    print(json.dumps(result, indent=indent))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,320 @@
+"""
+Local HTTP/JSON service in front of a Gradebook, so several teachers can
+enter marks at the same time. Built on asyncio streams only.
+
+Every call into the gradebook runs in a worker thread, so waiting for the
+lock of a shared gradebook file never holds up the event loop: other
+connections keep being read and writes keep being queued meanwhile. Writes
+go through one queue drained by a single writer task: it takes every write
+waiting in the queue, applies the batch and makes it durable with one
+Gradebook.commit(), and only then answers the batch's requests. Reads run
+one at a time between batches, never while a batch is being applied and
+committed, so they only ever see committed writes.
+
+Endpoints (request and response bodies are JSON):
+    GET    /students                          roster
+    POST   /students                          {"admin_no", "name", "marks"}
+    GET    /students/<admin_no>               grades of one student
+    DELETE /students/<admin_no>
+    PUT    /students/<admin_no>/marks/<subject>   {"marks": 75}
+    GET    /statistics[?extended=1]
+
+Run this file directly to serve previous_data.json:
+    python gradebook_server.py --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import traceback
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from bulk_import import validate_record
+
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 500: 'Internal Server Error'}
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+
+class HTTPError(Exception):
+    """An error answered with an HTTP status and a JSON {"error": ...} body."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class GradebookServer:
+    """
+    A class to serve one Gradebook over HTTP.
+    Only the writer task changes the gradebook in this process; other
+    processes sharing the file are picked up through the gradebook's lock.
+    """
+    def __init__(self, gradebook, batch_size=256):
+        """
+        Initialize the server.
+
+        Args:
+            gradebook (Gradebook): Gradebook to serve
+            batch_size (int): Most writes made durable by one commit
+        """
+        self.gradebook = gradebook
+        self.batch_size = batch_size
+        self.writes = None
+        self._writer_task = None
+        self.batches = 0
+        self.writes_applied = 0
+        # Held by a read, or by the writer from applying a batch until it is committed
+        self._lock = threading.Lock()
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """
+        Start listening and start the writer task.
+
+        Args:
+            host (str): Address to listen on
+            port (int): Port to listen on, 0 for any free port
+
+        Returns:
+            asyncio.Server: The listening server
+        """
+        self.writes = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def _writer(self):
+        """Apply queued writes in batches, committing once per batch."""
+        while True:
+            batch = [await self.writes.get()]
+            # Let handlers that are already running queue their writes too
+            await asyncio.sleep(0)
+            while len(batch) < self.batch_size and not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+            results = await asyncio.to_thread(self._apply_batch, batch)
+            self.batches += 1
+            self.writes_applied += len(batch)
+            for future, result, error in results:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    def _apply_batch(self, batch):
+        """
+        Apply a batch of writes and commit it, in a worker thread.
+
+        Returns:
+            list: (future, result, error) for every write of the batch
+        """
+        results = []
+        with self._lock:
+            with self.gradebook.defer_commits():
+                for write, future in batch:
+                    try:
+                        results.append((future, write(), None))
+                    except Exception as error:
+                        results.append((future, None, error))
+            try:
+                self.gradebook.commit()
+            except Exception as error:
+                results = [(future, None, error) for future, _, _ in results]
+        return results
+
+    async def _read(self, read, *args):
+        """Run a read in a worker thread, between batches of writes."""
+        return await asyncio.to_thread(self._locked, read, *args)
+
+    def _locked(self, read, *args):
+        """Call a read while holding the lock, in a worker thread."""
+        with self._lock:
+            return read(*args)
+
+    async def _write(self, write):
+        """Queue a write and wait until it has been applied and committed."""
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((write, future))
+        return await future
+
+    async def _serve_connection(self, reader, writer):
+        """Answer requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body cannot be told apart from the next request
+                    status, payload = 400, {"error": "invalid Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, payload = 400, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.handle(request_line.decode('latin-1'), body)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, request_line, body):
+        """
+        Answer one request.
+
+        Args:
+            request_line (str): e.g. "GET /students/2400711201 HTTP/1.1"
+            body (bytes): Request body
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable response)
+        """
+        try:
+            method, target, _ = request_line.split(' ', 2)
+            url = urlsplit(target)
+            path = [unquote(part) for part in url.path.strip('/').split('/') if part]
+            query = parse_qs(url.query)
+            return await self._route(method, path, query, body)
+        except HTTPError as error:
+            return error.status, {"error": str(error)}
+        except ValueError:
+            return 400, {"error": "malformed request"}
+        except Exception:
+            # The details stay in the server's log, not in the response
+            traceback.print_exc()
+            return 500, {"error": "internal server error"}
+
+    async def _route(self, method, path, query, body):
+        """Dispatch a parsed request to the matching operation."""
+        if path == ['statistics'] and method == 'GET':
+            extended = query.get('extended', ['0'])[0] not in ('0', 'false', '')
+            return 200, await self._read(self.gradebook.view_statistics, extended)
+        if path == ['students']:
+            if method == 'GET':
+                return 200, await self._read(self.gradebook.print_gradebook)
+            if method == 'POST':
+                return await self._write(self._add_student_write(_json_body(body)))
+        elif len(path) == 2 and path[0] == 'students':
+            if method == 'GET':
+                return 200, await self._read(self._grades, path[1])
+            if method == 'DELETE':
+                return await self._write(lambda: self._delete_student(path[1]))
+        elif len(path) == 4 and path[0] == 'students' and path[2] == 'marks':
+            if method == 'PUT':
+                marks = _json_body(body).get('marks')
+                return await self._write(lambda: self._edit_marks(path[1], path[3], marks))
+        else:
+            raise HTTPError(404, "no such endpoint")
+        raise HTTPError(405, f"{method} is not supported here")
+
+    def _grades(self, admin_no):
+        """Get the name and marks of one student."""
+        student = self.gradebook.get_student(admin_no)
+        if student is None:
+            raise HTTPError(404, "Student does not exist in the system!")
+        return {"admin_no": admin_no, "name": student.name, "marks": dict(student.marks)}
+
+    def _add_student_write(self, info):
+        """Validate a new student now and return the write that adds it."""
+        admin_no, name, marks = info.get('admin_no'), info.get('name'), info.get('marks')
+        subjects = self.gradebook.subjects
+        reason = validate_record(admin_no, name, marks, subjects)
+        if reason is not None:
+            raise HTTPError(400, reason)
+
+        def add_student():
+            student = Student(admin_no, name, subjects)
+            student.marks = marks
+            if not self.gradebook.add_student(student):
+                raise HTTPError(409, "A student with that admin number already exists.")
+            return 201, {"admin_no": admin_no, "name": name, "marks": dict(student.marks)}
+        return add_student
+
+    def _delete_student(self, admin_no):
+        if not self.gradebook.delete_student(admin_no):
+            raise HTTPError(404, "Student does not exist in the system!")
+        return 200, {"admin_no": admin_no, "deleted": True}
+
+    def _edit_marks(self, admin_no, subject, marks):
+        student = self.gradebook.get_student(admin_no)
+        if student is None:
+            raise HTTPError(404, "Student does not exist in the system!")
+        if isinstance(marks, bool) or not isinstance(marks, int):
+            raise HTTPError(400, "marks must be a whole number between 0 and 100")
+        subjects = self.gradebook.subjects
+        if subject not in subjects or not student.edit_marks(subject, marks):
+            raise HTTPError(400, f"Invalid subject or marks. Subjects: {', '.join(subjects)}")
+        return 200, self._grades(admin_no)
+
+
+def _json_body(body):
+    """Parse a request body that must be a JSON object."""
+    try:
+        data = json.loads(body or b'{}')
+    except json.JSONDecodeError:
+        raise HTTPError(400, "request body is not valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "request body must be a JSON object")
+    return data
+
+
+async def serve(gradebook, host='127.0.0.1', port=8000, batch_size=256):
+    """
+    Serve a gradebook until cancelled.
+
+    Args:
+        gradebook (Gradebook): Gradebook to serve
+        host (str): Address to listen on
+        port (int): Port to listen on, 0 for any free port
+        batch_size (int): Most writes made durable by one commit
+    """
+    server = await GradebookServer(gradebook, batch_size).start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving on http://{address[0]}:{address[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a gradebook over HTTP/JSON.")
+    parser.add_argument('--file', default='previous_data.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--storage', default='dict')
+    parser.add_argument('--batch-size', type=int, default=256)
+    arguments = parser.parse_args()
+    # The journal keeps a batch commit to one append and fsync; sharing it lets the
+    # interactive program and gradebook_cli.py, run with --shared, use the same file
+    journaled = arguments.storage != 'sqlite'
+    gradebook = Gradebook(arguments.file, journaled=journaled, storage=arguments.storage,
+                          shared=journaled)
+    try:
+        asyncio.run(serve(gradebook, arguments.host, arguments.port, arguments.batch_size))
+    except KeyboardInterrupt:
+        gradebook.save_data()
@@ -0,0 +1,144 @@
+"""
+Append-only journal for the gradebook.
+Every change to the gradebook is written as one compact JSON line, so a
+single edit costs one small append instead of a rewrite of the whole
+JSON snapshot. The journal is replayed on top of the snapshot at startup
+and emptied whenever the snapshot is rewritten (compaction).
+
+Processes sharing one gradebook also read each other's changes from the
+journal, starting where they last stopped; a version file counts
+compactions so they can tell when the journal was emptied under them.
+"""
+
+import json
+import os
+
+
+class Journal:
+    """
+    A class to represent the write-ahead log of a gradebook.
+    Records are dictionaries with an "op" key:
+        {"op": "add", "admin_no": ..., "name": ..., "marks": {...}}
+        {"op": "delete", "admin_no": ...}
+        {"op": "set", "admin_no": ..., "subject": ..., "marks": ...}
+    All records are idempotent, so replaying a record twice is harmless.
+    """
+    def __init__(self, filename):
+        """
+        Initialize the journal. Records already on disk are counted by replay().
+
+        Args:
+            filename (str): Path to the journal file
+        """
+        self.filename = filename
+        self.records = 0
+        self.position = 0
+        self._file = None
+
+    def append(self, record):
+        """
+        Append one record to the journal.
+
+        Args:
+            record (dict): Record describing a single change
+        """
+        if self._file is None:
+            self._file = open(self.filename, 'a', encoding='utf-8')
+            if self._file.tell() and not self._ends_with_newline():
+                self._file.write('\n')
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.records += 1
+
+    def _ends_with_newline(self):
+        """Check whether the journal on disk ends with a complete line."""
+        with open(self.filename, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b'\n'
+
+    def flush(self):
+        """Flush appended records to disk so they survive a crash."""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.position = os.fstat(self._file.fileno()).st_size
+
+    def replay(self, start=0):
+        """
+        Read the records stored in the journal in the order they were written.
+        A torn line left by a crash during an append is skipped. Afterwards
+        position holds the byte offset just past the last complete line.
+
+        Args:
+            start (int): Byte offset to read from, to pick up only records
+                appended since an earlier replay
+
+        Yields:
+            dict: Each record in the journal
+        """
+        if not start:
+            self.records = 0
+        self.position = start
+        try:
+            with open(self.filename, 'rb') as file:
+                file.seek(start)
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        # Still being written by another process, or torn
+                        break
+                    self.position += len(line)
+                    try:
+                        record = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    self.records += 1
+                    yield record
+        except FileNotFoundError:
+            return
+
+    def truncate(self):
+        """Empty the journal once its records are part of the snapshot."""
+        self.close()
+        with open(self.filename, 'w', encoding='utf-8'):
+            pass
+        self.records = 0
+        self.position = 0
+
+    def close(self):
+        """Close the journal file if it is open."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_version(filename):
+    """
+    Read the version file that processes sharing a gradebook use to notice
+    a compaction by another process.
+
+    Args:
+        filename (str): Path to the version file
+
+    Returns:
+        dict: 'version', the number of compactions so far, and
+            'journal_bytes', the journal size the last compaction folded in
+    """
+    try:
+        with open(filename, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": 0, "journal_bytes": 0}
+
+
+def write_version(filename, version, journal_bytes):
+    """
+    Replace the version file atomically.
+
+    Args:
+        filename (str): Path to the version file
+        version (int): Number of compactions so far
+        journal_bytes (int): Journal size folded into the snapshot
+    """
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w') as file:
+        json.dump({"version": version, "journal_bytes": journal_bytes}, file)
+    os.replace(temp_filename, filename)
@@ -0,0 +1,128 @@
+"""
+Streaming reader for gradebook JSON files.
+Parses the top-level {admin_no: {"name": ..., "marks": {...}}, ...} object
+one record at a time from fixed-size chunks of the file, so memory use is
+bounded by the chunk size and the caller can start using the first records
+before the whole file has been read.
+
+Run this file directly to compare the peak memory of json.load with the
+streaming reader on a gradebook file:
+    python json_stream.py previous_data.json
+"""
+
+import json
+import sys
+import time
+
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = ' \t\n\r'
+
+
+def iter_records(filename, chunk_size=CHUNK_SIZE):
+    """
+    Read the records of a gradebook JSON file one at a time.
+
+    Args:
+        filename (str): Path to the JSON file
+        chunk_size (int): Number of characters read from the file at a time
+
+    Yields:
+        tuple: (admin_no, info) for each student, in file order
+
+    Raises:
+        json.JSONDecodeError: If the file is not a JSON object
+    """
+    decoder = json.JSONDecoder()
+    with open(filename, 'r') as file:
+        buffer = ''
+        position = 0
+        at_end = False
+
+        def read_more():
+            nonlocal buffer, position, at_end
+            chunk = file.read(chunk_size)
+            at_end = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        def skip_whitespace():
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer) or at_end:
+                    return
+                read_more()
+
+        def expect(characters):
+            nonlocal position
+            skip_whitespace()
+            if position >= len(buffer) or buffer[position] not in characters:
+                raise json.JSONDecodeError(f"Expecting one of {characters!r}", buffer, position)
+            position += 1
+            return buffer[position - 1]
+
+        def decode_value():
+            nonlocal position
+            skip_whitespace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    # A value ending exactly at the end of the buffer may be cut short
+                    if end < len(buffer) or at_end:
+                        position = end
+                        return value
+                except json.JSONDecodeError:
+                    if at_end:
+                        raise
+                read_more()
+
+        read_more()
+        expect('{')
+        skip_whitespace()
+        if position < len(buffer) and buffer[position] == '}':
+            return
+        while True:
+            admin_no = decode_value()
+            expect(':')
+            info = decode_value()
+            yield admin_no, info
+            if expect(',}') == '}':
+                return
+
+
+def measure_peak_memory(filename):
+    """
+    Measure the peak memory used to read every record of a file with
+    json.load and with iter_records.
+
+    Args:
+        filename (str): Path to the JSON file
+
+    Returns:
+        dict: Loader name -> (seconds, peak bytes)
+    """
+    import tracemalloc
+
+    def read_with_json_load():
+        with open(filename, 'r') as file:
+            return len(json.load(file))
+
+    results = {}
+    for loader_name, read_all in (
+            ('json.load', read_with_json_load),
+            ('iter_records', lambda: sum(1 for _ in iter_records(filename)))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        read_all()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[loader_name] = (elapsed, peak)
+    return results
+
+
+if __name__ == "__main__":
+    for loader_name, (elapsed, peak) in measure_peak_memory(sys.argv[1]).items():
+        print(f"{loader_name}: {elapsed:.3f}s, peak {peak / 1024 / 1024:.1f} MiB")
@@ -0,0 +1,176 @@
+"""
+Class rankings for the gradebook, kept up to date as marks change.
+Marks are integers between 0 and 100 (totals between 0 and 100 per
+subject), so students are grouped in one bucket per possible mark, each
+bucket sorted by admin number. The top K students are read from the
+highest buckets down, and cumulative counts of the bucket sizes (a Fenwick
+tree, see grade_stats.CumulativeCounts) give the number of students above
+a mark in O(log range), which is a student's rank.
+
+Ranks are competition ranks: students with equal marks share a rank, and
+the next rank skips the tied places (1, 2, 2, 4).
+"""
+
+from bisect import bisect_left, insort
+
+from grade_stats import MARK_RANGE, CumulativeCounts, is_valid_mark, total_marks
+
+
+class RankedBuckets:
+    """
+    A class to rank students by an integer key between 0 and size - 1.
+    """
+    def __init__(self, size):
+        """
+        Initialize empty buckets.
+
+        Args:
+            size (int): Number of possible keys
+        """
+        self.buckets = [[] for _ in range(size)]
+        self.counts = CumulativeCounts(size)
+
+    @property
+    def count(self):
+        """Number of students ranked."""
+        return self.counts.count
+
+    def add(self, key, admin_no):
+        """Place a student in the bucket of its key."""
+        insort(self.buckets[key], admin_no)
+        self.counts.add(key)
+
+    def remove(self, key, admin_no):
+        """Take a student out of the bucket of its key, if it is there."""
+        bucket = self.buckets[key]
+        position = bisect_left(bucket, admin_no)
+        if position < len(bucket) and bucket[position] == admin_no:
+            del bucket[position]
+            self.counts.add(key, -1)
+
+    def rebuild(self, entries):
+        """
+        Replace the contents with (key, admin_no) pairs in one pass.
+
+        Args:
+            entries (iterable): (key, admin_no) for every student
+        """
+        for bucket in self.buckets:
+            bucket.clear()
+        for key, admin_no in entries:
+            self.buckets[key].append(admin_no)
+        for bucket in self.buckets:
+            bucket.sort()
+        self.counts = CumulativeCounts(len(self.buckets), [len(bucket) for bucket in self.buckets])
+
+    def rank(self, key):
+        """
+        Args:
+            key (int): A student's key
+
+        Returns:
+            int: 1 + the number of students with a higher key
+        """
+        return 1 + self.counts.count - self.counts.count_up_to(key)
+
+    def top(self, k):
+        """
+        Read the students with the highest keys.
+
+        Args:
+            k (int): Number of students
+
+        Yields:
+            tuple: (rank, admin_no, key), highest key first and admin number
+                order within a key
+        """
+        above = 0
+        for key in range(len(self.buckets) - 1, -1, -1):
+            bucket = self.buckets[key]
+            for admin_no in bucket:
+                if k <= 0:
+                    return
+                yield above + 1, admin_no, key
+                k -= 1
+            above += len(bucket)
+            if k <= 0:
+                return
+
+
+class Leaderboards:
+    """
+    A class to keep a ranking per subject and one by total marks in step
+    with a gradebook. The gradebook calls student_added, student_removed
+    and marks_changed whenever its students change. Students without a
+    valid mark in a subject are left out of that subject's ranking.
+    """
+    def __init__(self, subjects, students=()):
+        """
+        Initialize the rankings from the students already in a gradebook.
+
+        Args:
+            subjects (iterable): Subject names in id order
+            students (iterable): Student objects to rank
+        """
+        self.subjects = list(subjects)
+        self._ids = {subject: subject_id for subject_id, subject in enumerate(self.subjects)}
+        self.boards = [RankedBuckets(MARK_RANGE) for _ in self.subjects]
+        self.total = RankedBuckets((MARK_RANGE - 1) * len(self.subjects) + 1)
+        subject_entries = [[] for _ in self.subjects]
+        total_entries = []
+        for student in students:
+            scores = student.scores
+            for entries, mark in zip(subject_entries, scores):
+                if is_valid_mark(mark):
+                    entries.append((mark, student.admin_no))
+            total_entries.append((total_marks(scores), student.admin_no))
+        for board, entries in zip(self.boards, subject_entries):
+            board.rebuild(entries)
+        self.total.rebuild(total_entries)
+
+    def board(self, subject=None):
+        """
+        Args:
+            subject (str): Subject name, None for the ranking by total
+
+        Returns:
+            RankedBuckets: The ranking
+
+        Raises:
+            KeyError: If the subject is unknown
+        """
+        return self.total if subject is None else self.boards[self._ids[subject]]
+
+    def student_added(self, student):
+        """Rank a student that joined the gradebook."""
+        scores = student.scores
+        for board, mark in zip(self.boards, scores):
+            if is_valid_mark(mark):
+                board.add(mark, student.admin_no)
+        self.total.add(total_marks(scores), student.admin_no)
+
+    def student_removed(self, student):
+        """Stop ranking a student that left the gradebook."""
+        scores = student.scores
+        for board, mark in zip(self.boards, scores):
+            if is_valid_mark(mark):
+                board.remove(mark, student.admin_no)
+        self.total.remove(total_marks(scores), student.admin_no)
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """Move a student to its new place in the subject and total rankings."""
+        subject_id = self._ids.get(subject)
+        if subject_id is None:
+            return
+        board = self.boards[subject_id]
+        if is_valid_mark(old_marks):
+            board.remove(old_marks, student.admin_no)
+        if is_valid_mark(new_marks):
+            board.add(new_marks, student.admin_no)
+        # The student's scores already hold the new mark
+        new_total = total_marks(student.scores)
+        old_total = (new_total - (new_marks if is_valid_mark(new_marks) else 0)
+                     + (old_marks if is_valid_mark(old_marks) else 0))
+        if old_total != new_total:
+            self.total.remove(old_total, student.admin_no)
+            self.total.add(new_total, student.admin_no)
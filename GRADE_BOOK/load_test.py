@@ -0,0 +1,169 @@
+"""
+Load test for gradebook_server.py.
+Opens a number of keep-alive client connections that send a mix of reads
+(grades, roster, statistics) and mark edits as fast as the server answers,
+then reports requests per second and latency percentiles.
+
+Without --port, a server is started on a temporary copy of the data file:
+    python load_test.py --file previous_data.json --clients 50 --requests 20000
+Against a running server:
+    python load_test.py --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SUBJECTS = ["Maths", "SST", "English", "Science"]
+
+
+async def request(reader, writer, method, path, payload=None):
+    """
+    Send one request on an open connection and read the response.
+
+    Returns:
+        tuple: (HTTP status, decoded JSON body)
+    """
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, admin_numbers, count, write_ratio, latencies, seed):
+    """Send count requests over one connection, recording each latency."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            admin_no = rng.choice(admin_numbers)
+            roll = rng.random()
+            if roll < write_ratio:
+                arguments = ('PUT', f"/students/{admin_no}/marks/{rng.choice(SUBJECTS)}",
+                             {"marks": rng.randint(0, 100)})
+            elif roll < write_ratio + 0.05:
+                arguments = ('GET', '/statistics')
+            elif roll < write_ratio + 0.06:
+                arguments = ('GET', '/students')
+            else:
+                arguments = ('GET', f"/students/{admin_no}")
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, *arguments)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                raise RuntimeError(f"{arguments[0]} {arguments[1]} failed with {status}")
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    """Value below which the given fraction of sorted_values falls."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load_test(host, port, clients=50, requests=20000, write_ratio=0.2):
+    """
+    Run the load test against a server.
+
+    Args:
+        host (str): Server address
+        port (int): Server port
+        clients (int): Number of concurrent connections
+        requests (int): Total number of requests
+        write_ratio (float): Fraction of requests that edit marks
+
+    Returns:
+        dict: 'requests', 'seconds', 'requests_per_second' and latency
+            percentiles 'p50', 'p99' and 'max' in seconds
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    _, roster = await request(reader, writer, 'GET', '/students')
+    writer.close()
+    admin_numbers = list(roster['student_details'])
+    if not admin_numbers:
+        raise RuntimeError("The gradebook has no students to query")
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, admin_numbers, requests // clients + (number < requests % clients),
+               write_ratio, latencies, number)
+        for number in range(clients)))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'seconds': seconds,
+        'requests_per_second': len(latencies) / seconds,
+        'p50': percentile(latencies, 0.50),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1],
+    }
+
+
+def start_local_server(filename):
+    """
+    Start gradebook_server.py on a temporary copy of a data file.
+
+    Returns:
+        tuple: (server process, port, temporary directory)
+    """
+    directory = tempfile.mkdtemp()
+    copy = os.path.join(directory, os.path.basename(filename))
+    shutil.copy(filename, copy)
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'gradebook_server.py'),
+         '--file', copy, '--port', '0'],
+        stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("Serving on"):
+        server.kill()
+        raise RuntimeError("The gradebook server did not start")
+    return server, int(line.rsplit(':', 1)[1]), directory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a gradebook server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="port of a running server")
+    parser.add_argument('--file', default='previous_data.json',
+                        help="data file to serve when no --port is given")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    arguments = parser.parse_args()
+    server = directory = None
+    port = arguments.port
+    if port is None:
+        server, port, directory = start_local_server(arguments.file)
+    try:
+        results = asyncio.run(run_load_test(arguments.host, port, arguments.clients,
+                                            arguments.requests, arguments.write_ratio))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(directory, ignore_errors=True)
+    print(f"{results['requests']} requests in {results['seconds']:.2f}s: "
+          f"{results['requests_per_second']:.0f} requests/second")
+    print(f"latency p50 {results['p50'] * 1000:.2f} ms, p99 {results['p99'] * 1000:.2f} ms, "
+          f"max {results['max'] * 1000:.2f} ms")
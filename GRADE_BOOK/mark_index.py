@@ -0,0 +1,254 @@
+"""
+Per-subject mark indexes for range queries such as "Maths below 50".
+Every student gets a slot number, and each subject keeps one bitmap per
+possible mark with bit <slot> set for the students who have that mark.
+
+A bitmap is a list of blocks of BLOCK_SIZE slots, each block a Python int.
+Adding, deleting or editing a student replaces one block of each bitmap it
+touches, so it costs the same whatever the number of students. A range of
+marks is the OR of at most 51 bitmaps (a range covering more than half the
+marks is taken as the students with a valid mark minus the marks outside
+it), and conditions on several subjects are combined with & and |; all of
+these work block by block on whole machine words at a time. Each subject
+also keeps a count per mark, so the size of a single range is known
+without counting bits. Nothing looks at the students themselves until the
+admin numbers of the result are read.
+
+A selection holds the students matching at the time of the query. Slots of
+deleted students are not reused, so a selection never picks up a student
+it was not made from. Once more slots are dead than alive, the gradebook
+rebuilds the index with fresh slots. Selections made before the rebuild
+cannot be combined with newer ones.
+"""
+
+from array import array
+from itertools import zip_longest
+
+from grade_stats import MARK_RANGE, is_valid_mark
+
+# Slots per bitmap block; an edit copies one block of BLOCK_SIZE / 8 bytes
+BLOCK_BITS = 16
+BLOCK_SIZE = 1 << BLOCK_BITS
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    # Before Python 3.10
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+
+class MarkBitmaps:
+    """
+    A class to keep per-mark bitmaps of every subject in step with a
+    gradebook. The gradebook calls student_added, student_removed and
+    marks_changed whenever its students change. Students without a valid
+    mark in a subject are in none of that subject's bitmaps.
+    """
+    def __init__(self, subjects, students=()):
+        """
+        Initialize the bitmaps from the students already in a gradebook.
+
+        Args:
+            subjects (iterable): Subject names in id order
+            students (iterable): Student objects to index
+        """
+        self.subjects = list(subjects)
+        self._ids = {subject: subject_id for subject_id, subject in enumerate(self.subjects)}
+        rows = [(student.admin_no, list(student.scores)) for student in students]
+        self.admin_nos = [admin_no for admin_no, _ in rows]
+        self.slots = {admin_no: slot for slot, admin_no in enumerate(self.admin_nos)}
+        self.dead = 0
+        # Bitmaps are built as mutable bytes, then cut into blocks
+        size = (len(rows) + 7) // 8
+        buffers = [[bytearray(size) for _ in range(MARK_RANGE)] for _ in self.subjects]
+        for slot, (_, scores) in enumerate(rows):
+            byte, bit = slot >> 3, 1 << (slot & 7)
+            for subject_buffers, mark in zip(buffers, scores):
+                if is_valid_mark(mark):
+                    subject_buffers[mark][byte] |= bit
+        block_bytes = BLOCK_SIZE // 8
+        self.bitmaps = [[[int.from_bytes(buffer[start:start + block_bytes], 'little')
+                          for start in range(0, size, block_bytes)]
+                         for buffer in subject_buffers]
+                        for subject_buffers in buffers]
+        self.valid = []
+        self.counts = []
+        for subject_bitmaps in self.bitmaps:
+            self.counts.append(array('q', (sum(map(_popcount, blocks))
+                                           for blocks in subject_bitmaps)))
+            valid = [0] * self.block_count
+            for blocks in subject_bitmaps:
+                valid = [bits | more for bits, more in zip(valid, blocks)]
+            self.valid.append(valid)
+
+    @property
+    def block_count(self):
+        """int: Number of blocks in every bitmap."""
+        return (len(self.admin_nos) + BLOCK_SIZE - 1) >> BLOCK_BITS
+
+    def _set(self, subject_id, mark, slot):
+        """Put a slot in the bitmap of a mark."""
+        block, bit = slot >> BLOCK_BITS, 1 << (slot & (BLOCK_SIZE - 1))
+        self.bitmaps[subject_id][mark][block] |= bit
+        self.valid[subject_id][block] |= bit
+        self.counts[subject_id][mark] += 1
+
+    def _clear(self, subject_id, mark, slot):
+        """Take a slot out of the bitmap of a mark."""
+        block, bit = slot >> BLOCK_BITS, 1 << (slot & (BLOCK_SIZE - 1))
+        self.bitmaps[subject_id][mark][block] &= ~bit
+        self.valid[subject_id][block] &= ~bit
+        self.counts[subject_id][mark] -= 1
+
+    def student_added(self, student):
+        """Give a student that joined the gradebook a new slot."""
+        slot = len(self.admin_nos)
+        if not slot & (BLOCK_SIZE - 1):
+            # First slot of a new block
+            for subject_bitmaps, valid in zip(self.bitmaps, self.valid):
+                valid.append(0)
+                for blocks in subject_bitmaps:
+                    blocks.append(0)
+        self.admin_nos.append(student.admin_no)
+        self.slots[student.admin_no] = slot
+        for subject_id, mark in enumerate(student.scores):
+            if is_valid_mark(mark):
+                self._set(subject_id, mark, slot)
+
+    def student_removed(self, student):
+        """Clear the slot of a student that left the gradebook."""
+        slot = self.slots.pop(student.admin_no, None)
+        if slot is None:
+            return
+        self.admin_nos[slot] = None
+        self.dead += 1
+        for subject_id, mark in enumerate(student.scores):
+            if is_valid_mark(mark):
+                self._clear(subject_id, mark, slot)
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """Move a student's bit to the bitmap of its new mark."""
+        subject_id = self._ids.get(subject)
+        slot = self.slots.get(student.admin_no)
+        if subject_id is None or slot is None:
+            return
+        if is_valid_mark(old_marks):
+            self._clear(subject_id, old_marks, slot)
+        if is_valid_mark(new_marks):
+            self._set(subject_id, new_marks, slot)
+
+    @property
+    def needs_rebuild(self):
+        """bool: True once more slots belong to deleted students than to live ones."""
+        return self.dead > len(self.slots)
+
+    def select(self, subject, lo=0, hi=100):
+        """
+        Select the students with marks between lo and hi in a subject.
+
+        Args:
+            subject (str): Subject name
+            lo (int): Lowest mark, inclusive
+            hi (int): Highest mark, inclusive
+
+        Returns:
+            Selection: The students selected
+
+        Raises:
+            KeyError: If the subject is unknown
+        """
+        subject_id = self._ids[subject]
+        bitmaps, counts = self.bitmaps[subject_id], self.counts[subject_id]
+        marks = range(max(lo, 0), min(hi, MARK_RANGE - 1) + 1)
+        if len(marks) * 2 <= MARK_RANGE:
+            blocks = self._union(bitmaps, marks)
+        else:
+            outside = self._union(bitmaps, (*range(marks.start), *range(marks.stop, MARK_RANGE)))
+            blocks = [bits & ~other for bits, other in zip(self.valid[subject_id], outside)]
+        return Selection(self, blocks, sum(counts[mark] for mark in marks))
+
+    def _union(self, bitmaps, marks):
+        """OR together the bitmaps of some marks of one subject."""
+        blocks = [0] * self.block_count
+        for mark in marks:
+            for position, bits in enumerate(bitmaps[mark]):
+                if bits:
+                    blocks[position] |= bits
+        return blocks
+
+
+class Selection:
+    """
+    A class to represent a set of students selected by mark ranges.
+    Selections from the same gradebook are combined with & (students in
+    both), | (students in either) and - (students in the first but not
+    the second). Iterating gives the admin numbers in the order the
+    students were added.
+    """
+    __slots__ = ('index', 'blocks', '_count')
+
+    def __init__(self, index, blocks, count=None):
+        """
+        Args:
+            index (MarkBitmaps): Index the selection was made from
+            blocks (list): Bitmap of the selected slots, one int per block
+            count (int): Number of slots selected, counted on demand if None
+        """
+        self.index = index
+        self.blocks = blocks
+        self._count = count
+
+    def _blocks_of(self, other):
+        """Pair the blocks of a selection to combine with this one's."""
+        if other.index is not self.index:
+            raise ValueError("Selections from different indexes cannot be combined; query again")
+        # A selection made before students were added has fewer blocks
+        return zip_longest(self.blocks, other.blocks, fillvalue=0)
+
+    def __and__(self, other):
+        if not isinstance(other, Selection):
+            return NotImplemented
+        return Selection(self.index, [mine & theirs for mine, theirs in self._blocks_of(other)])
+
+    def __or__(self, other):
+        if not isinstance(other, Selection):
+            return NotImplemented
+        return Selection(self.index, [mine | theirs for mine, theirs in self._blocks_of(other)])
+
+    def __sub__(self, other):
+        if not isinstance(other, Selection):
+            return NotImplemented
+        return Selection(self.index, [mine & ~theirs for mine, theirs in self._blocks_of(other)])
+
+    def __len__(self):
+        if self._count is None:
+            self._count = sum(map(_popcount, self.blocks))
+        return self._count
+
+    def __bool__(self):
+        return any(self.blocks)
+
+    def __contains__(self, admin_no):
+        slot = self.index.slots.get(admin_no)
+        if slot is None or slot >> BLOCK_BITS >= len(self.blocks):
+            return False
+        return bool(self.blocks[slot >> BLOCK_BITS] >> (slot & (BLOCK_SIZE - 1)) & 1)
+
+    def __iter__(self):
+        admin_nos = self.index.admin_nos
+        for position, bits in enumerate(self.blocks):
+            if not bits:
+                continue
+            first = position << BLOCK_BITS
+            # Reversed binary digits: the character at position i is bit i
+            digits = bin(bits)[:1:-1]
+            slot = digits.find('1')
+            while slot != -1:
+                admin_no = admin_nos[first + slot]
+                if admin_no is not None:
+                    yield admin_no
+                slot = digits.find('1', slot + 1)
+
+    def __repr__(self):
+        return f"<Selection of {len(self)} students>"
@@ -0,0 +1,194 @@
+"""
+Opt-in operation metrics for the gradebook.
+A Metrics object keeps a call counter and a latency histogram per named
+operation, plus plain counters (e.g. students serialized). Gradebook only
+wraps its methods when it is given a Metrics object, so a gradebook without
+one runs exactly the same code as before.
+
+Metrics are exported as Prometheus text (any file name) or as JSON (a file
+name ending in .json):
+    gradebook_operation_seconds_bucket{operation="save_data",le="0.01"} 3
+    gradebook_operation_seconds_sum{operation="save_data"} 0.0213
+    gradebook_operation_seconds_count{operation="save_data"} 3
+    gradebook_students_serialized_total 600
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class OperationStats:
+    """Call count, total and maximum time, and latency histogram of one operation."""
+    __slots__ = ('count', 'total', 'maximum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        # One count per bucket bound plus one for slower calls
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds):
+        """Record one call that took the given time."""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        for bucket, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[bucket] += 1
+                return
+        self.buckets[-1] += 1
+
+
+class Metrics:
+    """
+    A class to collect operation latencies and counters.
+    Safe to share between threads.
+    """
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.operations = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, operation, seconds):
+        """
+        Record one call of an operation.
+
+        Args:
+            operation (str): Operation name
+            seconds (float): Time the call took
+        """
+        with self._lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = OperationStats()
+            stats.observe(seconds)
+
+    def increment(self, counter, amount=1):
+        """
+        Add to a counter.
+
+        Args:
+            counter (str): Counter name
+            amount (int): Amount to add
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def timer(self, operation):
+        """Context manager recording the time spent in its block as one call."""
+        return _Timer(self, operation)
+
+    def timed(self, operation, function):
+        """
+        Wrap a function so that every call is recorded.
+
+        Args:
+            operation (str): Operation name
+            function (callable): Function to wrap
+
+        Returns:
+            callable: The wrapped function
+        """
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(operation, time.perf_counter() - start)
+        return wrapper
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: 'operations' (count, sum, max and cumulative bucket counts
+                per operation) and 'counters'
+        """
+        with self._lock:
+            operations = {}
+            for operation, stats in sorted(self.operations.items()):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                operations[operation] = {'count': stats.count, 'sum': stats.total,
+                                         'max': stats.maximum, 'buckets': buckets}
+            return {'operations': operations, 'counters': dict(sorted(self.counters.items()))}
+
+    def to_prometheus(self):
+        """
+        Returns:
+            str: The metrics in the Prometheus text exposition format
+        """
+        data = self.to_dict()
+        lines = ["# HELP gradebook_operation_seconds Time spent in gradebook operations.",
+                 "# TYPE gradebook_operation_seconds histogram"]
+        for operation, stats in data['operations'].items():
+            label = f'operation="{operation}"'
+            for bound, count in stats['buckets'].items():
+                lines.append(f'gradebook_operation_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f"gradebook_operation_seconds_sum{{{label}}} {stats['sum']:.9f}")
+            lines.append(f"gradebook_operation_seconds_count{{{label}}} {stats['count']}")
+        for counter, value in data['counters'].items():
+            # The TYPE line names the metric family; only the sample has _total
+            lines.append(f"# TYPE gradebook_{counter} counter")
+            lines.append(f"gradebook_{counter}_total {value}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, filename):
+        """
+        Write the metrics to a file: JSON if the name ends in .json,
+        Prometheus text otherwise.
+
+        Args:
+            filename (str): Path of the file to write
+        """
+        if filename.endswith('.json'):
+            text = json.dumps(self.to_dict(), indent=4)
+        else:
+            text = self.to_prometheus()
+        temp_filename = filename + '.tmp'
+        with open(temp_filename, 'w') as file:
+            file.write(text)
+        os.replace(temp_filename, filename)
+
+    def summary(self):
+        """
+        Returns:
+            str: One line per operation and counter, for printing
+        """
+        data = self.to_dict()
+        lines = []
+        for operation, stats in data['operations'].items():
+            mean = stats['sum'] / stats['count'] if stats['count'] else 0.0
+            lines.append(f"{operation:24} {stats['count']:8} calls  "
+                         f"mean {mean * 1000:9.3f} ms  max {stats['max'] * 1000:9.3f} ms  "
+                         f"total {stats['sum']:8.3f} s")
+        for counter, value in data['counters'].items():
+            lines.append(f"{counter:24} {value:8}")
+        return '\n'.join(lines)
+
+
+class _Timer:
+    """Context manager returned by Metrics.timer."""
+    __slots__ = ('metrics', 'operation', 'start')
+
+    def __init__(self, metrics, operation):
+        self.metrics = metrics
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.operation, time.perf_counter() - self.start)
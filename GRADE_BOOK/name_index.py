@@ -0,0 +1,89 @@
+"""
+Sorted name index for the gradebook.
+Every word of a student's name (casefolded) is kept in one sorted list
+together with the admin number, so a case-insensitive prefix search is a
+binary search followed by reading the matches in order.
+
+The list is sorted once when the index is built. Students added later are
+only appended to a list of pending entries, which are merged in with one
+sort when the index is next read, so a bulk import of k students costs one
+O(N + k log k) merge instead of k insertions into the middle of the list.
+"""
+
+from bisect import bisect_left
+
+
+def _keys(name):
+    """
+    Get the index keys of a name: the whole name and every later word onward,
+    so "Chad Kelly" can be found by "chad", "chad k" or "kel".
+    """
+    words = name.casefold().split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class NameIndex:
+    """
+    A class to look students up by the start of their name or of any word
+    in it. The gradebook calls student_added, student_removed and
+    marks_changed whenever its students change.
+    """
+    def __init__(self, students=()):
+        """
+        Initialize the index from the students already in a gradebook.
+
+        Args:
+            students (iterable): Student objects to index
+        """
+        self.entries = sorted((key, student.admin_no, student.name)
+                              for student in students for key in _keys(student.name))
+        # Entries of students added since the last merge, in no order
+        self.pending = []
+
+    def _merge(self):
+        """Sort the pending entries into the list."""
+        if self.pending:
+            # The list is one sorted run followed by the new entries, which
+            # Timsort merges in linear time once they are sorted
+            self.entries += self.pending
+            self.entries.sort()
+            self.pending = []
+
+    def student_added(self, student):
+        """Index the name of a student that joined the gradebook."""
+        self.pending.extend((key, student.admin_no, student.name) for key in _keys(student.name))
+
+    def student_removed(self, student):
+        """Remove the name of a student that left the gradebook."""
+        self._merge()
+        for key in _keys(student.name):
+            entry = (key, student.admin_no, student.name)
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """Names do not depend on marks, so there is nothing to do."""
+
+    def find(self, name_prefix, limit=10):
+        """
+        Find students whose name, or a word in it, starts with a prefix.
+
+        Args:
+            name_prefix (str): Start of the name, any case
+            limit (int): Maximum number of students returned
+
+        Returns:
+            dict: Admin number -> name of the matching students, by name
+        """
+        self._merge()
+        prefix = ' '.join(name_prefix.casefold().split())
+        matches = {}
+        position = bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(matches) < limit:
+            key, admin_no, name = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            matches.setdefault(admin_no, name)
+            position += 1
+        return matches
@@ -0,0 +1,273 @@
+"""
+Report cards for every student, with ranks and class statistics.
+The gradebook is walked as a generator and cut into chunks of CHUNK_SIZE
+students; worker processes render the chunks and the main process writes
+them to the output file in order as they come back. Only a few chunks are
+in flight at a time, so memory stays bounded however many students there
+are, and the output does not depend on the number of workers.
+
+Ranks are competition ranks (1, 2, 2, 4), read from tables of how many
+students are above each mark. The tables are computed once from the
+gradebook's cumulative mark counts and handed to every worker, so no
+worker needs to see the other students.
+
+The gradebook is only locked while the statistics and tables are computed
+and the students are written, a chunk at a time, to a temporary file (a
+RowSnapshot). Rendering reads that file back a chunk at a time after the
+lock is released, so other users are not held up and the snapshot costs
+disk space, not memory.
+
+Formats:
+    csv     admin_no,name,<subject>,<subject>_rank,<subject>_class_average,...,
+            total,total_rank,class_size
+    jsonl   one {"admin_no", "name", "subjects", "total", "class_size"} object per line
+    text    one printable card per student
+"""
+
+import csv
+import io
+import json
+import os
+import pickle
+import tempfile
+from collections import deque
+from itertools import islice
+
+from grade_stats import is_valid_mark, total_marks
+
+# Students rendered by one task
+CHUNK_SIZE = 5000
+
+FORMATS = ('csv', 'jsonl', 'text')
+
+# Class context of a worker process, set once by _init_worker
+_CONTEXT = None
+
+
+def report_context(subjects, distributions, statistics):
+    """
+    Gather what every report card needs to know about the class.
+
+    Args:
+        subjects (iterable): Subject names in id order
+        distributions (MarkDistributions): Cumulative mark counts of the class
+        statistics (dict): Extended statistics, as from view_statistics(True)
+
+    Returns:
+        dict: 'subjects' (name, average, median, highest, lowest, out_of
+            and 'above', the number of students above each mark, per
+            subject), 'total' ('out_of' and 'above') and 'class_size'
+    """
+    def above(counts):
+        return [counts.count - counts.count_up_to(key) for key in range(len(counts.tree) - 1)]
+
+    subject_context = []
+    for subject in subjects:
+        counts = distributions.distribution(subject)
+        subject_context.append({
+            'name': subject,
+            'average': statistics[f'Average_{subject}'],
+            'median': statistics[f'Median_{subject}'],
+            'highest': statistics[f'Max_{subject}'],
+            'lowest': statistics[f'Min_{subject}'],
+            'out_of': counts.count,
+            'above': above(counts),
+        })
+    total = distributions.distribution(None)
+    return {'subjects': subject_context,
+            'total': {'out_of': total.count, 'above': above(total)},
+            'class_size': total.count}
+
+
+class RowSnapshot:
+    """
+    A class to represent a copy of the students to report on, taken while
+    the gradebook is locked and read after it is released. The rows are
+    pickled a chunk at a time into an anonymous temporary file, which is
+    deleted when the snapshot is closed; only one chunk is ever in memory.
+    """
+    def __init__(self, rows):
+        """
+        Copy the students.
+
+        Args:
+            rows (iterable): (admin_no, name, scores) per student, in output order
+        """
+        self._file = tempfile.TemporaryFile()
+        self.count = 0
+        rows = iter(rows)
+        chunk = list(islice(rows, CHUNK_SIZE))
+        while chunk:
+            pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.count += len(chunk)
+            chunk = list(islice(rows, CHUNK_SIZE))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yield (admin_no, name, scores) per student."""
+        self._file.seek(0)
+        for _ in range(0, self.count, CHUNK_SIZE):
+            yield from pickle.load(self._file)
+
+    def close(self):
+        """Delete the temporary file."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _card(context, admin_no, name, scores):
+    """Work out the marks and ranks on one student's card."""
+    subjects = {}
+    for subject, marks in zip(context['subjects'], scores):
+        rank = 1 + subject['above'][marks] if is_valid_mark(marks) else None
+        subjects[subject['name']] = {'marks': marks, 'rank': rank,
+                                     'class_average': subject['average'],
+                                     'class_median': subject['median'],
+                                     'class_highest': subject['highest'],
+                                     'class_lowest': subject['lowest']}
+    total = total_marks(scores)
+    return {'admin_no': admin_no, 'name': name, 'subjects': subjects,
+            'total': {'marks': total, 'rank': 1 + context['total']['above'][total]},
+            'class_size': context['class_size']}
+
+
+def _text_card(context, card):
+    """Lay out one card as plain text."""
+    lines = [f"REPORT CARD  {card['name']}  ({card['admin_no']})",
+             f"{'Subject':<14}{'Marks':>6}{'Rank':>14}{'Class avg':>11}{'Median':>9}{'Highest':>9}"]
+    for subject in context['subjects']:
+        entry = card['subjects'][subject['name']]
+        rank = "-" if entry['rank'] is None else f"{entry['rank']}/{subject['out_of']}"
+        lines.append(f"{subject['name']:<14}{entry['marks']!s:>6}{rank:>14}"
+                     f"{entry['class_average']!s:>11}{entry['class_median']!s:>9}"
+                     f"{entry['class_highest']!s:>9}")
+    total = card['total']
+    rank = f"{total['rank']}/{context['total']['out_of']}"
+    lines.append(f"{'Total':<14}{total['marks']:>6}{rank:>14}")
+    return '\n'.join(lines) + '\n' + '-' * 63 + '\n'
+
+
+def render_chunk(context, rows, output_format):
+    """
+    Render the report cards of one chunk of students.
+
+    Args:
+        context (dict): Class context from report_context
+        rows (list): (admin_no, name, scores) per student
+        output_format (str): 'csv', 'jsonl' or 'text'
+
+    Returns:
+        str: The chunk's report cards
+    """
+    if output_format == 'csv':
+        text = io.StringIO()
+        writer = csv.writer(text, lineterminator='\n')
+        for admin_no, name, scores in rows:
+            card = _card(context, admin_no, name, scores)
+            row = [admin_no, name]
+            for entry in card['subjects'].values():
+                row += [entry['marks'], entry['rank'], entry['class_average']]
+            writer.writerow(row + [card['total']['marks'], card['total']['rank'],
+                                   card['class_size']])
+        return text.getvalue()
+    if output_format == 'jsonl':
+        return ''.join(json.dumps(_card(context, *row)) + '\n' for row in rows)
+    return ''.join(_text_card(context, _card(context, *row)) for row in rows)
+
+
+def _init_worker(context):
+    """Pool initializer: keep the class context for every chunk of this worker."""
+    global _CONTEXT
+    _CONTEXT = context
+
+
+def _render_chunk(arguments):
+    """Pool task wrapper around render_chunk, using the worker's class context."""
+    return render_chunk(_CONTEXT, *arguments)
+
+
+def _chunks(rows, output_format):
+    """Cut the stream of students into render tasks."""
+    rows = iter(rows)
+    chunk = list(islice(rows, CHUNK_SIZE))
+    while chunk:
+        yield chunk, output_format
+        chunk = list(islice(rows, CHUNK_SIZE))
+
+
+def write_report_cards(rows, output, context, output_format='csv', workers=None):
+    """
+    Render the report cards of a stream of students to a file.
+
+    Args:
+        rows (iterable): (admin_no, name, scores) per student, in output order
+        output (str): Path of the file to write
+        context (dict): Class context from report_context
+        output_format (str): 'csv', 'jsonl' or 'text'
+        workers (int): Number of rendering processes, by default one per CPU
+
+    Returns:
+        int: Number of report cards written
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown format {output_format!r}, expected one of {', '.join(FORMATS)}")
+    workers = workers or os.cpu_count() or 1
+    temp_output = output + '.tmp'
+    try:
+        written = _write_chunks(rows, temp_output, context, output_format, workers)
+    except BaseException:
+        # A failed render or worker leaves no partial file behind
+        try:
+            os.remove(temp_output)
+        except FileNotFoundError:
+            pass
+        raise
+    os.replace(temp_output, output)
+    return written
+
+
+def _write_chunks(rows, temp_output, context, output_format, workers):
+    """Render every chunk into the temporary output file, in order."""
+    written = 0
+    with open(temp_output, 'w', newline='') as file:
+        if output_format == 'csv':
+            header = ['admin_no', 'name']
+            for subject in context['subjects']:
+                header += [subject['name'], f"{subject['name']}_rank",
+                           f"{subject['name']}_class_average"]
+            csv.writer(file, lineterminator='\n').writerow(
+                header + ['total', 'total_rank', 'class_size'])
+        tasks = _chunks(rows, output_format)
+        if workers > 1:
+            # Imported here so that importing the gradebook stays fast
+            from multiprocessing import Pool
+            with Pool(workers, initializer=_init_worker, initargs=(context,)) as pool:
+                # Limit chunks in flight so memory stays bounded when writing is
+                # slow; the next chunks are read while the workers render
+                window = workers * 2
+                pending = deque()
+                for task in tasks:
+                    pending.append((len(task[0]), pool.apply_async(_render_chunk, (task,))))
+                    if len(pending) >= window:
+                        count, text = pending.popleft()
+                        file.write(text.get())
+                        written += count
+                while pending:
+                    count, text = pending.popleft()
+                    file.write(text.get())
+                    written += count
+        else:
+            for chunk, _ in tasks:
+                file.write(render_chunk(context, chunk, output_format))
+                written += len(chunk)
+    return written
@@ -0,0 +1,91 @@
+"""
+Result cache for the gradebook's reports.
+view_statistics and print_gradebook are remembered until a change makes
+them stale, so asking for the same report again costs a dictionary lookup.
+Results are kept per subject where they depend on one subject only, so a
+mark edit only drops the statistics of the edited subject; adding or
+deleting a student drops everything, since it changes every subject (and
+the order that breaks mode ties) as well as the roster.
+"""
+
+
+class ResultCache:
+    """
+    A class to remember report results keyed by operation and subject (None
+    for results that do not depend on one subject). The gradebook calls
+    student_added, student_removed and marks_changed whenever its students
+    change, and starts a new cache whenever it reloads its data.
+    """
+    def __init__(self, metrics=None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            metrics (Metrics): Also count hits and misses here as
+                'cache_hits' and 'cache_misses'; None counts them only in
+                the hits and misses attributes
+        """
+        self.entries = {}
+        # Bumped by every invalidation, so a result computed while the
+        # gradebook changed (e.g. by another thread) is not remembered
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.metrics = metrics
+
+    def get(self, operation, subject, compute):
+        """
+        Get a remembered result, computing and remembering it on a miss.
+
+        Args:
+            operation (hashable): What was computed, e.g. ('statistics', True)
+            subject (str): Subject the result depends on, None for results
+                that depend on no single subject
+            compute (callable): Called without arguments to compute the result
+
+        Returns:
+            The result; the same object is returned on every hit, so it must
+            not be modified
+        """
+        key = (operation, subject)
+        try:
+            result = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            if self.metrics is not None:
+                self.metrics.increment('cache_misses')
+            generation = self.generation
+            result = compute()
+            if generation == self.generation:
+                self.entries[key] = result
+            return result
+        self.hits += 1
+        if self.metrics is not None:
+            self.metrics.increment('cache_hits')
+        return result
+
+    def clear(self):
+        """Forget every result."""
+        self.generation += 1
+        self.entries.clear()
+
+    def student_added(self, student):
+        """A new student changes every subject and the roster."""
+        self.clear()
+
+    def student_removed(self, student):
+        """A deleted student changes every subject and the roster."""
+        self.clear()
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """A mark edit only makes the results of its subject stale."""
+        self.generation += 1
+        for key in [key for key in self.entries if key[1] == subject]:
+            del self.entries[key]
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'hits', 'misses' and 'entries' currently remembered
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
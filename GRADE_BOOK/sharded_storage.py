@@ -0,0 +1,224 @@
+"""
+Sharded storage for the gradebook.
+Students are spread over a fixed number of JSON shard files by a stable
+hash of their admin number. Shards are read and written in parallel, and
+only shards with changes since the last save are rewritten.
+
+Shard files sit next to the gradebook file:
+    previous_data.json -> previous_data.shard000-of-008.json, ...
+
+Every student also has a "seq" number, increasing in the order students were
+added, stored with their record. Iteration follows it across shards, and a
+load merges the shards back into that order, so the gradebook sees its
+students in the same order as with a single file (the order that breaks
+ties for the mode in view_statistics).
+"""
+
+import heapq
+import json
+import math
+import os
+import zlib
+from collections.abc import MutableMapping
+
+
+def shard_of(admin_no, shard_count):
+    """
+    Find the shard a student belongs to. Uses CRC-32 rather than hash() so
+    the answer is the same in every process.
+
+    Args:
+        admin_no (str): Student's administrative number
+        shard_count (int): Number of shards
+
+    Returns:
+        int: Shard number
+    """
+    return zlib.crc32(admin_no.encode('utf-8')) % shard_count
+
+
+def shard_filenames(filename, shard_count):
+    """
+    Get the file names of every shard of a gradebook file.
+
+    Args:
+        filename (str): Path of the unsharded gradebook file
+        shard_count (int): Number of shards
+
+    Returns:
+        list: Path of each shard file
+    """
+    root, extension = os.path.splitext(filename)
+    return [f"{root}.shard{shard:03d}-of-{shard_count:03d}{extension or '.json'}"
+            for shard in range(shard_count)]
+
+
+def read_shard(filename):
+    """
+    Read one shard file.
+
+    Args:
+        filename (str): Path to the shard file
+
+    Returns:
+        dict or None: Student data of the shard, None if the file is missing
+    """
+    try:
+        with open(filename, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_shard(filename, data):
+    """
+    Replace one shard file atomically.
+
+    Args:
+        filename (str): Path to the shard file
+        data (dict): Student data of the shard
+    """
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w') as file:
+        json.dump(data, file, indent=4)
+    os.replace(temp_filename, filename)
+
+
+def _executor(kind, workers):
+    """Create the pool used to read or write shards."""
+    # Imported here: concurrent.futures is slow to import and only sharded storage needs it
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+class ShardedStudents(MutableMapping):
+    """
+    A dictionary-like mapping of admin number to Student, split into one
+    dictionary per shard. Lookups go straight to the owning shard; iteration
+    follows the order students were added in, over all shards. The
+    gradebook also calls student_added, student_removed and marks_changed,
+    which mark the student's shard as needing to be saved.
+    """
+    def __init__(self, filename, shard_count, executor='thread', workers=None):
+        """
+        Initialize empty shards.
+
+        Args:
+            filename (str): Path of the unsharded gradebook file
+            shard_count (int): Number of shards
+            executor (str): 'thread' or 'process' pool for reading and writing
+            workers (int): Pool size, by default one per shard up to the CPU count
+        """
+        self.filenames = shard_filenames(filename, shard_count)
+        self.shards = [{} for _ in range(shard_count)]
+        # Admin number -> seq, in the order students were added
+        self.order = {}
+        self.next_seq = 0
+        # Seq numbers of records read by ordered_records, not inserted yet
+        self._stored_seqs = {}
+        self.dirty = set()
+        self.executor = executor
+        self.workers = workers or min(shard_count, os.cpu_count() or 1)
+
+    def _shard(self, admin_no):
+        """Get the dictionary of the shard owning an admin number."""
+        return self.shards[shard_of(admin_no, len(self.shards))]
+
+    def __getitem__(self, admin_no):
+        return self._shard(admin_no)[admin_no]
+
+    def __setitem__(self, admin_no, student):
+        shard = self._shard(admin_no)
+        if admin_no not in shard:
+            seq = self._stored_seqs.pop(admin_no, None)
+            if seq is None or seq < self.next_seq:
+                seq = self.next_seq
+            self.order[admin_no] = seq
+            self.next_seq = seq + 1
+        shard[admin_no] = student
+
+    def __delitem__(self, admin_no):
+        del self._shard(admin_no)[admin_no]
+        del self.order[admin_no]
+
+    def __contains__(self, admin_no):
+        return admin_no in self._shard(admin_no)
+
+    def get(self, admin_no, default=None):
+        return self._shard(admin_no).get(admin_no, default)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def student_added(self, student):
+        """Mark the shard of a new student for saving."""
+        self.dirty.add(shard_of(student.admin_no, len(self.shards)))
+
+    def student_removed(self, student):
+        """Mark the shard of a removed student for saving."""
+        self.dirty.add(shard_of(student.admin_no, len(self.shards)))
+
+    def marks_changed(self, student, subject, old_marks, new_marks):
+        """Mark the shard of an edited student for saving."""
+        self.dirty.add(shard_of(student.admin_no, len(self.shards)))
+
+    def read_all(self):
+        """
+        Read every shard file in parallel.
+
+        Returns:
+            list or None: Student data of each shard in shard order, or None
+                if no shard file exists yet
+        """
+        with _executor(self.executor, self.workers) as pool:
+            shards = list(pool.map(read_shard, self.filenames))
+        if all(shard is None for shard in shards):
+            return None
+        return [shard or {} for shard in shards]
+
+    def ordered_records(self, shard_data):
+        """
+        Merge the records read from the shards back into the order students
+        were added in. Each shard is stored in that order already, so this is
+        a merge rather than a sort. Students inserted from the records keep
+        their seq numbers; records without one (shards written before seq
+        numbers were stored) come after, shard by shard.
+
+        Args:
+            shard_data (list): Student data of each shard, from read_all
+
+        Yields:
+            tuple: (admin_no, info) per student
+        """
+        for admin_no, info in heapq.merge(*(data.items() for data in shard_data),
+                                          key=lambda record: record[1].get('seq', math.inf)):
+            seq = info.pop('seq', None)
+            if isinstance(seq, int):
+                # Taken by __setitem__ when the gradebook inserts this student
+                self._stored_seqs[admin_no] = seq
+            yield admin_no, info
+
+    def save(self):
+        """
+        Write the shards changed since the last save, in parallel.
+
+        Returns:
+            int: Number of shard files written
+        """
+        dirty = sorted(self.dirty)
+        if not dirty:
+            return 0
+        data = [{admin_no: {"name": student.name,
+                            "marks": dict(zip(student.subjects, student.scores)),
+                            "seq": self.order[admin_no]}
+                 for admin_no, student in self.shards[shard].items()}
+                for shard in dirty]
+        with _executor(self.executor, self.workers) as pool:
+            list(pool.map(write_shard, [self.filenames[shard] for shard in dirty], data))
+        self.dirty.clear()
+        return len(dirty)
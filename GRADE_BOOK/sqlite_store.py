@@ -0,0 +1,432 @@
+"""
+SQLite storage engine for the gradebook.
+Students live in one table of a local SQLite database, one row per student
+and one column per subject, with indexes on the admin number (the primary
+key), the name and every subject's marks. Each add, delete or mark edit is
+its own single-row transaction, so nothing is rewritten as a whole, and
+statistics are computed by the database with one GROUP BY per subject.
+
+Convert to and from the JSON format with:
+    python sqlite_store.py import previous_data.json previous_data.db
+    python sqlite_store.py export previous_data.db previous_data.json
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from columnar_store import DetachedStudent
+from grade_stats import SubjectHistogram, is_valid_mark
+from json_stream import iter_records
+from subjects import subjects_of_file
+
+
+def _column(subject):
+    """Quote a subject name for use as a column name."""
+    return '"' + subject.replace('"', '""') + '"'
+
+
+class SQLiteMarksView(MutableMapping):
+    """
+    A dictionary-like view of one student's marks, reading from and writing
+    to the student's row in a SQLiteStudents store.
+    """
+    __slots__ = ('_student',)
+
+    def __init__(self, student):
+        self._student = student
+
+    def __getitem__(self, subject):
+        return self._student._store.get_mark(self._student.admin_no, subject)
+
+    def __setitem__(self, subject, marks):
+        self._student._store.set_mark(self._student.admin_no, subject, marks)
+
+    def __delitem__(self, subject):
+        raise TypeError("subjects cannot be removed from a SQLite store")
+
+    def __iter__(self):
+        return iter(self._student._store.subjects)
+
+    def __len__(self):
+        return len(self._student._store.subjects)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class SQLiteStudent:
+    """
+    A Student-like object for one row of a SQLiteStudents store.
+    Supports the same attributes and methods as Student.
+    """
+    __slots__ = ('_store', 'admin_no', 'name', '_gradebook')
+
+    def __init__(self, store, admin_no, name):
+        self._store = store
+        self.admin_no = admin_no
+        self.name = name
+        self._gradebook = store.gradebook
+
+    @property
+    def marks(self):
+        return SQLiteMarksView(self)
+
+    @property
+    def scores(self):
+        """list: Marks in subject id order, read from the student's row."""
+        return self._store.scores(self.admin_no)
+
+    def set_marks(self, subject, marks):
+        """
+        Set marks for a specific subject with validation.
+
+        Args:
+            subject (str): Subject name
+            marks (int): Marks to be set (a whole number between 0 and 100)
+
+        Returns:
+            bool: True if marks were set successfully, False otherwise
+        """
+        if subject in self._store.subjects and is_valid_mark(marks):
+            student_marks = self.marks
+            old_marks = student_marks[subject]
+            student_marks[subject] = marks
+            if self._gradebook is not None:
+                self._gradebook._marks_changed(self, subject, old_marks, marks)
+            return True
+        return False
+
+    def get_marks(self, subject):
+        """
+        Retrieve marks for a specific subject.
+
+        Args:
+            subject (str): Subject name
+
+        Returns:
+            int or None: Marks if valid, None if invalid
+        """
+        return self.marks.get(subject)
+
+    def edit_marks(self, subject, new_marks):
+        """
+        Edit existing marks for a subject.
+
+        Args:
+            subject (str): Subject name
+            new_marks (int): New marks to be set
+
+        Returns:
+            bool or None: True if edit successful, False/None if failed
+        """
+        return self.set_marks(subject, new_marks) if subject else None
+
+
+class SQLiteStudents(MutableMapping):
+    """
+    A dictionary-like mapping of admin number to student backed by a SQLite
+    database. Students are returned as views whose marks are read from, and
+    written to, their row. Rows are kept in insertion order by rowid.
+    """
+    def __init__(self, subjects, gradebook=None):
+        """
+        Initialize a store with no database open yet.
+
+        Args:
+            subjects (iterable): Subjects every student is graded in, in id order
+            gradebook (Gradebook): Gradebook notified when a view's marks change
+        """
+        self.gradebook = gradebook
+        self.subjects = list(subjects)
+        self.connection = None
+        self._depth = 0
+
+    def open(self, filename):
+        """
+        Open (or create) a database file and make sure the table and its
+        indexes exist.
+
+        Args:
+            filename (str): Path to the SQLite database
+        """
+        self.close()
+        # The gradebook's own lock serializes access from loader and server threads
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        columns = ''.join(f", {_column(subject)} INTEGER" for subject in self.subjects)
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS students "
+                f"(admin_no TEXT PRIMARY KEY, name TEXT NOT NULL{columns})")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS students_name ON students (name)")
+            for subject in self.subjects:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_column('students_' + subject)} "
+                    f"ON students ({_column(subject)})")
+
+    def close(self):
+        """Close the database, if one is open."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group the changes made inside the block into one transaction, which
+        is rolled back if the block raises. Blocks may be nested; only the
+        outermost one commits.
+        """
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            if self._depth == 1:
+                self.connection.rollback()
+            raise
+        else:
+            if self._depth == 1:
+                self.connection.commit()
+        finally:
+            self._depth -= 1
+
+    def _write(self, sql, parameters):
+        """Run one change, committing it unless a transaction is open."""
+        cursor = self.connection.execute(sql, parameters)
+        if not self._depth:
+            self.connection.commit()
+        return cursor
+
+    def _check_subject(self, subject):
+        """Raise KeyError for a subject that has no column."""
+        if subject not in self.subjects:
+            raise KeyError(subject)
+
+    def get_mark(self, admin_no, subject):
+        """
+        Read one mark of one student.
+
+        Args:
+            admin_no (str): Student's administrative number
+            subject (str): Subject name
+
+        Returns:
+            int or None: The mark, None if it is missing
+        """
+        self._check_subject(subject)
+        row = self.connection.execute(
+            f"SELECT {_column(subject)} FROM students WHERE admin_no = ?",
+            (admin_no,)).fetchone()
+        if row is None:
+            raise KeyError(admin_no)
+        return row[0]
+
+    def scores(self, admin_no):
+        """
+        Read every mark of one student.
+
+        Args:
+            admin_no (str): Student's administrative number
+
+        Returns:
+            list: Marks in subject order, None where a mark is missing
+        """
+        columns = ', '.join(_column(subject) for subject in self.subjects)
+        row = self.connection.execute(
+            f"SELECT {columns} FROM students WHERE admin_no = ?", (admin_no,)).fetchone()
+        if row is None:
+            raise KeyError(admin_no)
+        return list(row)
+
+    def set_mark(self, admin_no, subject, marks):
+        """
+        Change one mark of one student.
+
+        Args:
+            admin_no (str): Student's administrative number
+            subject (str): Subject name
+            marks (int): New mark
+        """
+        self._check_subject(subject)
+        cursor = self._write(f"UPDATE students SET {_column(subject)} = ? WHERE admin_no = ?",
+                             (marks, admin_no))
+        if not cursor.rowcount:
+            raise KeyError(admin_no)
+
+    def __getitem__(self, admin_no):
+        row = self.connection.execute(
+            "SELECT name FROM students WHERE admin_no = ?", (admin_no,)).fetchone()
+        if row is None:
+            raise KeyError(admin_no)
+        return SQLiteStudent(self, admin_no, row[0])
+
+    def __setitem__(self, admin_no, student):
+        columns = ''.join(f", {_column(subject)}" for subject in self.subjects)
+        placeholders = ', ?' * len(self.subjects)
+        updates = ''.join(f", {_column(subject)} = excluded.{_column(subject)}"
+                          for subject in self.subjects)
+        # An upsert keeps the rowid, and so the position, of a replaced student
+        self._write(f"INSERT INTO students (admin_no, name{columns}) VALUES (?, ?{placeholders}) "
+                    f"ON CONFLICT (admin_no) DO UPDATE SET name = excluded.name{updates}",
+                    (admin_no, student.name, *student.scores))
+
+    def __delitem__(self, admin_no):
+        if not self._write("DELETE FROM students WHERE admin_no = ?", (admin_no,)).rowcount:
+            raise KeyError(admin_no)
+
+    def pop(self, admin_no, *default):
+        """Remove a student and return a detached copy of it."""
+        columns = ', '.join(_column(subject) for subject in self.subjects)
+        row = self.connection.execute(
+            f"SELECT name, {columns} FROM students WHERE admin_no = ?", (admin_no,)).fetchone()
+        if row is None:
+            if default:
+                return default[0]
+            raise KeyError(admin_no)
+        del self[admin_no]
+        return DetachedStudent(admin_no, row[0], self.subjects, list(row[1:]))
+
+    def __iter__(self):
+        for (admin_no,) in self.connection.execute(
+                "SELECT admin_no FROM students ORDER BY rowid"):
+            yield admin_no
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def __contains__(self, admin_no):
+        return self.connection.execute(
+            "SELECT 1 FROM students WHERE admin_no = ?", (admin_no,)).fetchone() is not None
+
+    def values(self):
+        for _, student in self.items():
+            yield student
+
+    def items(self):
+        # Names are read in the same query, so listing students is one scan;
+        # rows are fetched as the caller goes, never all at once
+        for admin_no, name in self.connection.execute(
+                "SELECT admin_no, name FROM students ORDER BY rowid"):
+            yield admin_no, SQLiteStudent(self, admin_no, name)
+
+    def records(self):
+        """Yield (admin_no, name, marks) for every student in order."""
+        columns = ', '.join(_column(subject) for subject in self.subjects)
+        for row in self.connection.execute(
+                f"SELECT admin_no, name, {columns} FROM students ORDER BY rowid"):
+            yield row[0], row[1], dict(zip(self.subjects, row[2:]))
+
+    def histogram(self, subject):
+        """
+        Count the marks of one subject inside the database.
+
+        Args:
+            subject (str): Subject name
+
+        Returns:
+            tuple: (SubjectHistogram, marks in order of their first appearance),
+                which is all subject_statistics needs
+        """
+        self._check_subject(subject)
+        column = _column(subject)
+        histogram = SubjectHistogram()
+        first_seen = []
+        for mark, count, first_row in self.connection.execute(
+                f"SELECT {column}, COUNT(*), MIN(rowid) FROM students "
+                f"WHERE {column} BETWEEN 0 AND 100 GROUP BY {column}"):
+            if is_valid_mark(mark):
+                histogram.counts[mark] = count
+                histogram.total += mark * count
+                histogram.count += count
+                first_seen.append((first_row, mark))
+        return histogram, [mark for _, mark in sorted(first_seen)]
+
+
+def stored_subjects(database_filename):
+    """
+    Read the subject columns of an existing gradebook database.
+
+    Args:
+        database_filename (str): Path to the database
+
+    Returns:
+        list or None: Subject names, None if there is no gradebook database
+    """
+    if not os.path.exists(database_filename):
+        return None
+    connection = sqlite3.connect(database_filename)
+    try:
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(students)")]
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        connection.close()
+    return columns[2:] or None
+
+
+def json_to_sqlite(json_filename, database_filename, subjects):
+    """
+    Copy a gradebook JSON file into a new SQLite database in one transaction.
+
+    Args:
+        json_filename (str): Path to the JSON file
+        database_filename (str): Path to the database to create
+        subjects (list): Subject columns of the database
+
+    Returns:
+        int: Number of students copied
+
+    Raises:
+        ValueError: If the database already holds students
+    """
+    store = SQLiteStudents(subjects)
+    store.open(database_filename)
+    try:
+        if len(store):
+            raise ValueError(f"{database_filename} already holds students")
+        columns = ''.join(f", {_column(subject)}" for subject in subjects)
+        placeholders = ', ?' * len(subjects)
+        with store.connection:
+            cursor = store.connection.executemany(
+                f"INSERT INTO students (admin_no, name{columns}) VALUES (?, ?{placeholders})",
+                ((admin_no, info['name'], *(info['marks'].get(subject) for subject in subjects))
+                 for admin_no, info in iter_records(json_filename)))
+        return cursor.rowcount
+    finally:
+        store.close()
+
+
+def sqlite_to_json(database_filename, json_filename, subjects):
+    """
+    Write the students of a SQLite database back to the gradebook JSON format.
+
+    Args:
+        database_filename (str): Path to the database
+        json_filename (str): Path to the JSON file to write
+        subjects (list): Subject columns of the database
+    """
+    store = SQLiteStudents(subjects)
+    store.open(database_filename)
+    try:
+        data = {admin_no: {"name": name, "marks": marks}
+                for admin_no, name, marks in store.records()}
+    finally:
+        store.close()
+    with open(json_filename, 'w') as file:
+        json.dump(data, file, indent=4)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python sqlite_store.py import|export SOURCE DESTINATION")
+        sys.exit(1)
+    if sys.argv[1] == 'import':
+        subjects = subjects_of_file(sys.argv[2]) or ["Maths", "SST", "English", "Science"]
+        json_to_sqlite(sys.argv[2], sys.argv[3], subjects)
+    else:
+        sqlite_to_json(sys.argv[2], sys.argv[3], stored_subjects(sys.argv[2]) or [])
+    print(f"Converted {sys.argv[2]} to {sys.argv[3]}")
@@ -0,0 +1,132 @@
+"""
+Multi-process stress test for shared gradebooks (Gradebook(shared=True)).
+Several processes open the same data file and, at the same time, add their
+own students, edit their marks, delete some of them and edit the marks of
+students that every process touches. Afterwards the file is opened once
+more and checked for lost updates: every process's own students must have
+exactly the marks it last set, and no deleted student may come back.
+Throughput and per-operation latency show the contention.
+
+Run on a temporary copy of the sample data:
+    python stress_test.py --processes 4 --operations 500
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+SUBJECTS = ["Maths", "SST", "English", "Science"]
+
+
+def worker(filename, number, operations, compact_every, seed):
+    """
+    Run random operations against a shared gradebook in one process.
+
+    Returns:
+        tuple: (expected marks of this process's students by admin number,
+            latency of each operation)
+    """
+    from Advanced_gradebook_implementation import Gradebook, Student
+    rng = random.Random(seed)
+    gradebook = Gradebook(filename, journaled=True, shared=True, compact_every=compact_every)
+    common = sorted(gradebook.students)[:10]
+    own = {}
+    latencies = []
+    for operation in range(operations):
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll < 0.3 or not own:
+            admin_no = f"P{number}-{operation}"
+            student = Student(admin_no, f"Stress Student {number} {operation}")
+            student.marks = {subject: rng.randint(0, 100) for subject in SUBJECTS}
+            gradebook.add_student(student)
+            own[admin_no] = dict(student.marks)
+        elif roll < 0.4:
+            admin_no = rng.choice(sorted(own))
+            gradebook.delete_student(admin_no)
+            del own[admin_no]
+        elif roll < 0.8:
+            admin_no = rng.choice(sorted(own))
+            subject = rng.choice(SUBJECTS)
+            marks = rng.randint(0, 100)
+            gradebook.get_student(admin_no).edit_marks(subject, marks)
+            gradebook.commit()
+            own[admin_no][subject] = marks
+        else:
+            # Every process edits these, so the last writer wins
+            student = gradebook.get_student(rng.choice(common))
+            if student is not None:
+                student.edit_marks(rng.choice(SUBJECTS), rng.randint(0, 100))
+                gradebook.commit()
+        latencies.append(time.perf_counter() - start)
+    return own, latencies
+
+
+def run_stress_test(filename, processes=4, operations=500, compact_every=200):
+    """
+    Run worker processes against one data file and check the result.
+
+    Args:
+        filename (str): Data file shared by the workers
+        processes (int): Number of worker processes
+        operations (int): Operations per worker
+        compact_every (int): Journal records between compactions
+
+    Returns:
+        dict: 'operations', 'seconds', 'operations_per_second', latency
+            percentiles 'p50' and 'p99', and 'lost_updates'
+    """
+    from Advanced_gradebook_implementation import Gradebook
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(worker, [(filename, number, operations, compact_every, number)
+                                        for number in range(processes)])
+    seconds = time.perf_counter() - start
+
+    final = Gradebook(filename, journaled=True, shared=True)
+    lost_updates = 0
+    for own, _ in results:
+        for admin_no, marks in own.items():
+            student = final.get_student(admin_no)
+            if student is None or dict(student.marks) != marks:
+                lost_updates += 1
+    prefixes = tuple(f"P{number}-" for number in range(processes))
+    lost_updates += sum(1 for admin_no in final.students
+                        if admin_no.startswith(prefixes)
+                        and not any(admin_no in own for own, _ in results))
+    latencies = sorted(latency for _, worker_latencies in results
+                       for latency in worker_latencies)
+    return {
+        'operations': len(latencies),
+        'seconds': seconds,
+        'operations_per_second': len(latencies) / seconds,
+        'p50': latencies[len(latencies) // 2],
+        'p99': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        'lost_updates': lost_updates,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress test a shared gradebook.")
+    parser.add_argument('--file', default='previous_data.json',
+                        help="data file copied to a temporary directory for the test")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--operations', type=int, default=500)
+    parser.add_argument('--compact-every', type=int, default=200)
+    arguments = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(directory, os.path.basename(arguments.file))
+        shutil.copy(arguments.file, copy)
+        results = run_stress_test(copy, arguments.processes, arguments.operations,
+                                  arguments.compact_every)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"{results['operations']} operations by {arguments.processes} processes in "
+          f"{results['seconds']:.2f}s: {results['operations_per_second']:.0f} operations/second")
+    print(f"latency p50 {results['p50'] * 1000:.2f} ms, p99 {results['p99'] * 1000:.2f} ms")
+    print(f"lost updates: {results['lost_updates']}")
@@ -0,0 +1,143 @@
+"""
+Subject registry for the gradebook.
+A gradebook's subjects are not fixed: they are read from the data file
+(the marks of the first stored student) or given when a new gradebook is
+created. Each subject gets a dense integer id, its position in the
+registry, so a student's marks are kept in a list indexed by id instead of
+a dictionary, and histograms are found by position too.
+"""
+
+from collections.abc import MutableMapping
+
+from json_stream import iter_records
+
+
+class SubjectRegistry:
+    """
+    A class to represent the ordered subjects of a gradebook and their ids.
+    Iterating over a registry gives the subject names in id order.
+    """
+    def __init__(self, names):
+        """
+        Initialize the registry.
+
+        Args:
+            names (iterable): Subject names in id order
+
+        Raises:
+            ValueError: If a name is empty, not a string or repeated
+        """
+        self.names = tuple(names)
+        self.ids = {}
+        for subject_id, name in enumerate(self.names):
+            if not isinstance(name, str) or not name.strip():
+                raise ValueError(f"Invalid subject name: {name!r}")
+            if name in self.ids:
+                raise ValueError(f"Subject listed twice: {name!r}")
+            self.ids[name] = subject_id
+
+    def id_of(self, subject):
+        """
+        Args:
+            subject (str): Subject name
+
+        Returns:
+            int: Id of the subject
+
+        Raises:
+            KeyError: If the subject is not in the registry
+        """
+        return self.ids[subject]
+
+    def to_dict(self, scores):
+        """
+        Args:
+            scores (sequence): Marks in id order
+
+        Returns:
+            dict: Subject name -> marks
+        """
+        return dict(zip(self.names, scores))
+
+    def to_scores(self, marks):
+        """
+        Args:
+            marks (dict): Subject name -> marks; missing subjects get None
+
+        Returns:
+            list: Marks in id order
+        """
+        return list(map(marks.get, self.names))
+
+    def __contains__(self, subject):
+        return subject in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, subject_id):
+        return self.names[subject_id]
+
+    def __eq__(self, other):
+        if not isinstance(other, SubjectRegistry):
+            return NotImplemented
+        return self.names == other.names
+
+    def __hash__(self):
+        return hash(self.names)
+
+    def __repr__(self):
+        return f"SubjectRegistry({list(self.names)!r})"
+
+
+class ScoresView(MutableMapping):
+    """
+    A dictionary-like view of a list of marks in subject id order, keyed by
+    subject name. Subjects can be changed but not added or removed.
+    """
+    __slots__ = ('_subjects', '_scores')
+
+    def __init__(self, subjects, scores):
+        self._subjects = subjects
+        self._scores = scores
+
+    def __getitem__(self, subject):
+        return self._scores[self._subjects.ids[subject]]
+
+    def __setitem__(self, subject, marks):
+        self._scores[self._subjects.ids[subject]] = marks
+
+    def __delitem__(self, subject):
+        raise TypeError("subjects cannot be removed from a student")
+
+    def __iter__(self):
+        return iter(self._subjects.names)
+
+    def __len__(self):
+        return len(self._subjects.names)
+
+    def __repr__(self):
+        return repr(self._subjects.to_dict(self._scores))
+
+
+def subjects_of_file(filename):
+    """
+    Read the subjects of a gradebook JSON file from the marks of its first
+    student, without parsing the rest of the file.
+
+    Args:
+        filename (str): Path to the JSON file
+
+    Returns:
+        list or None: Subject names, None if the file is missing, empty or
+            not a gradebook file
+    """
+    try:
+        for _, info in iter_records(filename):
+            return list(info['marks'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
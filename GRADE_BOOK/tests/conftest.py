@@ -0,0 +1,19 @@
+"""Shared fixtures for the gradebook tests."""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+# The gradebook modules import each other by name from GRADE_BOOK
+GRADE_BOOK = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GRADE_BOOK)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    """A copy of the sample gradebook data file, so tests never touch the original."""
+    filename = tmp_path / 'previous_data.json'
+    shutil.copy(os.path.join(GRADE_BOOK, 'previous_data.json'), filename)
+    return str(filename)
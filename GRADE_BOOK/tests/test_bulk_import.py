@@ -0,0 +1,77 @@
+"""Tests for importing students from CSV and JSON Lines files."""
+
+import json
+
+from Advanced_gradebook_implementation import Gradebook
+from bulk_import import print_report, read_mark_updates, read_students
+
+HEADER = 'admin_no,name,Maths,SST,English,Science\n'
+
+
+def write(path, data):
+    """Write a str or bytes test file and return its name."""
+    path.write_bytes(data.encode('utf-8') if isinstance(data, str) else data)
+    return str(path)
+
+
+def test_csv_import_skips_invalid_rows(data_file, tmp_path):
+    filename = write(tmp_path / 'new.csv', HEADER
+                     + '2500000001,Jane Doe,70,60,50,40\n'
+                     + '2500000002,,70,60,50,40\n'
+                     + '2500000003,Bad Marks,70,60,50,101\n'
+                     + '2400711001,Already There,70,60,50,40\n'
+                     + '2500000001,Twice,70,60,50,40\n'
+                     + '2500000004,John Roe,1,2,3,4\n')
+    gradebook = Gradebook(data_file, journaled=True)
+    report = gradebook.add_students(read_students(filename, gradebook.subjects))
+
+    assert report['added'] == 2
+    assert [(row, admin_no) for row, admin_no, _ in report['rejected']] \
+        == [(2, '2500000002'), (3, '2500000003'), (4, '2400711001'), (5, '2500000001')]
+    assert gradebook.get_student('2500000004').marks == {
+        'Maths': 1, 'SST': 2, 'English': 3, 'Science': 4}
+    reopened = Gradebook(data_file, journaled=True)
+    assert reopened.get_student('2500000001').name == 'Jane Doe'
+    assert len(reopened.students) == len(gradebook.students) == 202
+
+
+def test_jsonl_import_reports_malformed_lines(data_file, tmp_path):
+    marks = {'Maths': 70, 'SST': 60, 'English': 50, 'Science': 40}
+    lines = [json.dumps({'admin_no': '2500000001', 'name': 'Jane Doe', 'marks': marks}),
+             'not json', '',
+             json.dumps({'admin_no': '2500000002', 'name': 'John Roe', 'marks': dict(marks, SST=None)})]
+    filename = write(tmp_path / 'new.jsonl', '\n'.join(lines) + '\n')
+    gradebook = Gradebook(data_file)
+    report = gradebook.add_students(read_students(filename, gradebook.subjects))
+
+    assert report['added'] == 1
+    assert [reason for _, _, reason in report['rejected']] \
+        == ['malformed row', 'SST marks must be a whole number between 0 and 100']
+
+
+def test_unreadable_file_adds_nobody(data_file, tmp_path, capsys):
+    rows = ''.join(f'25000000{number:02d},Student {number},70,60,50,40\n' for number in range(50))
+    filename = write(tmp_path / 'new.csv', HEADER.encode() + rows.encode()
+                     + b'2500000099,Caf\xe9,70,60,50,40\n')
+    gradebook = Gradebook(data_file, journaled=True)
+    report = gradebook.add_students(read_students(filename, gradebook.subjects))
+
+    assert report['added'] == 0 and len(report['rejected']) == 1
+    assert 'could not be read' in report['rejected'][0][2]
+    assert len(gradebook.students) == 200
+    assert len(Gradebook(data_file, journaled=True).students) == 200
+    print_report(report)
+    assert 'Added 0 students, rejected 1.' in capsys.readouterr().out
+
+
+def test_unreadable_mark_updates_change_nothing(data_file, tmp_path):
+    # A field longer than the csv module's limit cannot be read
+    filename = write(tmp_path / 'marks.csv', 'admin_no,subject,marks\n2400711001,Maths,1\n'
+                     + '2400711002,' + 'M' * 200000 + ',2\n')
+    gradebook = Gradebook(data_file)
+    old_marks = gradebook.get_student('2400711001').marks['Maths']
+    report = gradebook.update_marks(read_mark_updates(filename))
+    assert report['updated'] == 0
+    assert [(row, reason.split(':')[0]) for row, _, reason in report['rejected']] \
+        == [(2, 'file could not be read')]
+    assert gradebook.get_student('2400711001').marks['Maths'] == old_marks
@@ -0,0 +1,75 @@
+"""Tests for the scripted command line, gradebook_cli.py."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook
+from conftest import GRADE_BOOK
+from gradebook_cli import run
+
+ADMIN_NO = '2400711001'
+
+
+@pytest.fixture
+def cli(data_file, capsys):
+    """Run a command on the test data file; gives (exit status, printed JSON)."""
+    def cli(*argv):
+        status = run(['--file', data_file, *argv])
+        return status, json.loads(capsys.readouterr().out)
+    return cli
+
+
+def test_add_set_mark_and_delete(cli, data_file):
+    status, added = cli('add', '2500000001', 'Jane Doe', 'Maths=80', 'Science=85')
+    assert status == 0
+    assert added['marks'] == {'Maths': 80, 'SST': 0, 'English': 0, 'Science': 85}
+    assert cli('set-mark', '2500000001', 'SST', '75') == (0, {
+        'admin_no': '2500000001', 'name': 'Jane Doe',
+        'marks': {'Maths': 80, 'SST': 75, 'English': 0, 'Science': 85}})
+    assert Gradebook(data_file).get_student('2500000001').marks['SST'] == 75
+    assert cli('delete', '2500000001') == (0, {'admin_no': '2500000001', 'deleted': True})
+    assert Gradebook(data_file).get_student('2500000001') is None
+
+
+def test_errors_are_reported_as_json(cli, data_file):
+    assert cli('grades', '2500000001') == (1, {'error': 'Student does not exist in the system!'})
+    status, result = cli('set-mark', ADMIN_NO, 'Maths', '101')
+    assert status == 1 and 'whole number' in result['error']
+    status, result = cli('add', ADMIN_NO, 'Someone', 'Maths=1')
+    assert status == 1 and 'already exists' in result['error']
+    status, result = cli('history', ADMIN_NO)
+    assert status == 1 and '--history' in result['error']
+    assert Gradebook(data_file).get_student(ADMIN_NO).name != 'Someone'
+
+
+def test_reports_match_the_gradebook(cli, data_file):
+    gradebook = Gradebook(data_file)
+    assert cli('stats', '--extended') == (0, gradebook.view_statistics(extended=True))
+    assert cli('grades', ADMIN_NO)[1]['marks'] == dict(gradebook.get_student(ADMIN_NO).marks)
+    assert cli('top', '--subject', 'Maths', '-k', '3') == (0, gradebook.top_students('Maths', 3))
+    assert cli('rank', ADMIN_NO)[1]['rank'] == gradebook.student_rank(ADMIN_NO)['rank']
+    assert cli('percentile', '--at', '50')[1] == {'50': gradebook.percentile(50)}
+    status, result = cli('query', 'Maths:0-45', 'Science:90-100')
+    assert status == 0
+    assert [student['admin_no'] for student in result['students']] \
+        == list(gradebook.query('Maths', 0, 45) & gradebook.query('Science', 90, 100))
+
+
+def test_history_commands(cli):
+    assert cli('--history', 'set-mark', ADMIN_NO, 'Maths', '7')[0] == 0
+    status, changes = cli('--history', 'history', ADMIN_NO)
+    assert status == 0 and [change['new'] for change in changes] == [7]
+    status, result = cli('--history', 'as-of', '2100-01-01', ADMIN_NO)
+    assert status == 0 and result['marks']['Maths'] == 7
+
+
+def test_colorama_is_not_imported():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([GRADE_BOOK, os.environ.get('PYTHONPATH', '')]))
+    output = subprocess.run([sys.executable, '-c', "import sys, gradebook_cli\n"
+                             "print('colorama' in sys.modules)"],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    assert output.strip() == 'False'
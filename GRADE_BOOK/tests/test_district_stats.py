@@ -0,0 +1,37 @@
+"""Tests that statistics merged across files match one gradebook holding them all."""
+
+import json
+import random
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook
+from district_stats import combined_statistics
+
+
+@pytest.fixture
+def school_files(data_file, tmp_path):
+    """The sample students split into three files, plus one file with all of them."""
+    with open(data_file) as file:
+        data = json.load(file)
+    rnd = random.Random(7)
+    for info in data.values():
+        info['marks'] = {subject: rnd.randint(0, 100) for subject in info['marks']}
+    admin_nos = list(data)
+    filenames = []
+    for number, part in enumerate((admin_nos[:50], admin_nos[50:60], admin_nos[60:])):
+        filename = str(tmp_path / f'school_{number}.json')
+        with open(filename, 'w') as file:
+            json.dump({admin_no: data[admin_no] for admin_no in part}, file)
+        filenames.append(filename)
+    whole = str(tmp_path / 'district.json')
+    with open(whole, 'w') as file:
+        json.dump(data, file)
+    return filenames, whole
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_merged_statistics_match_one_gradebook(school_files, workers):
+    filenames, whole = school_files
+    assert combined_statistics(filenames, workers=workers, extended=True) \
+        == Gradebook(whole).view_statistics(extended=True)
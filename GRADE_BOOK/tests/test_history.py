@@ -0,0 +1,111 @@
+"""Tests for the grade history: point-in-time queries, checkpoints and sharing."""
+
+import json
+import os
+import time
+
+from Advanced_gradebook_implementation import Gradebook
+from grade_history import GradeHistory, is_kept
+from test_shared import run_in_other_process
+
+ADMIN_NO = '2400711001'
+
+
+def as_json(gradebook):
+    """The students in the format of the JSON data file."""
+    return {admin_no: {"name": student.name, "marks": dict(student.marks)}
+            for admin_no, student in gradebook.students.items()}
+
+
+def tick():
+    """A time between the changes before and after, which have millisecond timestamps."""
+    time.sleep(0.002)
+    now = time.time()
+    time.sleep(0.002)
+    return now
+
+
+def test_opening_writes_nothing(data_file):
+    gradebook = Gradebook(data_file, journaled=True, history=True)
+    gradebook.view_statistics()
+    assert gradebook.grades_as_of(time.time()) is None
+    assert not os.path.exists(data_file + '.history.checkpoints')
+
+
+def test_grades_as_of(data_file):
+    gradebook = Gradebook(data_file, journaled=True, history=True)
+    original = as_json(gradebook)
+    student = gradebook.get_student(ADMIN_NO)
+    old_marks = student.marks['Maths']
+    student.edit_marks('Maths', 1)
+    gradebook.commit()
+    after_first = tick()
+    gradebook.delete_student('2400711002')
+    now = tick()
+
+    assert gradebook.grades_as_of(now) == as_json(gradebook)
+    at_first = gradebook.grades_as_of(after_first)
+    assert at_first[ADMIN_NO]['marks']['Maths'] == 1
+    assert '2400711002' in at_first
+    # The history starts from the gradebook as it was before the first change
+    first = gradebook.history.checkpoints[0]
+    with open(os.path.join(os.path.dirname(data_file), first['file'])) as file:
+        assert json.load(file) == original
+    assert [(change['old'], change['new']) for change in gradebook.mark_history(ADMIN_NO)] \
+        == [(old_marks, 1)]
+
+
+def test_checkpoints_are_written_on_save_and_pruned(data_file):
+    gradebook = Gradebook(data_file, journaled=True, history=True, compact_every=10 ** 6)
+    gradebook.history.checkpoint_every = 5
+    gradebook.history.keep_checkpoints = 2
+    student = gradebook.get_student(ADMIN_NO)
+    snapshots = []
+    for round_number in range(12):
+        for marks in range(5):
+            student.edit_marks('Maths', marks + round_number)
+            gradebook.commit()
+        # Due, but only written when the gradebook saves
+        assert gradebook.history.checkpoints[-1]['number'] == round_number
+        gradebook.save_data()
+        snapshots.append((tick(), as_json(gradebook)))
+
+    checkpoints = gradebook.history.checkpoints
+    numbers = [checkpoint['number'] for checkpoint in checkpoints]
+    assert numbers == [number for number in range(13) if is_kept(number, 12, 2)]
+    assert len(numbers) < 13 and checkpoints[0]['offset'] == 0
+    directory = os.path.dirname(data_file)
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.json')
+                   and name.startswith('previous_data.json.history.'))
+    assert files == sorted(checkpoint['file'] for checkpoint in checkpoints)
+    for when, expected in snapshots:
+        assert gradebook.grades_as_of(when) == expected
+    reopened = GradeHistory(data_file + '.history', lambda: [])
+    assert reopened.checkpoints == checkpoints
+
+
+def test_checkpoints_thin_out_with_age():
+    for newest in range(1, 500):
+        kept = [number for number in range(newest + 1) if is_kept(number, newest, 4)]
+        assert kept[0] == 0 and kept[-1] == newest
+        # Never kept again once dropped
+        assert all(is_kept(number, newest - 1, 4) for number in kept[:-1])
+        # A query replays from the kept checkpoint before it: at most half its age
+        for older, newer in zip(kept, kept[1:]):
+            assert newer - older <= max(2, (newest - newer) // 2)
+    assert len(kept) <= 4 * 8
+
+
+def test_shared_history_follows_journal_order(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True, history=True)
+    # Edited here first but committed after the other process's edit
+    gradebook.get_student(ADMIN_NO).edit_marks('Maths', 11)
+    run_in_other_process(
+        f"gradebook = Gradebook({data_file!r}, journaled=True, shared=True, history=True)\n"
+        f"gradebook.get_student({ADMIN_NO!r}).edit_marks('Maths', 22)\n"
+        "gradebook.commit()\n", data_file)
+    gradebook.commit()
+
+    assert Gradebook(data_file, journaled=True).get_student(ADMIN_NO).marks['Maths'] == 11
+    assert gradebook.grades_as_of(tick())[ADMIN_NO]['marks']['Maths'] == 11
+    assert [change['new'] for change in gradebook.mark_history(ADMIN_NO)] == [22, 11]
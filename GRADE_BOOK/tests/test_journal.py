@@ -0,0 +1,78 @@
+"""Tests for the journal and its replay and compaction by the gradebook."""
+
+import json
+import os
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from journal import Journal
+
+
+def snapshot(gradebook):
+    """Every student's name and marks."""
+    return {admin_no: (student.name, dict(student.marks))
+            for admin_no, student in gradebook.students.items()}
+
+
+def make_changes(gradebook):
+    """Add, edit and delete a student, committing each change."""
+    student = Student('2400799999', 'New Student', gradebook.subjects)
+    student.marks = {subject: 40 for subject in gradebook.subjects}
+    assert gradebook.add_student(student)
+    gradebook.get_student('2400711001').edit_marks('Maths', 5)
+    gradebook.commit()
+    assert gradebook.delete_student('2400711002')
+
+
+def test_replay_restores_changes(data_file):
+    gradebook = Gradebook(data_file, journaled=True)
+    make_changes(gradebook)
+    with open(data_file) as file:
+        # Nothing compacted yet: the data file is as it was
+        assert '2400711002' in json.load(file)
+    assert os.path.getsize(data_file + '.log') > 0
+    assert snapshot(Gradebook(data_file, journaled=True)) == snapshot(gradebook)
+
+
+def test_replay_keeps_student_order(data_file):
+    gradebook = Gradebook(data_file, journaled=True)
+    make_changes(gradebook)
+    assert list(Gradebook(data_file, journaled=True).students) == list(gradebook.students)
+
+
+def test_compaction_empties_journal(data_file):
+    gradebook = Gradebook(data_file, journaled=True, compact_every=3)
+    make_changes(gradebook)
+    assert os.path.getsize(data_file + '.log') == 0
+    with open(data_file) as file:
+        data = json.load(file)
+    assert '2400711002' not in data
+    assert data['2400711001']['marks']['Maths'] == 5
+    assert data['2400799999']['name'] == 'New Student'
+    assert snapshot(Gradebook(data_file)) == snapshot(gradebook)
+
+
+def test_torn_record_is_skipped(data_file):
+    gradebook = Gradebook(data_file, journaled=True)
+    gradebook.get_student('2400711001').edit_marks('Maths', 5)
+    gradebook.commit()
+    with open(data_file + '.log', 'a') as file:
+        file.write('{"op": "set", "admin_no": "2400711001", "sub')
+
+    reopened = Gradebook(data_file, journaled=True)
+    assert reopened.get_student('2400711001').marks['Maths'] == 5
+    reopened.get_student('2400711001').edit_marks('SST', 6)
+    reopened.commit()
+    student = Gradebook(data_file, journaled=True).get_student('2400711001')
+    assert (student.marks['Maths'], student.marks['SST']) == (5, 6)
+
+
+def test_replay_from_position_reads_only_new_records(tmp_path):
+    journal = Journal(str(tmp_path / 'data.json.log'))
+    journal.append({"op": "delete", "admin_no": "1"})
+    journal.flush()
+    assert [record['admin_no'] for record in journal.replay()] == ['1']
+    position = journal.position
+    journal.append({"op": "delete", "admin_no": "2"})
+    journal.flush()
+    assert [record['admin_no'] for record in journal.replay(position)] == ['2']
+    journal.close()
@@ -0,0 +1,63 @@
+"""Tests that leaderboards rank students like sorting every student would."""
+
+import random
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook
+from grade_stats import total_marks
+
+
+def marks_of(gradebook, subject):
+    """Admin number -> marks in a subject, or total marks when subject is None."""
+    if subject is None:
+        return {admin_no: total_marks(student.scores)
+                for admin_no, student in gradebook.students.items()}
+    return {admin_no: student.marks[subject] for admin_no, student in gradebook.students.items()}
+
+
+def brute_force_top(gradebook, subject, k):
+    marks = marks_of(gradebook, subject)
+    ranked = sorted(marks.items(), key=lambda item: (-item[1], item[0]))[:k]
+    return [{'rank': 1 + sum(other > value for other in marks.values()), 'admin_no': admin_no,
+             'name': gradebook.students[admin_no].name, 'marks': value}
+            for admin_no, value in ranked]
+
+
+@pytest.mark.parametrize('subject', [None, 'Maths', 'English'])
+def test_top_students_and_ranks_follow_changes(data_file, subject):
+    gradebook = Gradebook(data_file)
+    rnd = random.Random(5)
+    admin_nos = sorted(gradebook.students)
+    for round_number in range(5):
+        assert gradebook.top_students(subject, k=15) == brute_force_top(gradebook, subject, 15)
+        marks = marks_of(gradebook, subject)
+        for admin_no in rnd.sample(admin_nos, 20):
+            assert gradebook.student_rank(admin_no, subject) == {
+                'rank': 1 + sum(other > marks[admin_no] for other in marks.values()),
+                'out_of': len(marks), 'marks': marks[admin_no]}
+        for _ in range(30):
+            gradebook.get_student(rnd.choice(admin_nos)).edit_marks(
+                rnd.choice(list(gradebook.subjects)), rnd.randint(0, 100))
+        removed = admin_nos.pop(rnd.randrange(len(admin_nos)))
+        gradebook.delete_student(removed)
+        assert gradebook.student_rank(removed, subject) is None
+
+
+def test_tied_students_share_a_rank(data_file):
+    gradebook = Gradebook(data_file)
+    first, second, third = sorted(gradebook.students)[:3]
+    for admin_no in (first, second):
+        gradebook.get_student(admin_no).edit_marks('Maths', 100)
+    gradebook.get_student(third).edit_marks('Maths', 99)
+    others_at_100 = sum(marks == 100 for marks in marks_of(gradebook, 'Maths').values()) - 2
+
+    top = gradebook.top_students('Maths', k=others_at_100 + 3)
+    tied = [entry for entry in top if entry['admin_no'] in (first, second)]
+    assert [entry['rank'] for entry in tied] == [1, 1]
+    assert gradebook.student_rank(third, 'Maths')['rank'] == others_at_100 + 3
+
+
+def test_unknown_subject(data_file):
+    with pytest.raises(KeyError):
+        Gradebook(data_file).top_students('Art')
@@ -0,0 +1,51 @@
+"""Tests that every load mode reads the same gradebook."""
+
+import json
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook
+from json_stream import iter_records
+
+
+def contents(gradebook):
+    return [(admin_no, student.name, dict(student.marks))
+            for admin_no, student in gradebook.students.items()]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_iter_records_matches_json_load(data_file, tmp_path, chunk_size):
+    with open(data_file) as file:
+        data = json.load(file)
+    # Escapes and non-ASCII names must survive records split across chunks
+    data['2500000001'] = {"name": 'Zoë "Quote" O\\Brien', "marks": dict(data['2400711001']['marks'])}
+    filename = str(tmp_path / 'odd.json')
+    with open(filename, 'w') as file:
+        json.dump(data, file, indent=4)
+    assert dict(iter_records(filename, chunk_size)) == data
+
+
+@pytest.mark.parametrize('load_mode', ['streaming', 'background'])
+def test_load_modes_match_eager(data_file, load_mode):
+    eager = Gradebook(data_file)
+    gradebook = Gradebook(data_file, load_mode=load_mode)
+    # Found even before a background load has reached the student
+    assert gradebook.get_student('2400711200').name == eager.get_student('2400711200').name
+    gradebook.wait_until_loaded()
+    assert gradebook.is_loaded
+    assert contents(gradebook) == contents(eager)
+    assert gradebook.view_statistics(extended=True) == eager.view_statistics(extended=True)
+
+
+def test_background_load_error_is_raised(tmp_path):
+    filename = str(tmp_path / 'broken.json')
+    with open(filename, 'w') as file:
+        file.write('{"2400711001": {"name": "A", "marks": {"Maths": 1}}, "24')
+    gradebook = Gradebook(filename, load_mode='background')
+    with pytest.raises(json.JSONDecodeError):
+        gradebook.wait_until_loaded()
+
+
+def test_unknown_load_mode(data_file):
+    with pytest.raises(ValueError):
+        Gradebook(data_file, load_mode='lazy')
@@ -0,0 +1,71 @@
+"""Tests that mark range queries select the same students as checking every mark."""
+
+import random
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook, Student
+
+
+def brute_force(gradebook, subject, lo, hi):
+    return {admin_no for admin_no, student in gradebook.students.items()
+            if lo <= student.marks[subject] <= hi}
+
+
+def random_changes(gradebook, rnd, count):
+    subjects = list(gradebook.subjects)
+    for number in range(count):
+        admin_nos = sorted(gradebook.students)
+        choice = rnd.random()
+        if choice < 0.2:
+            gradebook.delete_student(rnd.choice(admin_nos))
+        elif choice < 0.4:
+            student = Student(f'25{number:08d}', f'Student {number}', gradebook.subjects)
+            student.marks = {subject: rnd.randint(0, 100) for subject in subjects}
+            gradebook.add_student(student)
+        else:
+            gradebook.get_student(rnd.choice(admin_nos)).edit_marks(
+                rnd.choice(subjects), rnd.randint(0, 100))
+
+
+def test_selections_follow_changes(data_file):
+    gradebook = Gradebook(data_file)
+    rnd = random.Random(4)
+    for _ in range(5):
+        random_changes(gradebook, rnd, 40)
+        for _ in range(10):
+            (maths_lo, maths_hi), (science_lo, science_hi) = (
+                sorted(rnd.sample(range(101), 2)) for _ in range(2))
+            maths = gradebook.query('Maths', maths_lo, maths_hi)
+            science = gradebook.query('Science', science_lo, science_hi)
+            expected_maths = brute_force(gradebook, 'Maths', maths_lo, maths_hi)
+            expected_science = brute_force(gradebook, 'Science', science_lo, science_hi)
+
+            assert set(maths) == expected_maths and len(maths) == len(expected_maths)
+            assert set(maths & science) == expected_maths & expected_science
+            assert set(maths | science) == expected_maths | expected_science
+            assert set(maths - science) == expected_maths - expected_science
+            assert len(maths & science) == len(expected_maths & expected_science)
+            for admin_no in gradebook.students:
+                assert (admin_no in maths) == (admin_no in expected_maths)
+
+
+def test_selection_keeps_the_order_students_were_added(data_file):
+    gradebook = Gradebook(data_file)
+    assert list(gradebook.query('Maths')) == list(gradebook.students)
+
+
+def test_unknown_subject(data_file):
+    with pytest.raises(KeyError):
+        Gradebook(data_file).query('Art')
+
+
+def test_student_names_leave_out_deleted_students(data_file):
+    gradebook = Gradebook(data_file)
+    selection = gradebook.query('Maths', 0, 100)
+    deleted = next(iter(selection))
+    gradebook.delete_student(deleted)
+
+    names = gradebook.student_names(selection)
+    assert names == [(admin_no, student.name) for admin_no, student in gradebook.students.items()]
+    assert deleted not in dict(names)
@@ -0,0 +1,45 @@
+"""Tests for the opt-in operation metrics."""
+
+import json
+
+from Advanced_gradebook_implementation import Gradebook
+from metrics import BUCKETS, Metrics
+
+
+def test_buckets_are_cumulative():
+    metrics = Metrics()
+    for seconds in (0.00005, 0.002, 0.002, 20.0):
+        metrics.observe('save_data', seconds)
+    stats = metrics.to_dict()['operations']['save_data']
+    assert stats['count'] == 4 and stats['max'] == 20.0
+    assert stats['buckets']['0.0001'] == 1
+    assert stats['buckets']['0.005'] == 3
+    assert stats['buckets'][str(BUCKETS[-1])] == 3 and stats['buckets']['+Inf'] == 4
+
+
+def test_gradebook_operations_are_counted(data_file, tmp_path):
+    metrics = Metrics()
+    gradebook = Gradebook(data_file, metrics=metrics)
+    gradebook.view_statistics()
+    gradebook.get_student('2400711001').edit_marks('Maths', 5)
+    gradebook.save_data()
+
+    data = metrics.to_dict()
+    assert data['operations']['view_statistics']['count'] == 1
+    assert data['operations']['save_data']['count'] >= 1
+    assert data['counters']['students_serialized'] >= 200
+
+    json_file, prometheus_file = str(tmp_path / 'metrics.json'), str(tmp_path / 'metrics.prom')
+    metrics.export(json_file)
+    metrics.export(prometheus_file)
+    with open(json_file) as file:
+        assert json.load(file)['operations'].keys() == data['operations'].keys()
+    with open(prometheus_file) as file:
+        text = file.read()
+    assert 'gradebook_operation_seconds_count{operation="view_statistics"} 1' in text
+    assert 'gradebook_students_serialized_total' in text
+
+
+def test_gradebook_without_metrics_is_not_wrapped(data_file):
+    gradebook = Gradebook(data_file)
+    assert 'view_statistics' not in vars(gradebook)
@@ -0,0 +1,35 @@
+"""Tests for the name prefix search."""
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from bulk_import import validate_record
+
+
+def brute_force(gradebook, prefix):
+    prefix = ' '.join(prefix.casefold().split())
+    return {admin_no for admin_no, student in gradebook.students.items()
+            if any(' '.join(student.name.casefold().split()[i:]).startswith(prefix)
+                   for i in range(len(student.name.split())))}
+
+
+def test_find_students_matches_every_word(data_file):
+    gradebook = Gradebook(data_file)
+    for prefix in ('a', 'Jo', 'jerome d', 'DAM', 'z', 'chad k'):
+        assert set(gradebook.find_students(prefix, limit=1000)) == brute_force(gradebook, prefix)
+
+
+def test_index_follows_added_and_deleted_students(data_file):
+    gradebook = Gradebook(data_file)
+    assert gradebook.find_students('Zelda') == {}
+    records = [(f'25{number:08d}', f'Zelda Number{number}', dict.fromkeys(gradebook.subjects, 50))
+               for number in range(30)]
+    assert all(validate_record(*record, gradebook.subjects) is None for record in records)
+    gradebook.add_students(records)
+    student = Student('2500000099', 'Ada Zelda', gradebook.subjects)
+    gradebook.add_student(student)
+    gradebook.delete_student('2500000003')
+
+    found = gradebook.find_students('zelda', limit=1000)
+    assert set(found) == brute_force(gradebook, 'zelda')
+    assert len(found) == 30 and found['2500000099'] == 'Ada Zelda'
+    assert list(gradebook.find_students('zelda n', limit=3).values()) \
+        == ['Zelda Number0', 'Zelda Number1', 'Zelda Number10']
@@ -0,0 +1,58 @@
+"""Tests that percentile queries match ones computed from every mark."""
+
+import random
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook
+from grade_stats import total_marks
+
+
+def interpolated(marks, percent):
+    """The mark at a percentile by linear interpolation between the closest ranks."""
+    marks = sorted(marks)
+    position = (len(marks) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(marks) - 1)
+    return marks[lower] + (marks[upper] - marks[lower]) * (position - lower)
+
+
+def percentile_rank(marks, value):
+    below = sum(mark < value for mark in marks)
+    equal = sum(mark == value for mark in marks)
+    return 100 * (below + equal / 2) / len(marks)
+
+
+def test_percentiles_follow_changes(data_file):
+    gradebook = Gradebook(data_file)
+    rnd = random.Random(6)
+    admin_nos = sorted(gradebook.students)
+    for _ in range(4):
+        columns = {subject: [student.marks[subject] for student in gradebook.students.values()]
+                   for subject in gradebook.subjects}
+        columns[None] = [total_marks(student.scores) for student in gradebook.students.values()]
+        for subject, marks in columns.items():
+            for percent in (0, 10, 25, 50, 90, 99.5, 100):
+                assert gradebook.percentile(percent, subject) == pytest.approx(interpolated(marks, percent))
+
+        admin_no = rnd.choice(admin_nos)
+        student = gradebook.get_student(admin_no)
+        result = gradebook.student_percentiles(admin_no)
+        for subject in gradebook.subjects:
+            marks = student.marks[subject]
+            assert result['subjects'][subject]['marks'] == marks
+            assert result['subjects'][subject]['percentile'] \
+                == pytest.approx(percentile_rank(columns[subject], marks))
+        assert result['total']['percentile'] \
+            == pytest.approx(percentile_rank(columns[None], total_marks(student.scores)))
+
+        for _ in range(30):
+            gradebook.get_student(rnd.choice(admin_nos)).edit_marks(
+                rnd.choice(list(gradebook.subjects)), rnd.randint(0, 100))
+
+
+def test_invalid_percentile(data_file):
+    gradebook = Gradebook(data_file)
+    with pytest.raises(ValueError):
+        gradebook.percentile(101)
+    assert gradebook.student_percentiles('no such student') is None
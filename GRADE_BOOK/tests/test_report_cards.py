@@ -0,0 +1,85 @@
+"""Tests for the report card export."""
+
+import csv
+import os
+
+import pytest
+
+import report_cards
+from Advanced_gradebook_implementation import Gradebook
+from report_cards import RowSnapshot
+
+
+def read_csv(filename):
+    with open(filename, newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def competition_rank(value, values):
+    return 1 + sum(1 for other in values if other > value)
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Several chunks even for the 200 sample students
+    monkeypatch.setattr(report_cards, 'CHUNK_SIZE', 30)
+
+
+def test_ranks_and_class_statistics(data_file, tmp_path, small_chunks):
+    gradebook = Gradebook(data_file)
+    output = str(tmp_path / 'cards.csv')
+    assert gradebook.export_report_cards(output, workers=1) == len(gradebook.students)
+
+    cards = read_csv(output)
+    assert [card['admin_no'] for card in cards] == list(gradebook.students)
+    statistics = gradebook.view_statistics(extended=True)
+    totals = [sum(student.scores) for student in gradebook.students.values()]
+    for card in cards:
+        student = gradebook.get_student(card['admin_no'])
+        assert card['name'] == student.name
+        for subject in gradebook.subjects:
+            marks = [other.marks[subject] for other in gradebook.students.values()]
+            assert int(card[subject]) == student.marks[subject]
+            assert int(card[f'{subject}_rank']) == competition_rank(student.marks[subject], marks)
+            assert card[f'{subject}_class_average'] == str(statistics[f'Average_{subject}'])
+        assert int(card['total_rank']) == competition_rank(sum(student.scores), totals)
+        assert int(card['class_size']) == len(gradebook.students)
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'jsonl', 'text'])
+def test_output_does_not_depend_on_workers(data_file, tmp_path, small_chunks, output_format):
+    gradebook = Gradebook(data_file)
+    outputs = []
+    for workers in (1, 3):
+        output = str(tmp_path / f'cards-{workers}.{output_format}')
+        gradebook.export_report_cards(output, output_format, workers=workers)
+        with open(output, 'rb') as file:
+            outputs.append(file.read())
+    assert outputs[0] == outputs[1]
+
+
+def test_failed_render_leaves_no_file(data_file, tmp_path, monkeypatch):
+    gradebook = Gradebook(data_file)
+    output = str(tmp_path / 'cards.csv')
+
+    def broken(context, rows, output_format):
+        raise RuntimeError("render failed")
+    monkeypatch.setattr(report_cards, 'render_chunk', broken)
+    with pytest.raises(RuntimeError):
+        gradebook.export_report_cards(output, workers=1)
+    assert os.listdir(tmp_path) == ['previous_data.json']
+
+
+def test_unknown_format_is_rejected(data_file, tmp_path):
+    with pytest.raises(ValueError):
+        Gradebook(data_file).export_report_cards(str(tmp_path / 'cards.pdf'), 'pdf')
+
+
+def test_row_snapshot_reads_back_every_row(small_chunks):
+    rows = [(str(number), f'Student {number}', [number % 101, None, 72.5])
+            for number in range(100)]
+    with RowSnapshot(iter(rows)) as snapshot:
+        assert len(snapshot) == 100
+        assert list(snapshot) == rows
+        # Can be read more than once
+        assert list(snapshot) == rows
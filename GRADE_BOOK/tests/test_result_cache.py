@@ -0,0 +1,56 @@
+"""Tests that cached reports are dropped when a change makes them stale."""
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from test_shared import run_in_other_process
+
+ADMIN_NO = '2400711001'
+
+
+def fresh(data_file, **options):
+    """Reports computed by a gradebook that has cached nothing yet."""
+    gradebook = Gradebook(data_file, journaled=True, **options)
+    return gradebook.view_statistics(extended=True), gradebook.print_gradebook()
+
+
+def test_reports_follow_changes(data_file):
+    gradebook = Gradebook(data_file, journaled=True)
+    gradebook.view_statistics(extended=True)
+    gradebook.print_gradebook()
+
+    gradebook.get_student(ADMIN_NO).edit_marks('Maths', 3)
+    gradebook.commit()
+    assert (gradebook.view_statistics(extended=True), gradebook.print_gradebook()) == fresh(data_file)
+
+    student = Student('2500000001', 'Jane Doe', gradebook.subjects)
+    student.marks = {subject: 100 for subject in gradebook.subjects}
+    gradebook.add_student(student)
+    assert (gradebook.view_statistics(extended=True), gradebook.print_gradebook()) == fresh(data_file)
+
+    gradebook.delete_student('2400711002')
+    assert (gradebook.view_statistics(extended=True), gradebook.print_gradebook()) == fresh(data_file)
+
+
+def test_mark_edit_only_drops_its_subject(data_file):
+    gradebook = Gradebook(data_file)
+    gradebook.view_statistics()
+    gradebook.print_gradebook()
+    entries = gradebook.cache.stats()['entries']
+    misses = gradebook.cache.stats()['misses']
+
+    gradebook.get_student(ADMIN_NO).edit_marks('Maths', 3)
+    assert gradebook.cache.stats()['entries'] == entries - 1
+    gradebook.view_statistics()
+    gradebook.print_gradebook()
+    assert gradebook.cache.stats()['misses'] == misses + 1
+
+
+def test_other_process_changes_drop_cached_reports(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True)
+    gradebook.view_statistics(extended=True)
+    gradebook.print_gradebook()
+    run_in_other_process(
+        f"gradebook.get_student({ADMIN_NO!r}).edit_marks('Science', 0)\n"
+        "gradebook.delete_student('2400711002')\n"
+        "gradebook.commit()\n", data_file)
+    assert (gradebook.view_statistics(extended=True), gradebook.print_gradebook()) \
+        == fresh(data_file, shared=True)
@@ -0,0 +1,153 @@
+"""Tests for the HTTP/JSON server in front of a gradebook."""
+
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+from Advanced_gradebook_implementation import Gradebook
+from gradebook_server import GradebookServer
+from conftest import GRADE_BOOK
+from load_test import request
+
+ADMIN_NO = '2400711001'
+
+
+def serve(gradebook, scenario):
+    """Run a scenario coroutine against a server on a free port; return its result."""
+    async def run():
+        server = await GradebookServer(gradebook).start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                return await scenario(reader, writer, port)
+            finally:
+                writer.close()
+        finally:
+            server.close()
+    return asyncio.run(run())
+
+
+def test_operations(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True)
+
+    async def scenario(reader, writer, port):
+        marks = {"Maths": 10, "SST": 20, "English": 30, "Science": 40}
+        results = [
+            await request(reader, writer, 'POST', '/students',
+                          {"admin_no": "2400799999", "name": "New Student", "marks": marks}),
+            await request(reader, writer, 'POST', '/students',
+                          {"admin_no": "2400799999", "name": "New Student", "marks": marks}),
+            await request(reader, writer, 'PUT', '/students/2400799999/marks/Maths', {"marks": 99}),
+            await request(reader, writer, 'PUT', '/students/2400799999/marks/Maths', {"marks": 101}),
+            await request(reader, writer, 'GET', '/students/2400799999'),
+            await request(reader, writer, 'DELETE', '/students/2400799999'),
+            await request(reader, writer, 'GET', '/students/2400799999'),
+            await request(reader, writer, 'GET', '/nowhere'),
+        ]
+        return results
+
+    statuses = [status for status, _ in serve(gradebook, scenario)]
+    assert statuses == [201, 409, 200, 400, 200, 200, 404, 404]
+    assert Gradebook(data_file, journaled=True).get_student('2400799999') is None
+
+
+def test_reads_see_committed_writes(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True)
+    commit = gradebook.commit
+    events = []
+
+    def slow_commit():
+        events.append('commit started')
+        time.sleep(0.3)
+        commit()
+        events.append('commit finished')
+    gradebook.commit = slow_commit
+
+    async def scenario(reader, writer, port):
+        write = asyncio.create_task(request(reader, writer, 'PUT', f'/students/{ADMIN_NO}/marks/Maths',
+                                            {"marks": 99}))
+        while 'commit started' not in events:
+            await asyncio.sleep(0.01)
+        other_reader, other_writer = await asyncio.open_connection('127.0.0.1', port)
+        status, grades = await request(other_reader, other_writer, 'GET', f'/students/{ADMIN_NO}')
+        other_writer.close()
+        finished = 'commit finished' in events
+        await write
+        return status, grades, finished
+
+    status, grades, finished = serve(gradebook, scenario)
+    assert status == 200 and grades['marks']['Maths'] == 99
+    # The read waited for the commit instead of seeing the write before it was durable
+    assert finished
+
+
+def test_event_loop_is_not_blocked_by_file_lock(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True)
+    # Another process holds the gradebook's lock for a while
+    holder = subprocess.Popen(
+        [sys.executable, '-c',
+         "import sys, time\n"
+         f"sys.path.insert(0, {GRADE_BOOK!r})\n"
+         "from file_lock import FileLock\n"
+         f"with FileLock({data_file + '.lock'!r}).exclusive():\n"
+         "    print('locked', flush=True)\n"
+         "    time.sleep(1)\n"],
+        stdout=subprocess.PIPE, text=True)
+    assert holder.stdout.readline().strip() == 'locked'
+
+    async def scenario(reader, writer, port):
+        # Timed from another thread: a blocked event loop would also stop this coroutine
+        other = asyncio.create_task(asyncio.to_thread(timed_request, port, delay=0.1))
+        status_of_statistics, _ = await request(reader, writer, 'GET', '/statistics')
+        status, answered = await other
+        return status, answered, status_of_statistics
+
+    try:
+        status, answered, status_of_statistics = serve(gradebook, scenario)
+    finally:
+        holder.wait()
+    assert status == 404 and answered < 0.5
+    assert status_of_statistics == 200
+
+
+def timed_request(port, delay):
+    """After a delay, send a request for an unknown path on a new connection and time the answer."""
+    time.sleep(delay)
+    start = time.perf_counter()
+    with socket.create_connection(('127.0.0.1', port)) as connection:
+        connection.sendall(b"GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n")
+        response = connection.makefile('rb').read()
+    return int(response.split()[1]), time.perf_counter() - start
+
+
+def test_unexpected_error_hides_details(data_file, capsys):
+    gradebook = Gradebook(data_file, journaled=True)
+
+    def broken(extended=False):
+        raise RuntimeError("secret path /srv/data")
+    gradebook.view_statistics = broken
+
+    async def scenario(reader, writer, port):
+        return await request(reader, writer, 'GET', '/statistics')
+
+    status, payload = serve(gradebook, scenario)
+    assert status == 500
+    assert payload == {"error": "internal server error"}
+    assert 'secret path' in capsys.readouterr().err
+
+
+def test_invalid_content_length_is_rejected(data_file):
+    gradebook = Gradebook(data_file, journaled=True)
+
+    async def scenario(reader, writer, port):
+        writer.write(b"PUT /students/2400711001/marks/Maths HTTP/1.1\r\n"
+                     b"Content-Length: -5\r\n\r\n")
+        await writer.drain()
+        return await reader.read()
+
+    response = serve(gradebook, scenario)
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Connection: close" in response
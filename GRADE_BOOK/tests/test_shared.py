@@ -0,0 +1,65 @@
+"""Tests for gradebooks shared by several processes."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook
+from conftest import GRADE_BOOK
+
+ADMIN_NO = '2400711001'
+
+
+def run_in_other_process(code, data_file):
+    """Run Python code in a separate process, with `gradebook` opened shared on data_file."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([GRADE_BOOK, os.environ.get('PYTHONPATH', '')]))
+    prelude = ("from Advanced_gradebook_implementation import Gradebook\n"
+               f"gradebook = Gradebook({data_file!r}, journaled=True, shared=True)\n")
+    subprocess.run([sys.executable, '-c', prelude + code], env=env, check=True)
+
+
+def test_other_process_changes_are_picked_up(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True)
+    run_in_other_process(
+        f"gradebook.get_student({ADMIN_NO!r}).edit_marks('Maths', 12)\n"
+        "gradebook.commit()\n", data_file)
+    assert gradebook.refresh()
+    assert gradebook.get_student(ADMIN_NO).marks['Maths'] == 12
+
+
+@pytest.mark.parametrize('storage', ['dict', 'columnar', 'sharded'])
+def test_edit_of_student_fetched_before_reload_is_kept(data_file, storage):
+    gradebook = Gradebook(data_file, journaled=True, shared=True, storage=storage)
+    student = gradebook.get_student(ADMIN_NO)
+    # Two compactions by another process make this one read the file again
+    run_in_other_process(
+        f"gradebook = Gradebook({data_file!r}, journaled=True, shared=True, storage={storage!r})\n"
+        "for marks in (20, 21):\n"
+        f"    gradebook.get_student({ADMIN_NO!r}).edit_marks('SST', marks)\n"
+        "    gradebook.save_data()\n", data_file)
+    assert gradebook.refresh()
+    assert student.edit_marks('Maths', 77)
+    gradebook.commit()
+
+    live = gradebook.get_student(ADMIN_NO)
+    assert live.marks['Maths'] == 77
+    assert live.marks['SST'] == 21
+    assert gradebook.view_statistics()['Max_Maths'] >= 77
+    reopened = Gradebook(data_file, journaled=True, shared=True, storage=storage)
+    assert reopened.get_student(ADMIN_NO).marks['Maths'] == 77
+
+
+def test_edit_of_student_deleted_by_other_process_is_dropped(data_file):
+    gradebook = Gradebook(data_file, journaled=True, shared=True, storage='columnar')
+    student = gradebook.get_student(ADMIN_NO)
+    run_in_other_process(
+        f"gradebook.delete_student({ADMIN_NO!r})\n"
+        "gradebook.save_data()\n"
+        "gradebook.save_data()\n", data_file)
+    assert gradebook.refresh()
+    student.edit_marks('Maths', 77)
+    gradebook.commit()
+    assert gradebook.get_student(ADMIN_NO) is None
+    assert Gradebook(data_file, journaled=True).get_student(ADMIN_NO) is None
@@ -0,0 +1,65 @@
+"""Tests that the histogram statistics match the marks they are kept for."""
+
+import random
+import statistics
+from array import array
+
+from Advanced_gradebook_implementation import Gradebook
+from grade_stats import PASS_MARK, SubjectHistogram, subject_statistics
+
+
+def brute_force(gradebook, subject):
+    """The extended statistics of one subject, computed from every mark."""
+    marks = [student.marks[subject] for student in gradebook.students.values()]
+    q1, _, q3 = statistics.quantiles(marks, n=4, method='inclusive')
+    return {
+        f'Average_{subject}': format(statistics.mean(marks), '.4f'),
+        f'Max_{subject}': max(marks),
+        f'Min_{subject}': min(marks),
+        f'Mode_{subject}': statistics.mode(marks),
+        f'Mode_Freq_{subject}': marks.count(statistics.mode(marks)),
+        f'Median_{subject}': format(statistics.median(marks), '.4f'),
+        f'Std_Dev_{subject}': format(statistics.pstdev(marks), '.4f'),
+        f'Q1_{subject}': format(q1, '.4f'),
+        f'Q3_{subject}': format(q3, '.4f'),
+        f'Pass_Rate_{subject}': format(sum(mark >= PASS_MARK for mark in marks) / len(marks), '.4f'),
+    }
+
+
+def test_statistics_follow_edits(data_file):
+    gradebook = Gradebook(data_file)
+    rnd = random.Random(2)
+    admin_nos = sorted(gradebook.students)
+    for _ in range(200):
+        student = gradebook.get_student(rnd.choice(admin_nos))
+        assert student.edit_marks(rnd.choice(list(gradebook.subjects)), rnd.randint(0, 100))
+        statistics_ = gradebook.view_statistics(extended=True)
+    for subject in gradebook.subjects:
+        expected = brute_force(gradebook, subject)
+        assert {key: statistics_[key] for key in expected} == expected
+
+
+def test_marks_that_are_not_whole_numbers_are_rejected(data_file):
+    gradebook = Gradebook(data_file)
+    admin_no = next(iter(gradebook.students))
+    before = gradebook.view_statistics()
+    student = gradebook.get_student(admin_no)
+    old_marks = student.get_marks('Maths')
+    for marks in (72.5, 80.0, True, '80', -1, 101):
+        assert not student.set_marks('Maths', marks)
+    assert student.get_marks('Maths') == old_marks
+    assert gradebook.view_statistics() == before
+
+
+def test_histogram_of_a_column_matches_one_built_mark_by_mark():
+    rnd = random.Random(3)
+    marks = [rnd.randint(0, 100) for _ in range(1000)]
+    incremental = SubjectHistogram()
+    for mark in marks + [None, 255, 72.5]:
+        incremental.add(mark)
+    for column in (marks + [None, 72.5], array('B', marks + [255])):
+        histogram = SubjectHistogram.from_marks(column)
+        assert (histogram.counts, histogram.total, histogram.count) \
+            == (incremental.counts, incremental.total, incremental.count)
+        assert subject_statistics('Maths', histogram, column, extended=True) \
+            == subject_statistics('Maths', incremental, marks, extended=True)
@@ -0,0 +1,83 @@
+"""Tests that every storage engine gives the same students and statistics."""
+
+import random
+import shutil
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from binary_snapshot import json_to_snapshot
+from sqlite_store import json_to_sqlite
+
+STORAGES = ['dict', 'columnar', 'mapped', 'sharded', 'sqlite']
+
+
+def open_gradebook(data_file, storage):
+    """Open the sample gradebook with a storage engine, converting the file if needed."""
+    if storage == 'mapped':
+        filename = data_file + '.gbk'
+        json_to_snapshot(data_file, filename, Gradebook(data_file).subjects.names)
+        return Gradebook(filename, storage='mapped', journaled=True)
+    if storage == 'sqlite':
+        filename = data_file + '.db'
+        json_to_sqlite(data_file, filename, Gradebook(data_file).subjects.names)
+        return Gradebook(filename, storage='sqlite')
+    return Gradebook(data_file, storage=storage, journaled=True, shards=4)
+
+
+def random_changes(gradebook, seed, count=300):
+    """Apply the same random additions, deletions and edits for a given seed."""
+    rnd = random.Random(seed)
+    subjects = list(gradebook.subjects)
+    for number in range(count):
+        admin_nos = sorted(gradebook.students)
+        choice = rnd.random()
+        if choice < 0.2 and admin_nos:
+            gradebook.delete_student(rnd.choice(admin_nos))
+        elif choice < 0.4:
+            student = Student(f'25{number:08d}', f'Student {number}', gradebook.subjects)
+            student.marks = {subject: rnd.randint(0, 100) for subject in subjects}
+            gradebook.add_student(student)
+        elif admin_nos:
+            student = gradebook.get_student(rnd.choice(admin_nos))
+            student.edit_marks(rnd.choice(subjects), rnd.randint(0, 100))
+            gradebook.commit()
+
+
+def contents(gradebook):
+    return [(admin_no, student.name, dict(student.marks))
+            for admin_no, student in gradebook.students.items()]
+
+
+@pytest.fixture
+def expected(tmp_path, data_file):
+    """Statistics and students of the dict engine after the random changes."""
+    filename = str(tmp_path / 'expected.json')
+    shutil.copy(data_file, filename)
+    gradebook = Gradebook(filename, journaled=True)
+    statistics = gradebook.view_statistics(extended=True)
+    random_changes(gradebook, seed=1)
+    return statistics, gradebook.view_statistics(extended=True), contents(gradebook)
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_statistics_match_dict_storage(data_file, expected, storage):
+    initial, final, students = expected
+
+    gradebook = open_gradebook(data_file, storage)
+    assert gradebook.view_statistics(extended=True) == initial
+    random_changes(gradebook, seed=1)
+    assert gradebook.view_statistics(extended=True) == final
+    assert sorted(contents(gradebook)) == sorted(students)
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_marks_that_are_not_whole_numbers_are_rejected(data_file, storage):
+    gradebook = open_gradebook(data_file, storage)
+    before = gradebook.view_statistics(extended=True)
+    student = gradebook.get_student(next(iter(gradebook.students)))
+    old_marks = student.get_marks('Maths')
+    for marks in (72.5, 80.0, True, -1, 101):
+        assert not student.set_marks('Maths', marks)
+    assert student.get_marks('Maths') == old_marks
+    assert gradebook.view_statistics(extended=True) == before
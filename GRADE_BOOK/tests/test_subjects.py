@@ -0,0 +1,49 @@
+"""Tests for gradebooks with other subjects than the default ones."""
+
+import json
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook, Student
+from subjects import SubjectRegistry, subjects_of_file
+
+SUBJECTS = ['Art', 'Music', 'Physics']
+
+
+def test_registry_ids():
+    registry = SubjectRegistry(SUBJECTS)
+    assert [registry.id_of(subject) for subject in SUBJECTS] == [0, 1, 2]
+    assert registry.to_scores({'Music': 5}) == [None, 5, None]
+    assert registry.to_dict([1, 2, 3]) == {'Art': 1, 'Music': 2, 'Physics': 3}
+    for names in (['Art', 'Art'], ['Art', ' '], ['Art', None]):
+        with pytest.raises(ValueError):
+            SubjectRegistry(names)
+
+
+@pytest.mark.parametrize('storage', ['dict', 'columnar'])
+def test_new_gradebook_keeps_its_subjects(tmp_path, storage):
+    filename = str(tmp_path / 'school.json')
+    gradebook = Gradebook(filename, subjects=SUBJECTS, storage=storage)
+    for number in range(3):
+        student = Student(f'25{number:08d}', f'Student {number}', gradebook.subjects)
+        student.marks = {'Art': 10 * number, 'Music': 50, 'Physics': 100 - number}
+        assert gradebook.add_student(student)
+    assert gradebook.get_student('2500000002').edit_marks('Music', 60)
+    gradebook.save_data()
+
+    assert subjects_of_file(filename) == SUBJECTS
+    reopened = Gradebook(filename, storage=storage)
+    assert list(reopened.subjects) == SUBJECTS
+    assert dict(reopened.get_student('2500000002').marks) == {'Art': 20, 'Music': 60, 'Physics': 98}
+    statistics = reopened.view_statistics()
+    assert statistics['Average_Art'] == '10.0000' and statistics['Max_Music'] == 60
+    assert 'Average_Maths' not in statistics
+    with open(filename) as file:
+        assert list(json.load(file)['2500000000']['marks']) == SUBJECTS
+
+
+def test_unknown_subject_is_refused(tmp_path):
+    gradebook = Gradebook(str(tmp_path / 'school.json'), subjects=SUBJECTS)
+    student = Student('2500000000', 'Student', gradebook.subjects)
+    gradebook.add_student(student)
+    assert not gradebook.get_student('2500000000').set_marks('Maths', 50)
@@ -0,0 +1,67 @@
+"""Tests for Gradebook.update_marks, which applies a batch all or nothing."""
+
+import os
+
+import pytest
+
+from Advanced_gradebook_implementation import Gradebook, Student
+
+
+@pytest.fixture
+def gradebook(data_file):
+    return Gradebook(data_file, journaled=True, history=True)
+
+
+def journal_records(gradebook):
+    return list(gradebook.journal.replay())
+
+
+def test_valid_batch_is_applied(gradebook):
+    result = gradebook.update_marks([('2400711001', 'Maths', 10),
+                                     ('2400711002', 'SST', 20),
+                                     ('2400711001', 'Maths', 30)])
+    assert result['updated'] == 3 and result['rejected'] == []
+    assert gradebook.get_student('2400711001').marks['Maths'] == 30
+    assert gradebook.get_student('2400711002').marks['SST'] == 20
+    assert len(journal_records(gradebook)) == 3
+    assert [change['new'] for change in gradebook.mark_history('2400711001')] == [10, 30]
+
+
+def test_invalid_row_rejects_whole_batch(gradebook):
+    before = gradebook.view_statistics()
+    maths = gradebook.get_student('2400711001').marks['Maths']
+    result = gradebook.update_marks([('2400711001', 'Maths', 10),
+                                     ('2400711002', 'Maths', 101),
+                                     ('0000000000', 'Maths', 50)])
+    assert result['updated'] == 0
+    assert [row for row, _, _ in result['rejected']] == [2, 3]
+    assert gradebook.get_student('2400711001').marks['Maths'] == maths
+    assert gradebook.view_statistics() == before
+
+
+def test_failure_while_applying_rolls_back(gradebook, monkeypatch):
+    maths = gradebook.get_student('2400711001').marks['Maths']
+    before = gradebook.view_statistics()
+    # The second update fails after the first was applied in memory
+    monkeypatch.setattr(Student, 'edit_marks', failing_on('2400711002'))
+    with pytest.raises(RuntimeError):
+        gradebook.update_marks([('2400711001', 'Maths', 10), ('2400711002', 'Maths', 20)])
+    monkeypatch.undo()
+
+    assert gradebook.get_student('2400711001').marks['Maths'] == maths
+    assert gradebook.view_statistics() == before
+    # Nothing reached the journal or the grade history
+    assert journal_records(gradebook) == []
+    assert not os.path.exists(gradebook.history.filename)
+    assert gradebook.mark_history('2400711001') == []
+
+
+def failing_on(admin_no):
+    """An edit_marks that raises for one student and edits the others."""
+    edit_marks = Student.edit_marks
+
+    def edit(student, subject, marks):
+        if student.admin_no == admin_no:
+            raise RuntimeError("disk full")
+        return edit_marks(student, subject, marks)
+    return edit